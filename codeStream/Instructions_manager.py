@@ -10,7 +10,7 @@ class InstructionsManager:
     """A class to manage the display of application instructions and
     configuration settings."""
 
-    def __init__(self, root, config_path=config.INSTRUCTION_FILE_PATH):
+    def __init__(self, root, config_path=config.INSTRUCTION_FILE_PATH, load=True):
         """
         Initialize the InstructionsManager with a root Tkinter window and
         configuration path.
@@ -18,10 +18,14 @@ class InstructionsManager:
         Args:
             root (tk.Tk): The root Tkinter window.
             config_path (str): The path to the configuration file.
+            load (bool): Whether to load the configuration right away. When
+                         False, the configuration is None until
+                         load_or_create_config is run (e.g. in the
+                         background) and its result assigned.
         """
         self.root = root
         self.config_path = config_path
-        self.config = self.load_or_create_config()
+        self.config = self.load_or_create_config() if load else None
 
     def load_or_create_config(self):
         """
@@ -48,7 +52,7 @@ class InstructionsManager:
     def check_and_show_instructions(self):
         """Check the configuration and show instructions if the
         'show_instructions' flag is set."""
-        if self.config["show_instructions"]:
+        if self.config and self.config["show_instructions"]:
             self.show_instructions()
 
     def show_instructions(self):
@@ -66,7 +70,10 @@ class InstructionsManager:
             "下方向键：减少知识点下落速度\n"
             "左方向键：减少知识点密度\n"
             "右方向键：增加知识点密度\n"
-            "ESC键：退出全屏模式\n\n"
+            "ESC键：退出全屏模式\n"
+            "F3键：显示/隐藏性能面板\n"
+            "/键：搜索知识点，输入时即时筛选，回车确认，ESC清除\n"
+            "详情页：滚轮或方向键滚动，点击返回\n\n"
             "如果你不想再次看到此提示，请勾选'不再显示'。"
         )
 
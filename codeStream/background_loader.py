@@ -0,0 +1,171 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LoadCancelled(Exception):
+    """Raised inside a background load when its task has been cancelled."""
+
+
+class LoadTask:
+    """
+    A handle to a load running on the BackgroundLoader's thread pool.
+
+    The loading function receives its task to report progress and to check
+    for cancellation; the Tk side uses it to cancel the load.
+
+    Attributes:
+        name (str): A short description of the load.
+    """
+
+    def __init__(self, loader, name):
+        """
+        Initialize the LoadTask.
+
+        Args:
+            loader (BackgroundLoader): The loader running the task.
+            name (str): A short description of the load.
+        """
+        self.loader = loader
+        self.name = name
+        self.cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        """Whether the task has been cancelled."""
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        """
+        Request the task to stop. Its callbacks will not be called anymore.
+        """
+        self.cancel_event.set()
+
+    def check_cancelled(self):
+        """
+        Stop the load if the task has been cancelled.
+
+        Raises:
+            LoadCancelled: If the task has been cancelled.
+        """
+        if self.cancelled:
+            raise LoadCancelled(self.name)
+
+    def report_progress(self, fraction, message=""):
+        """
+        Report progress from the loading thread to the Tk main thread.
+
+        Args:
+            fraction (float): The completed fraction between 0 and 1.
+            message (str): An optional progress message.
+        """
+        self.loader.results.put((self, "progress", (fraction, message)))
+
+
+class BackgroundLoader:
+    """
+    Runs file loading on a thread pool and marshals progress, results and
+    errors back to the Tk main thread with ``root.after``, so the UI never
+    blocks on file I/O.
+
+    Tk widgets must only be touched from the main thread, so callbacks are
+    always invoked there, from a poll scheduled while loads are pending.
+    """
+
+    def __init__(self, root, max_workers, poll_interval):
+        """
+        Initialize the BackgroundLoader.
+
+        Args:
+            root (tk.Tk): The root Tkinter window.
+            max_workers (int): The number of loading threads.
+            poll_interval (int): The result polling interval in milliseconds.
+        """
+        self.root = root
+        self.poll_interval = poll_interval
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="loader")
+        self.results = queue.Queue()
+        self.callbacks = {}
+        self.polling = False
+
+    def submit(
+        self, function, *args, name="", on_done=None, on_error=None, on_progress=None
+    ):
+        """
+        Run a loading function in the background.
+
+        Args:
+            function (callable): Called as ``function(task, *args)`` on a
+                                 loading thread.
+            *args: Additional arguments for the function.
+            name (str): A short description of the load.
+            on_done (callable): Called with the function's result.
+            on_error (callable): Called with the exception it raised.
+            on_progress (callable): Called with (fraction, message) for each
+                                    progress report.
+
+        Returns:
+            LoadTask: The handle of the load.
+        """
+        task = LoadTask(self, name)
+        self.callbacks[task] = (on_done, on_error, on_progress)
+        self.executor.submit(self.run_task, task, function, args)
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.poll_interval, self.poll)
+        return task
+
+    def run_task(self, task, function, args):
+        """
+        Run a loading function and queue its outcome. Runs on a loading
+        thread.
+
+        Args:
+            task (LoadTask): The task of the load.
+            function (callable): The loading function.
+            args (tuple): Additional arguments for the function.
+        """
+        try:
+            if task.cancelled:
+                raise LoadCancelled(task.name)
+            self.results.put((task, "done", function(task, *args)))
+        except BaseException as e:
+            self.results.put((task, "error", e))
+
+    def poll(self):
+        """
+        Dispatch queued progress reports and outcomes to their callbacks.
+        Runs on the Tk main thread.
+        """
+        while True:
+            try:
+                task, kind, value = self.results.get_nowait()
+            except queue.Empty:
+                break
+            callbacks = self.callbacks.get(task)
+            if callbacks is None:
+                continue
+            on_done, on_error, on_progress = callbacks
+            if kind != "progress":
+                del self.callbacks[task]
+            if task.cancelled:
+                continue
+            if kind == "progress" and on_progress:
+                on_progress(*value)
+            elif kind == "done" and on_done:
+                on_done(value)
+            elif kind == "error" and on_error:
+                on_error(value)
+
+        if self.callbacks:
+            self.root.after(self.poll_interval, self.poll)
+        else:
+            self.polling = False
+
+    def shutdown(self):
+        """
+        Cancel all pending loads and stop the thread pool without waiting.
+        """
+        for task in self.callbacks:
+            task.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,317 @@
+"""
+Headless benchmark of the knowledge rain engine.
+
+Runs KnowledgeRain with the SDL dummy video driver on a synthetic deck with
+a fixed random seed, scripted speed and density changes and a fixed time
+step, and reports frames per second, per-phase frame timings and the time
+and peak memory of the engine's hot functions. Results are saved as JSON
+and can be compared with an earlier run:
+
+    python -m codeStream.benchmark --deck-size 500 --compare old.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import time
+import tracemalloc
+
+# Must be set before pygame opens a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np  # noqa: E402
+import pygame  # noqa: E402
+
+from codeStream import config  # noqa: E402
+from codeStream.frame_profiler import FrameProfiler  # noqa: E402
+from codeStream.knowledge_rain import KnowledgeRain  # noqa: E402
+
+# First and last code points of the CJK unified ideographs used for
+# synthetic text
+CJK_FIRST = 0x4E00
+CJK_LAST = 0x9FA5
+
+
+def synthetic_text(rng, length):
+    """
+    Build a random text of CJK characters and a few ASCII words.
+
+    Args:
+        rng (random.Random): The random number generator.
+        length (int): The number of characters.
+
+    Returns:
+        str: The text.
+    """
+    chars = []
+    while len(chars) < length:
+        if rng.random() < 0.1:
+            chars.extend(" code ")
+        else:
+            chars.append(chr(rng.randint(CJK_FIRST, CJK_LAST)))
+    return "".join(chars[:length])
+
+
+def synthetic_deck(size, title_length, explanation_length, seed):
+    """
+    Build a deck of synthetic knowledge points.
+
+    Args:
+        size (int): The number of knowledge points.
+        title_length (int): The number of characters of each title.
+        explanation_length (int): The number of characters of each
+                                  explanation.
+        seed (int): The random seed.
+
+    Returns:
+        dict: The knowledge points and their explanations.
+    """
+    rng = random.Random(seed)
+    deck = {}
+    for index in range(size):
+        # The index keeps titles unique
+        title = synthetic_text(rng, title_length) + str(index)
+        deck[title] = synthetic_text(rng, explanation_length)
+    return deck
+
+
+def measure(function, repeat):
+    """
+    Time a function and measure the peak memory it allocates.
+
+    Memory is measured in a separate pass, as tracing allocations slows
+    the function down.
+
+    Args:
+        function (callable): The function to measure, called without
+                             arguments.
+        repeat (int): The number of timed calls.
+
+    Returns:
+        dict: The mean and 95th percentile call time in microseconds and
+        the peak allocated memory in KiB.
+    """
+    times = np.empty(repeat)
+    for index in range(repeat):
+        start = time.perf_counter()
+        function()
+        times[index] = time.perf_counter() - start
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "mean_us": round(float(times.mean()) * 1e6, 3),
+        "p95_us": round(float(np.percentile(times, 95)) * 1e6, 3),
+        "peak_kib": round(peak / 1024, 3),
+    }
+
+
+def run_frames(rain, frames, dt):
+    """
+    Run the rain loop without waiting for the clock, with scripted speed
+    and density changes, and time each phase.
+
+    The density ramps up to its maximum during the first quarter of the
+    run, the speed is raised in the middle and the density drops back in
+    the last quarter. Additional outputs of the engine run in the same
+    frames.
+
+    Args:
+        rain (KnowledgeRain): The rain engine.
+        frames (int): The number of frames to run.
+        dt (float): The fixed time step in seconds.
+
+    Returns:
+        tuple: (frames per second, FrameProfiler with the frame timings).
+    """
+    profiler = FrameProfiler(frames)
+    screens = rain.get_screens()
+    for screen in screens:
+        screen.profiler = profiler
+        screen.full_redraw = True
+    start = time.perf_counter()
+    for frame in range(frames):
+        profiler.start_frame()
+        for screen in screens:
+            if frame < frames // 4 and frame % 10 == 0:
+                screen.adjust_density(1)
+            elif frame == frames // 2:
+                screen.speed = config.SPEED_MAX
+            elif frame >= frames * 3 // 4 and frame % 10 == 0:
+                screen.adjust_density(-1)
+        pygame.event.pump()
+        profiler.mark("events")
+        rain.animate(dt)
+        profiler.end_frame()
+    elapsed = time.perf_counter() - start
+    return frames / elapsed, profiler
+
+
+def benchmark_functions(rain, repeat):
+    """
+    Measure the engine's hot functions on a full screen of raindrops.
+
+    Args:
+        rain (KnowledgeRain): The rain engine.
+        repeat (int): The number of timed calls of each function.
+
+    Returns:
+        dict: The measurements of each function.
+    """
+    rain.density = config.DENSITY_MAX
+    while len(rain.raindrops) < rain.density and rain.create_raindrop() is not None:
+        pass
+    text_width = rain.get_text_width(rain.knowledge_list[0])
+    max_width = rain.width - config.TEXT_MAX_WIDTH_OFFSET
+    points = iter(rain.knowledge_points.items())
+
+    def create_and_remove():
+        slot = rain.create_raindrop()
+        if slot is not None:
+            rain.remove_raindrop(slot)
+
+    def wrap_next():
+        # Wrap from scratch, as the first opening of a detail view does
+        nonlocal points
+        try:
+            knowledge, explanation = next(points)
+        except StopIteration:
+            points = iter(rain.knowledge_points.items())
+            knowledge, explanation = next(points)
+        rain.wrapper.wrap_text(explanation, max_width)
+
+    return {
+        "update_raindrops": measure(lambda: rain.update_raindrops(1 / 60), repeat),
+        "create_raindrop": measure(create_and_remove, repeat),
+        "find_empty_cell": measure(lambda: rain.find_empty_cell(text_width), repeat),
+        "draw_raindrops": measure(rain.draw_raindrops, repeat),
+        "show_detail_wrap": measure(wrap_next, repeat),
+    }
+
+
+def run_benchmark(args):
+    """
+    Run the whole benchmark.
+
+    Args:
+        args (argparse.Namespace): The command line arguments.
+
+    Returns:
+        dict: The benchmark results.
+    """
+    config.TEXT_ATLAS = args.atlas
+    config.RENDERER = args.renderer
+    # Timings must not include cache writes, nor leave entries behind
+    config.DECK_CACHE_DIR = None
+    deck = synthetic_deck(
+        args.deck_size, args.title_length, args.explanation_length, args.seed
+    )
+    rain = KnowledgeRain(args.width, args.height, deck, seed=args.seed)
+    for _ in range(args.outputs):
+        rain.add_output(args.width, args.height)
+    if rain.atlas is not None:
+        rain.atlas.build_thread.join()
+    rain.wrapper.prewrap_thread.join()
+
+    fps, profiler = run_frames(rain, args.frames, 1 / 60)
+    functions = benchmark_functions(rain, args.repeat)
+    rain.close()
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "seed": args.seed,
+            "deck_size": args.deck_size,
+            "title_length": args.title_length,
+            "explanation_length": args.explanation_length,
+            "frames": args.frames,
+            "size": [args.width, args.height],
+            "renderer": args.renderer,
+            "atlas": args.atlas,
+            "outputs": args.outputs,
+        },
+        "fps": round(fps, 2),
+        "phases": profiler.percentiles(),
+        "functions": functions,
+    }
+
+
+def compare(results, baseline):
+    """
+    Print the benchmark results next to an earlier run.
+
+    Args:
+        results (dict): The new results.
+        baseline (dict): The results of the earlier run.
+    """
+
+    def row(name, new, old):
+        """Print one metric with its ratio to the earlier run."""
+        ratio = f"{new / old:6.2f}x" if old else "     -"
+        print(f"{name:<36}{old:>12.3f}{new:>12.3f}  {ratio}")
+
+    print(f"{'':<36}{'baseline':>12}{'current':>12}")
+    row("fps", results["fps"], baseline["fps"])
+    for phase, values in results["phases"].items():
+        old = baseline["phases"].get(phase)
+        if old:
+            row(f"{phase} p50 (ms)", values["50"], old["50"])
+            row(f"{phase} p95 (ms)", values["95"], old["95"])
+    for name, values in results["functions"].items():
+        old = baseline["functions"].get(name)
+        if old:
+            for metric in ("mean_us", "p95_us", "peak_kib"):
+                row(f"{name} {metric}", values[metric], old[metric])
+
+
+def main():
+    """
+    Run the benchmark from the command line.
+    """
+    parser = argparse.ArgumentParser(description="知识雨引擎性能基准测试")
+    parser.add_argument("--deck-size", type=int, default=500)
+    parser.add_argument("--title-length", type=int, default=8)
+    parser.add_argument("--explanation-length", type=int, default=400)
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--width", type=int, default=config.WIDTH)
+    parser.add_argument("--height", type=int, default=config.HEIGHT)
+    parser.add_argument(
+        "--renderer", choices=("software", "hardware"), default=config.RENDERER
+    )
+    parser.add_argument("--atlas", action="store_true", default=config.TEXT_ATLAS)
+    parser.add_argument(
+        "--outputs", type=int, default=0, help="同一循环驱动的额外窗口数量"
+    )
+    parser.add_argument(
+        "--output", default="benchmark_results", help="结果保存目录"
+    )
+    parser.add_argument("--compare", help="用于对比的历史结果 JSON 文件")
+    args = parser.parse_args()
+
+    # JSON keys are strings, so the results are compared once round-tripped
+    results = json.loads(json.dumps(run_benchmark(args)))
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(
+        args.output, time.strftime("benchmark-%Y%m%d-%H%M%S.json")
+    )
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存: {path}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(results, json.load(f))
+    else:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -12,11 +12,21 @@ FONT_SIZE = 16
 # Large font size in points.
 LARGE_FONT_SIZE = 24
 
-# Minimum speed for animations or movements.
-SPEED_MIN = 0.5
+# System font used for the knowledge rain, the default font is used if it is
+# not installed.
+FONT_NAME = "simsun"
 
-# Maximum speed for animations or movements.
-SPEED_MAX = 10
+# Minimum fall speed of raindrops in pixels per second.
+SPEED_MIN = 15
+
+# Maximum fall speed of raindrops in pixels per second.
+SPEED_MAX = 300
+
+# Initial fall speed of raindrops in pixels per second.
+SPEED_DEFAULT = 60
+
+# Fall speed change in pixels per second for each speed key press.
+SPEED_STEP = 15
 
 # Minimum density for elements.
 DENSITY_MIN = 1
@@ -36,6 +46,78 @@ RAINDROP_Y_MAX = 0
 # Clock tick rate in frames per second.
 CLOCK_TICK = 30
 
+# Frame-rate mode: "capped" limits the frame rate to CLOCK_TICK, "vsync"
+# synchronizes with the display refresh and "uncapped" renders as fast as
+# possible.
+FRAME_RATE_MODE = "capped"
+
+# Lower the frame-rate target when the frame budget is repeatedly missed.
+ADAPTIVE_FRAME_RATE = True
+
+# Lowest frame rate the adaptive mode may fall back to.
+ADAPTIVE_FPS_MIN = 10
+
+# Frame rate change applied by each adaptive adjustment.
+ADAPTIVE_FPS_STEP = 5
+
+# Number of consecutive frames over budget before lowering the frame rate.
+ADAPTIVE_MISS_LIMIT = 30
+
+# Number of consecutive frames under half the budget before raising the
+# frame rate again.
+ADAPTIVE_RECOVER_LIMIT = 150
+
+# Longest elapsed time in seconds applied to a single animation step.
+MAX_FRAME_TIME = 0.1
+
+# Rendering backend: "software" blits onto the display surface, "hardware"
+# draws text as textures with the SDL renderer and falls back to
+# "software" when no renderer is available.
+RENDERER = "software"
+
+# Additional rain windows, e.g. one per extra monitor, driven by the same
+# simulation loop and sharing the deck, text caches and knowledge scheduler.
+# Each entry may set "display" (the monitor index), "size" ([width, height],
+# the main window's size if omitted) and "fullscreen", e.g.
+# [{"display": 1, "fullscreen": True}].
+EXTRA_OUTPUTS = []
+
+# Only redraw and update the screen regions covered by raindrops.
+DIRTY_RECT_RENDERING = True
+
+# Fraction of the screen area above which a dirty-rect frame falls back to a
+# full display flip.
+DIRTY_RECT_MAX_AREA_RATIO = 0.4
+
+# Number of recent frames whose phase timings are kept by the frame
+# profiler.
+FRAME_PROFILE_FRAMES = 600
+
+# Number of frames between refreshes of the performance HUD (toggled with
+# F3).
+FRAME_PROFILE_HUD_REFRESH = 15
+
+# Optional path of a frame-time trace (.csv or .json) written whenever the
+# rain stops, None to disable.
+FRAME_TRACE_PATH = None
+
+# Optional path of an input recording written whenever the rain stops, None
+# to disable. Formatted with time.strftime, e.g.
+# "recordings/rain-%Y%m%d-%H%M%S.json". Replay with
+# python -m codeStream.replay.
+RECORDING_PATH = None
+
+# Cell size in pixels of the spatial index used for raindrop hit-testing.
+SPATIAL_INDEX_CELL_SIZE = 64
+
+# Order in which knowledge points fall: "sequential", "shuffled", "weighted"
+# or "spaced" (spaced repetition, favouring points whose details were opened).
+KNOWLEDGE_ORDER = "sequential"
+
+# Weight of knowledge points for the "weighted" order, by title, e.g.
+# {"DIKW": 3}. Points not listed weigh 1; points weighing 0 never fall.
+KNOWLEDGE_WEIGHTS = {}
+
 # Vertical offset for text display.
 TEXT_Y_OFFSET = 60
 
@@ -45,12 +127,36 @@ TEXT_X_OFFSET = 20
 # Maximum width offset for text display.
 TEXT_MAX_WIDTH_OFFSET = 40
 
+# Longest time in milliseconds the detail view blocks waiting for an event.
+DETAIL_WAIT_TIMEOUT = 500
+
+# Number of lines scrolled in the detail view per mouse wheel step.
+DETAIL_SCROLL_LINES = 3
+
 # Horizontal offset for exit text display.
 TEXT_EXIT_X_OFFSET = 200
 
 # Vertical offset for exit text display.
 TEXT_EXIT_Y_OFFSET = 40
 
+# Maximum number of rendered text surfaces kept in the text cache.
+TEXT_CACHE_MAX_ENTRIES = 2048
+
+# Maximum pixel memory in bytes used by the text cache.
+TEXT_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# Maximum number of wrapped explanations kept by the text wrapper. Decks
+# held in memory are pre-wrapped up to this many points; compiled decks,
+# whose explanations are read on demand, are wrapped when opened.
+TEXT_LAYOUT_MAX_ENTRIES = 1024
+
+# Pre-render all knowledge titles of a deck into a text atlas, so the rain
+# is drawn with plain blits and no text rendering while it animates.
+TEXT_ATLAS = False
+
+# Width and height in pixels of each text atlas page.
+TEXT_ATLAS_PAGE_SIZE = 2048
+
 # RGB color for black.
 BLACK = (0, 0, 0)
 
@@ -63,8 +169,49 @@ WHITE = (255, 255, 255)
 # File path for the knowledge points JSON file.
 KNOWLEDGE_FILE_PATH = "json_file/667_knowledge_points.json"
 
+# File suffix of compiled knowledge decks, stored next to their JSON source.
+COMPILED_DECK_SUFFIX = ".deck.sqlite"
+
+# Directory of the cache of parsed knowledge files and measured titles,
+# keyed by their contents and the font, so unchanged decks are not parsed or
+# measured again on later launches. None to disable.
+DECK_CACHE_DIR = "json_file/deck_cache"
+
+# Largest total size in bytes of the deck cache. The least recently used
+# entries are removed when it grows larger, None for no limit.
+DECK_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Number of threads loading files in the background.
+LOADER_WORKERS = 2
+
+# Interval in milliseconds at which background load results are polled.
+LOADER_POLL_INTERVAL = 50
+
+# Watch the knowledge file and swap edited chapters into the running rain.
+HOT_RELOAD = True
+
+# Seconds between checks of the knowledge file when inotify is unavailable.
+HOT_RELOAD_POLL_INTERVAL = 1.0
+
+# Seconds to let an editor finish writing before the file is read again.
+HOT_RELOAD_SETTLE_TIME = 0.2
+
+# Optional path of the study log, a SQLite database of the knowledge points
+# opened in the detail view, None to disable. Summarize it with
+# python -m codeStream.study_log.
+STUDY_LOG_PATH = "json_file/study_log.sqlite"
+
+# Longest time in seconds a study event waits in memory before it is written.
+STUDY_LOG_FLUSH_INTERVAL = 5.0
+
+# Number of buffered study events that are written without waiting.
+STUDY_LOG_BATCH_SIZE = 256
+
 # File path for the instruction configuration JSON file.
 INSTRUCTION_FILE_PATH = "json_file/instruction_config.json"
 
+# File path of the cache of resolved system font paths.
+FONT_CACHE_FILE_PATH = "json_file/font_cache.json"
+
 # File path for the quotes JSON file.
 QUOTES_FILE_PATH = "json_file/quotes.json"
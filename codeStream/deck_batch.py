@@ -0,0 +1,226 @@
+"""
+Validate, and optionally normalize and compile, every knowledge JSON deck
+under a directory, spreading the files over a pool of processes.
+
+Problems are reported per file with their line, column and chapter, one
+per line in the usual path:line:column form:
+
+    python -m codeStream.deck_batch decks/ --compile --workers 8
+
+The command exits with status 1 if any deck is invalid.
+"""
+
+import argparse
+import functools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from codeStream import config
+from codeStream.json_stream import KnowledgeFileError, iter_chapters
+from codeStream.knowledge_deck import compile_deck, compiled_deck_path, is_deck_current
+
+# Files handed to a worker process at a time, so pools of small decks do not
+# pay a round trip per file
+BATCH_CHUNK_SIZE = 4
+
+
+def find_decks(directory):
+    """
+    Find the JSON decks under a directory.
+
+    Args:
+        directory (str): The directory searched recursively.
+
+    Returns:
+        list: The paths of the .json files, sorted.
+    """
+    paths = []
+    for root, _, files in os.walk(directory):
+        paths.extend(
+            os.path.join(root, name) for name in files if name.endswith(".json")
+        )
+    return sorted(paths)
+
+
+def normalize_deck(path, chapters):
+    """
+    Rewrite a deck as indented UTF-8 JSON without a byte order mark, unless
+    it is already written that way.
+
+    Args:
+        path (str): The path to the deck.
+        chapters (dict): The chapters and their knowledge points.
+
+    Returns:
+        bool: True if the file was rewritten.
+    """
+    text = json.dumps(chapters, ensure_ascii=False, indent=4) + "\n"
+    data = text.encode("utf-8")
+    with open(path, "rb") as file:
+        if file.read() == data:
+            return False
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(data)
+    os.replace(temp_path, path)
+    return True
+
+
+def check_deck(path, normalize=False, compile=False):
+    """
+    Validate one deck, and optionally normalize and compile it. Runs in a
+    worker process, so the report is made of plain values, and any error is
+    reported rather than raised so it only fails this deck.
+
+    Args:
+        path (str): The path to the deck.
+        normalize (bool): Whether to rewrite a valid deck, see normalize_deck.
+        compile (bool): Whether to compile a valid deck next to it, unless
+                        its compiled deck is current.
+
+    Returns:
+        dict: The report of the deck: its "path", the number of "chapters"
+        and "points", "warnings" about valid but suspicious content, whether
+        it was "normalized" and "compiled", and the "error" that made it
+        invalid, if any, as a dict with its "reason", "line", "column" and
+        "chapter" (None where unknown).
+    """
+    report = {
+        "path": path,
+        "chapters": 0,
+        "points": 0,
+        "warnings": [],
+        "normalized": False,
+        "compiled": False,
+        "error": None,
+    }
+    chapters = {}
+    chapter_of = {}
+    try:
+        for chapter, knowledge_points in iter_chapters(path):
+            if chapter in chapters:
+                report["warnings"].append(f"章节 '{chapter}' 重复，只保留最后一个")
+            if not knowledge_points:
+                report["warnings"].append(f"章节 '{chapter}' 的内容为空")
+            for knowledge in knowledge_points:
+                if chapter_of.get(knowledge, chapter) != chapter:
+                    report["warnings"].append(
+                        f"知识点 '{knowledge}' 同时出现在章节 "
+                        f"'{chapter_of[knowledge]}' 和 '{chapter}' 中"
+                    )
+                chapter_of[knowledge] = chapter
+            chapters[chapter] = knowledge_points
+        if normalize:
+            report["normalized"] = normalize_deck(path, chapters)
+        if compile:
+            deck_path = compiled_deck_path(path, config.COMPILED_DECK_SUFFIX)
+            if not is_deck_current(deck_path, path):
+                compile_deck(chapters.items(), deck_path, path)
+                report["compiled"] = True
+    except KnowledgeFileError as e:
+        report["error"] = {
+            "reason": e.reason,
+            "line": e.line,
+            "column": e.column,
+            "chapter": e.chapter,
+        }
+    except Exception as e:
+        # Any other failure, e.g. a sqlite3.Error while compiling, only
+        # fails this deck rather than the whole batch
+        report["error"] = {
+            "reason": str(e) if isinstance(e, OSError) else f"{type(e).__name__}: {e}",
+            "line": None,
+            "column": None,
+            "chapter": None,
+        }
+    report["chapters"] = len(chapters)
+    report["points"] = sum(len(points) for points in chapters.values())
+    return report
+
+
+def check_decks(paths, workers=None, normalize=False, compile=False):
+    """
+    Check many decks in parallel, see check_deck.
+
+    Args:
+        paths (list): The paths to the decks.
+        workers (int): The number of worker processes, one per CPU if None.
+                       With a single worker the decks are checked in this
+                       process.
+        normalize (bool): Whether to normalize valid decks.
+        compile (bool): Whether to compile valid decks.
+
+    Yields:
+        dict: The report of each deck, in the order of paths.
+    """
+    check = functools.partial(check_deck, normalize=normalize, compile=compile)
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers <= 1:
+        yield from map(check, paths)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(check, paths, chunksize=BATCH_CHUNK_SIZE)
+
+
+def format_report(report):
+    """
+    Format the problems of a deck report, one per line.
+
+    Args:
+        report (dict): The report, see check_deck.
+
+    Returns:
+        list: The lines, empty if the deck has no problem.
+    """
+    lines = []
+    error = report["error"]
+    if error is not None:
+        location = report["path"]
+        if error["line"] is not None:
+            location += f":{error['line']}:{error['column']}"
+        message = f"{location}: 错误: {error['reason']}"
+        if error["chapter"] is not None:
+            message += f" (章节 '{error['chapter']}')"
+        lines.append(message)
+    lines.extend(f"{report['path']}: 警告: {warning}" for warning in report["warnings"])
+    return lines
+
+
+def main():
+    """
+    Check a directory of decks from the command line.
+    """
+    parser = argparse.ArgumentParser(description="批量检查知识点 JSON 文件")
+    parser.add_argument("directory", help="包含知识点 JSON 文件的目录")
+    parser.add_argument("--workers", type=int, help="并行进程数，默认为 CPU 核数")
+    parser.add_argument(
+        "--normalize", action="store_true", help="将有效文件重写为统一格式"
+    )
+    parser.add_argument(
+        "--compile", action="store_true", help="为有效文件生成编译后的知识库"
+    )
+    args = parser.parse_args()
+
+    paths = find_decks(args.directory)
+    start = time.perf_counter()
+    invalid = 0
+    normalized = 0
+    compiled = 0
+    for report in check_decks(paths, args.workers, args.normalize, args.compile):
+        for line in format_report(report):
+            print(line)
+        invalid += report["error"] is not None
+        normalized += report["normalized"]
+        compiled += report["compiled"]
+    elapsed = time.perf_counter() - start
+    print(
+        f"检查 {len(paths)} 个文件，{invalid} 个有错误，"
+        f"重写 {normalized} 个，编译 {compiled} 个，用时 {elapsed:.2f} 秒"
+    )
+    raise SystemExit(1 if invalid else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+import hashlib
+import io
+import marshal
+import os
+
+import numpy as np
+
+from codeStream.json_stream import reload_chapters
+
+# Bumped whenever the format of cache entries changes
+DECK_CACHE_FORMAT_VERSION = 1
+
+# Bytes hashed at a time when computing file digests
+DIGEST_CHUNK_SIZE = 1024 * 1024
+
+# Titles measured between checks for cancellation
+MEASURE_BATCH_SIZE = 1024
+
+
+def file_digest(path):
+    """
+    Get a digest identifying the contents of a file.
+
+    Args:
+        path (str): The path to the file.
+
+    Returns:
+        str: The hexadecimal digest.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(DIGEST_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def font_digest(font):
+    """
+    Get a digest identifying a font file and size, so measurements are
+    dropped when the font is replaced.
+
+    Args:
+        font (pygame.freetype.Font): The font.
+
+    Returns:
+        str: The hexadecimal digest.
+    """
+    try:
+        stat = os.stat(font.path)
+        version = f"{stat.st_size}:{stat.st_mtime_ns}"
+    except (OSError, TypeError):
+        version = ""
+    key = f"{font.path}\0{version}\0{font.size}"
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def measure_titles(font, titles, is_current=None):
+    """
+    Measure the rendered size of titles without rendering them.
+
+    Args:
+        font (pygame.freetype.Font): The font the titles are drawn with.
+        titles (list): The titles.
+        is_current (callable): Optional function returning False once the
+                               measurements are no longer needed.
+
+    Returns:
+        dict: The (width, height) of each title, or None if cancelled.
+    """
+    sizes = {}
+    for index, title in enumerate(titles):
+        if index % MEASURE_BATCH_SIZE == 0 and is_current and not is_current():
+            return None
+        # The bounding rect has the size of the surface font.render returns
+        sizes[title] = font.get_rect(title).size
+    return sizes
+
+
+class DeckCache:
+    """
+    A content-addressed cache of the work done to load a deck, so an
+    unchanged deck is not parsed or measured again on the next launch.
+
+    Entries are named by digests of what they were computed from: parsed
+    chapters by the contents of the JSON file, and title sizes by the
+    titles and the font file and size. Edited files and fonts simply get
+    new entries. Entries are stored with marshal and numpy, which load much
+    faster than JSON, and written atomically, so concurrent writers are
+    harmless.
+
+    Entries are stamped with the time they were last used, and the least
+    recently used ones are removed after a write once the cache is larger
+    than max_bytes, so entries of edited decks do not pile up.
+
+    Attributes:
+        directory (str): The cache directory.
+        max_bytes (int): The largest total size of the entries, None for
+                         no limit.
+    """
+
+    def __init__(self, directory, max_bytes=None):
+        """
+        Initialize the DeckCache.
+
+        Args:
+            directory (str): The cache directory, created when first
+                             written to.
+            max_bytes (int): The largest total size of the entries, None
+                             for no limit.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def entry_path(self, name):
+        """
+        Get the path of a cache entry.
+
+        Args:
+            name (str): The entry name.
+
+        Returns:
+            str: The path in the cache directory.
+        """
+        return os.path.join(self.directory, f"v{DECK_CACHE_FORMAT_VERSION}-{name}")
+
+    def write(self, name, data):
+        """
+        Write a cache entry. Failures are ignored, as the entry can always
+        be computed again. Entries larger than max_bytes are not written,
+        as they could only be kept by evicting everything else.
+
+        Args:
+            name (str): The entry name.
+            data (bytes): The entry contents.
+        """
+        if self.max_bytes is not None and len(data) > self.max_bytes:
+            return
+        path = self.entry_path(name)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temp_path, "wb") as file:
+                file.write(data)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        self.prune(keep=path)
+
+    def touch(self, path):
+        """
+        Mark a cache entry as used now, so it is pruned last.
+
+        Args:
+            path (str): The path of the entry.
+        """
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def prune(self, keep=None):
+        """
+        Remove the least recently used entries until the cache fits in
+        max_bytes. Entries removed by another process meanwhile are skipped.
+
+        Args:
+            keep (str): Optional path of an entry never removed, e.g. the
+                        one just written.
+        """
+        if self.max_bytes is None:
+            return
+        entries = []
+        try:
+            with os.scandir(self.directory) as scan:
+                for entry in scan:
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def load_chapters(self, path):
+        """
+        Get the parsed chapters of a knowledge JSON file, parsing the file
+        only if its contents are not cached yet.
+
+        Args:
+            path (str): The path to the knowledge JSON file.
+
+        Returns:
+            dict: The (digest, knowledge points) of each chapter, as
+            returned by json_stream.reload_chapters.
+
+        Raises:
+            OSError: If the file cannot be read.
+            KnowledgeFileError: If the file is not a valid knowledge file.
+        """
+        digest = file_digest(path)
+        # marshal data is only readable by the same marshal format
+        name = f"{digest}-m{marshal.version}.chapters"
+        cached_path = self.entry_path(name)
+        try:
+            with open(cached_path, "rb") as file:
+                chapters = marshal.load(file)
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+        else:
+            self.touch(cached_path)
+            return chapters
+        chapters, _ = reload_chapters(path, {})
+        # The file may have been saved again while it was parsed
+        if file_digest(path) == digest:
+            self.write(name, marshal.dumps(chapters))
+        return chapters
+
+    def load_title_sizes(self, titles, titles_digest, font):
+        """
+        Get the cached rendered sizes of a deck's titles.
+
+        Args:
+            titles (list): The titles in deck order.
+            titles_digest (str): The digest of the titles, see
+                                 input_recording.deck_digest.
+            font (pygame.freetype.Font): The font the titles are drawn with.
+
+        Returns:
+            dict: The (width, height) of each title, or None if not cached.
+        """
+        path = self.entry_path(f"{titles_digest}-{font_digest(font)}.sizes.npy")
+        try:
+            sizes = np.load(path)
+        except (OSError, ValueError):
+            return None
+        if sizes.shape != (len(titles), 2):
+            return None
+        self.touch(path)
+        return dict(zip(titles, map(tuple, sizes.tolist())))
+
+    def store_title_sizes(self, titles, titles_digest, font, sizes):
+        """
+        Cache the rendered sizes of a deck's titles.
+
+        Args:
+            titles (list): The titles in deck order.
+            titles_digest (str): The digest of the titles.
+            font (pygame.freetype.Font): The font the titles are drawn with.
+            sizes (dict): The (width, height) of each title.
+        """
+        array = np.array([sizes[title] for title in titles], dtype=np.int32)
+        data = io.BytesIO()
+        np.save(data, array)
+        name = f"{titles_digest}-{font_digest(font)}.sizes.npy"
+        self.write(name, data.getvalue())
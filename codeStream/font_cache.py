@@ -0,0 +1,144 @@
+import functools
+import json
+import os
+import sys
+import tempfile
+
+
+def font_dirs():
+    """
+    Get the directories where the system looks for installed fonts.
+
+    Returns:
+        list: The font directories of the current platform.
+    """
+    home = os.path.expanduser("~")
+    if sys.platform == "win32":
+        windir = os.environ.get("WINDIR", "C:\\Windows")
+        local = os.environ.get("LOCALAPPDATA", home)
+        return [
+            os.path.join(windir, "Fonts"),
+            os.path.join(local, "Microsoft", "Windows", "Fonts"),
+        ]
+    if sys.platform == "darwin":
+        return [
+            "/System/Library/Fonts",
+            "/Library/Fonts",
+            os.path.join(home, "Library", "Fonts"),
+        ]
+    return [
+        "/usr/share/fonts",
+        "/usr/local/share/fonts",
+        os.path.join(home, ".fonts"),
+        os.path.join(home, ".local", "share", "fonts"),
+    ]
+
+
+def font_dirs_signature(dirs):
+    """
+    Get the modification times of the font directories and their
+    subdirectories, which change whenever a font is installed or removed.
+
+    Only directories are listed, so this stays cheap even with thousands of
+    font files.
+
+    Args:
+        dirs (list): The font directories.
+
+    Returns:
+        dict: The modification time of each existing directory.
+    """
+    signature = {}
+    for font_dir in dirs:
+        for path, _, _ in os.walk(font_dir):
+            try:
+                signature[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+    return signature
+
+
+class FontCache:
+    """
+    Resolves system font names to font file paths once and remembers the
+    result on disk, so later runs skip the system font scan.
+
+    The cache is dropped as soon as a font directory changes.
+
+    Attributes:
+        cache_path (str): The path of the cache file.
+        fonts (dict): The resolved path of each font name, None if missing.
+    """
+
+    def __init__(self, cache_path):
+        """
+        Initialize the FontCache and load the cache file if it is current.
+
+        Args:
+            cache_path (str): The path of the cache file.
+        """
+        self.cache_path = cache_path
+        self.signature = font_dirs_signature(font_dirs())
+        self.fonts = {}
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return
+        if cached.get("signature") == self.signature:
+            self.fonts = cached.get("fonts", {})
+
+    def resolve(self, name):
+        """
+        Get the font file path of a system font.
+
+        Args:
+            name (str): The system font name, e.g. "simsun".
+
+        Returns:
+            str: The font file path, or None if the font is not installed.
+        """
+        if name not in self.fonts:
+            # Scanning the system fonts is slow, so pygame is only imported
+            # when the cache misses
+            import pygame.sysfont
+
+            self.fonts[name] = pygame.sysfont.match_font(name)
+            self.save()
+        return self.fonts[name]
+
+    def save(self):
+        """
+        Write the resolved fonts to the cache file.
+        """
+        # Each save writes its own temporary file, so processes saving at the
+        # same time never write into each other's
+        try:
+            fd, temp_path = tempfile.mkstemp(
+                prefix=os.path.basename(self.cache_path) + ".",
+                suffix=".tmp",
+                dir=os.path.dirname(self.cache_path) or ".",
+            )
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump({"signature": self.signature, "fonts": self.fonts}, f)
+                os.replace(temp_path, self.cache_path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+        except OSError as e:
+            print(f"无法保存字体缓存: {e}")
+
+
+@functools.lru_cache(maxsize=None)
+def get_font_cache(cache_path):
+    """
+    Get the FontCache of a cache file, shared by the whole process.
+
+    Args:
+        cache_path (str): The path of the cache file.
+
+    Returns:
+        FontCache: The font cache.
+    """
+    return FontCache(cache_path)
@@ -0,0 +1,134 @@
+import csv
+import json
+import time
+
+import numpy as np
+
+# Phases of a rain frame, in the order they run
+FRAME_PHASES = ("events", "density", "update", "draw", "flip")
+
+
+class FrameProfiler:
+    """
+    Per-phase frame timings kept in a fixed-size ring buffer.
+
+    Each frame is split into phases by calling ``mark`` at the end of each
+    phase; the time since the previous mark is recorded for that phase.
+    Only the most recent frames are kept, so percentiles always describe
+    the current behaviour and memory stays constant.
+
+    Attributes:
+        phases (tuple): The names of the timed phases.
+        samples (numpy.ndarray): The phase durations of the recorded frames
+                                 in milliseconds, one row per frame.
+        count (int): The number of frames recorded since the last reset.
+    """
+
+    def __init__(self, capacity, phases=FRAME_PHASES):
+        """
+        Initialize the FrameProfiler.
+
+        Args:
+            capacity (int): The number of frames kept in the ring buffer.
+            phases (tuple): The names of the timed phases.
+        """
+        self.phases = tuple(phases)
+        self.columns = {phase: column for column, phase in enumerate(self.phases)}
+        self.samples = np.zeros((capacity, len(self.phases)))
+        self.count = 0
+        self.last_mark = 0.0
+
+    @property
+    def capacity(self):
+        """The number of frames kept in the ring buffer."""
+        return len(self.samples)
+
+    def reset(self):
+        """
+        Forget all recorded frames.
+        """
+        self.count = 0
+
+    def start_frame(self):
+        """
+        Start timing a frame.
+        """
+        self.samples[self.count % self.capacity] = 0.0
+        self.last_mark = time.perf_counter()
+
+    def mark(self, phase):
+        """
+        End a phase of the current frame.
+
+        Args:
+            phase (str): The phase that just ended.
+        """
+        now = time.perf_counter()
+        row = self.count % self.capacity
+        self.samples[row, self.columns[phase]] += (now - self.last_mark) * 1000
+        self.last_mark = now
+
+    def end_frame(self):
+        """
+        Record the current frame. Frames that are started but not ended
+        (e.g. interrupted by the detail view) are discarded.
+        """
+        self.count += 1
+
+    def recent(self):
+        """
+        Get the recorded frames in chronological order.
+
+        Returns:
+            numpy.ndarray: The phase durations in milliseconds, one row per
+            frame, oldest first.
+        """
+        if self.count <= self.capacity:
+            return self.samples[: self.count]
+        return np.roll(self.samples, -(self.count % self.capacity), axis=0)
+
+    def percentiles(self, quantiles=(50, 95, 99)):
+        """
+        Get percentiles of each phase and of the whole frame.
+
+        Args:
+            quantiles (tuple): The percentiles to compute.
+
+        Returns:
+            dict: For each phase and "total", the percentiles in
+            milliseconds keyed by quantile. Empty if no frame is recorded.
+        """
+        frames = self.recent()
+        if not len(frames):
+            return {}
+        columns = np.column_stack([frames, frames.sum(axis=1)])
+        values = np.percentile(columns, quantiles, axis=0)
+        return {
+            name: dict(zip(quantiles, values[:, column].round(3).tolist()))
+            for column, name in enumerate(self.phases + ("total",))
+        }
+
+    def dump(self, path):
+        """
+        Write the recorded frames to a trace file, as CSV or JSON depending
+        on the file extension.
+
+        Args:
+            path (str): The path of the trace file (.csv or .json).
+        """
+        frames = self.recent()
+        first = self.count - len(frames)
+        if path.endswith(".json"):
+            trace = {
+                "phases": list(self.phases),
+                "frames": frames.round(4).tolist(),
+                "percentiles": self.percentiles(),
+            }
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(trace, f)
+            return
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(("frame",) + self.phases + ("total",))
+            for index, row in enumerate(frames.round(4).tolist()):
+                writer.writerow([first + index, *row, round(sum(row), 4)])
@@ -0,0 +1,271 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+
+from codeStream.json_stream import KnowledgeFileError, reload_chapters
+
+# inotify event masks, see inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_CLOEXEC = 0o2000000
+# Fixed part of struct inotify_event: wd, mask, cookie and name length
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class Inotify:
+    """
+    A minimal inotify watch on a directory, used through ctypes.
+
+    The directory rather than the file is watched, so editors that save by
+    writing a new file and renaming it over the old one are seen too.
+    """
+
+    def __init__(self, directory):
+        """
+        Start watching a directory.
+
+        Args:
+            directory (str): The directory to watch.
+
+        Raises:
+            OSError: If inotify is not available.
+        """
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            inotify_init1 = libc.inotify_init1
+            inotify_add_watch = libc.inotify_add_watch
+        except (AttributeError, TypeError, OSError) as e:
+            raise OSError(f"inotify is not available: {e}") from None
+        self.fd = inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, "inotify_add_watch failed", directory)
+
+    def wait(self, timeout):
+        """
+        Wait for files of the directory to be written.
+
+        Args:
+            timeout (float): The maximum time to wait in seconds.
+
+        Returns:
+            set: The names of the files written, empty on timeout.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = os.read(self.fd, 64 * 1024)
+        names = set()
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            names.add(os.fsdecode(data[offset : offset + length].rstrip(b"\0")))
+            offset += length
+        return names
+
+    def close(self):
+        """
+        Stop watching.
+        """
+        os.close(self.fd)
+
+
+def file_signature(path):
+    """
+    Get the size and modification time identifying a version of a file.
+
+    Args:
+        path (str): The path to the file.
+
+    Returns:
+        tuple: (size, modification time in nanoseconds), or None if the
+        file does not exist.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def point_hashes(knowledge_points):
+    """
+    Get hashes standing in for the explanations of knowledge points, which
+    is all that is needed to tell which points an edit changed.
+
+    Args:
+        knowledge_points (dict): The knowledge points and their explanations.
+
+    Returns:
+        dict: The hash of the explanation of each knowledge point.
+    """
+    return {
+        knowledge: hash(explanation)
+        for knowledge, explanation in knowledge_points.items()
+    }
+
+
+def changed_points(old, new):
+    """
+    Find the knowledge points added, removed or edited between two reads
+    of a knowledge file. Only chapters whose digest changed are compared.
+
+    Args:
+        old (dict): The (digest, point hashes) of each chapter before, see
+                    point_hashes.
+        new (dict): The (digest, point hashes) of each chapter after.
+
+    Returns:
+        set: The titles of the changed knowledge points.
+    """
+    changed = set()
+    for chapter in old.keys() | new.keys():
+        old_digest, old_hashes = old.get(chapter, (None, {}))
+        new_digest, new_hashes = new.get(chapter, (None, {}))
+        if old_digest == new_digest:
+            continue
+        changed.update(
+            knowledge
+            for knowledge in old_hashes.keys() | new_hashes.keys()
+            if old_hashes.get(knowledge) != new_hashes.get(knowledge)
+        )
+    return changed
+
+
+class DeckWatcher:
+    """
+    Watches a knowledge JSON file on a background thread and reads it again
+    when it changes, decoding only the chapters whose contents changed.
+
+    Changes are detected with inotify where available and by polling the
+    file's size and modification time elsewhere. Only digests are kept
+    between reads, not the deck itself.
+
+    Attributes:
+        path (str): The watched knowledge file.
+        chapters (dict): The (digest, point hashes) of each chapter as last
+                         read, see point_hashes.
+    """
+
+    def __init__(self, path, on_change, poll_interval, settle_time, cache=None):
+        """
+        Initialize the DeckWatcher.
+
+        Args:
+            path (str): The knowledge file to watch.
+            on_change (callable): Called on the watcher thread after each
+                                  change with the knowledge point titles of
+                                  each chapter, the knowledge points of the
+                                  chapters that were decoded again and the
+                                  set of changed knowledge point titles.
+            poll_interval (float): The time between checks in seconds when
+                                   polling.
+            settle_time (float): The time in seconds to let a writer finish
+                                 before the file is read.
+            cache (DeckCache): Optional cache the chapters are first read
+                               from, so an unchanged file is not parsed
+                               again when watching starts.
+        """
+        self.path = path
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        self.cache = cache
+        self.chapters = {}
+        self.signature = None
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """
+        Read the file and start watching it.
+        """
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stop watching at the next check.
+        """
+        self.stopped.set()
+
+    def run(self):
+        """
+        Watch the file until stop is called.
+        """
+        self.reload(notify=False)
+        try:
+            inotify = Inotify(os.path.dirname(os.path.abspath(self.path)))
+        except OSError:
+            inotify = None
+        name = os.path.basename(self.path)
+        try:
+            while not self.stopped.is_set():
+                if inotify is not None:
+                    if name not in inotify.wait(self.poll_interval):
+                        continue
+                    self.stopped.wait(self.settle_time)
+                else:
+                    self.stopped.wait(self.poll_interval)
+                if not self.stopped.is_set():
+                    self.reload()
+        finally:
+            if inotify is not None:
+                inotify.close()
+
+    def reload(self, notify=True):
+        """
+        Read the file again if it changed since the last read. Invalid
+        versions, e.g. saved halfway through an edit, are reported and
+        skipped.
+
+        Args:
+            notify (bool): Whether to call on_change for changed points.
+        """
+        signature = file_signature(self.path)
+        if signature is None or signature == self.signature:
+            return
+        self.signature = signature
+        try:
+            if self.cache is not None and not self.chapters:
+                chapters = self.cache.load_chapters(self.path)
+                decoded = list(chapters)
+            else:
+                # Unchanged chapters come back with their earlier hashes
+                chapters, decoded = reload_chapters(self.path, self.chapters)
+        except (OSError, KnowledgeFileError) as e:
+            print(f"重新加载知识文件失败: {e}")
+            return
+        decoded_points = {chapter: chapters[chapter][1] for chapter in decoded}
+        for chapter, points in decoded_points.items():
+            chapters[chapter] = (chapters[chapter][0], point_hashes(points))
+        changed = changed_points(self.chapters, chapters)
+        self.chapters = chapters
+        if notify and changed:
+            print(
+                f"知识文件已更新: 重新解析 {len(decoded)} 个章节，"
+                f"{len(changed)} 个知识点有变化"
+            )
+            try:
+                self.on_change(
+                    {
+                        chapter: hashes.keys()
+                        for chapter, (_, hashes) in chapters.items()
+                    },
+                    decoded_points,
+                    changed,
+                )
+            except Exception as e:
+                # Keep watching, and send the whole file with the next edit
+                # as this change was not applied
+                print(f"应用知识文件更新失败: {e}")
+                self.chapters = {}
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+
+import pygame
+
+# Bumped whenever the recording format changes
+RECORDING_FORMAT_VERSION = 1
+
+
+def deck_digest(knowledge_list):
+    """
+    Get a digest identifying a deck by its knowledge point titles.
+
+    Args:
+        knowledge_list (list): The knowledge point titles in deck order.
+
+    Returns:
+        str: The hexadecimal digest.
+    """
+    digest = hashlib.sha1()
+    for knowledge in knowledge_list:
+        digest.update(knowledge.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class InputRecording:
+    """
+    A recorded rain session: the random seed and settings it started with,
+    the time step of every animation frame, and every input event handled,
+    stamped with the number of frames animated before it.
+
+    Replaying the events at their frames with the recorded time steps
+    reproduces the session exactly, at any speed.
+
+    Attributes:
+        seed (int): The seed of the engine's random number generator.
+        speed (float): The fall speed at the start of the session.
+        density (int): The density at the start of the session.
+        size (tuple): The window size.
+        deck (str): The digest of the deck, see deck_digest.
+        search (str): The search query at the start of the session.
+        frame_times (list): The time step in seconds of each frame.
+        events (list): [frame, event type, event attributes] entries.
+    """
+
+    def __init__(self, seed, speed, density, size, deck, search=""):
+        """
+        Initialize an empty recording.
+
+        Args:
+            seed (int): The seed of the engine's random number generator.
+            speed (float): The fall speed at the start of the session.
+            density (int): The density at the start of the session.
+            size (tuple): The window size.
+            deck (str): The digest of the deck.
+            search (str): The search query at the start of the session.
+        """
+        self.seed = seed
+        self.speed = speed
+        self.density = density
+        self.size = tuple(size)
+        self.deck = deck
+        self.search = search
+        self.frame_times = []
+        self.events = []
+
+    @property
+    def frame_count(self):
+        """The number of recorded frames."""
+        return len(self.frame_times)
+
+    def record_frame(self, dt):
+        """
+        Record an animation frame.
+
+        Args:
+            dt (float): The time step of the frame in seconds.
+        """
+        self.frame_times.append(dt)
+
+    def record_event(self, event):
+        """
+        Record an input event handled before the next frame.
+
+        Args:
+            event (pygame.event.Event): The event.
+        """
+        attributes = {
+            name: list(value) if isinstance(value, tuple) else value
+            for name, value in event.dict.items()
+            if isinstance(value, (int, float, str, tuple))
+        }
+        self.events.append([self.frame_count, event.type, attributes])
+
+    def events_by_frame(self):
+        """
+        Rebuild the recorded events, grouped by the frame they precede.
+
+        Returns:
+            dict: The list of pygame events of each frame.
+        """
+        grouped = {}
+        for frame, event_type, attributes in self.events:
+            attributes = {
+                name: tuple(value) if isinstance(value, list) else value
+                for name, value in attributes.items()
+            }
+            grouped.setdefault(frame, []).append(
+                pygame.event.Event(event_type, attributes)
+            )
+        return grouped
+
+    def save(self, path):
+        """
+        Write the recording to a JSON file.
+
+        Args:
+            path (str): The path of the recording file.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        recording = {
+            "version": RECORDING_FORMAT_VERSION,
+            "pygame": pygame.version.ver,
+            "seed": self.seed,
+            "speed": self.speed,
+            "density": self.density,
+            "size": list(self.size),
+            "deck": self.deck,
+            "search": self.search,
+            "frame_times": self.frame_times,
+            "events": self.events,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(recording, f)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a recording from a JSON file.
+
+        Args:
+            path (str): The path of the recording file.
+
+        Returns:
+            InputRecording: The recording.
+
+        Raises:
+            ValueError: If the file was written by another recording format.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != RECORDING_FORMAT_VERSION:
+            raise ValueError(f"Unsupported recording version: {data.get('version')}")
+        recording = cls(
+            data["seed"],
+            data["speed"],
+            data["density"],
+            data["size"],
+            data["deck"],
+            data.get("search", ""),
+        )
+        recording.frame_times = data["frame_times"]
+        recording.events = data["events"]
+        return recording
@@ -0,0 +1,373 @@
+import codecs
+import hashlib
+import json
+import mmap
+import re
+
+WHITESPACE = re.compile(rb"[ \t\n\r]*")
+STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+UTF8_BOM = b"\xef\xbb\xbf"
+# A chapter object of strings, matched without decoding it to find where it
+# ends. The syntax is only loosely checked, decoding validates it
+CHAPTER_OBJECT = re.compile(
+    rb'\{(?:[ \t\n\r]*(?:"[^"\\]*(?:\\.[^"\\]*)*"|[:,]))*[ \t\n\r]*\}'
+)
+# Minimum size in bytes of the window decoded for a chapter
+CHAPTER_WINDOW = 64 * 1024
+
+
+class KnowledgeFileError(ValueError):
+    """
+    An error in the syntax or structure of a knowledge JSON file.
+
+    Attributes:
+        reason (str): The description of the problem.
+        position (int): The byte offset of the problem in the file.
+        line (int): The 1-based line of the problem.
+        column (int): The 1-based column (in bytes) of the problem.
+        chapter (str): The chapter being parsed, if any.
+    """
+
+    def __init__(self, reason, buffer, position, chapter=None):
+        """
+        Initialize the error and locate it in the file.
+
+        Args:
+            reason (str): The description of the problem.
+            buffer (mmap.mmap): The file contents.
+            position (int): The byte offset of the problem.
+            chapter (str): The chapter being parsed, if any.
+        """
+        self.reason = reason
+        self.position = position
+        self.chapter = chapter
+        self.line = buffer[:position].count(b"\n") + 1
+        self.column = position - (buffer.rfind(b"\n", 0, position) + 1) + 1
+        location = f"第{self.line}行第{self.column}列"
+        if chapter is not None:
+            location += f" (章节 '{chapter}')"
+        super().__init__(f"{location}: {reason}")
+
+
+class ChapterStream:
+    """
+    An incremental parser for knowledge JSON files of the form
+    ``{"chapter": {"knowledge point": "explanation", ...}, ...}``.
+
+    The top-level object is scanned directly on the memory-mapped bytes and
+    each chapter is decoded and validated on its own as soon as its end is
+    found, so the first chapters are available before the rest of the file
+    is parsed and no second validation pass is needed.
+    """
+
+    def __init__(self, buffer):
+        """
+        Initialize the parser.
+
+        Args:
+            buffer (mmap.mmap): The file contents.
+        """
+        self.buffer = buffer
+        self.position = 0
+        self.decoder = json.JSONDecoder()
+        self.last_chapter_size = 0
+
+    def error(self, reason, position=None, chapter=None):
+        """
+        Build an error located at a position of the file.
+
+        Args:
+            reason (str): The description of the problem.
+            position (int): The byte offset, defaults to the current one.
+            chapter (str): The chapter being parsed, if any.
+
+        Returns:
+            KnowledgeFileError: The error.
+        """
+        if position is None:
+            position = self.position
+        return KnowledgeFileError(reason, self.buffer, position, chapter)
+
+    def skip_whitespace(self):
+        """
+        Move past any whitespace.
+        """
+        self.position = WHITESPACE.match(self.buffer, self.position).end()
+
+    def expect(self, token, reason):
+        """
+        Consume a single-byte token after optional whitespace.
+
+        Args:
+            token (bytes): The expected token.
+            reason (str): The error description if the token is missing.
+
+        Raises:
+            KnowledgeFileError: If the token is not found.
+        """
+        self.skip_whitespace()
+        if self.buffer[self.position : self.position + 1] != token:
+            raise self.error(reason)
+        self.position += 1
+
+    def peek(self):
+        """
+        Get the next non-whitespace byte without consuming it.
+
+        Returns:
+            bytes: The next byte, or b"" at the end of the file.
+        """
+        self.skip_whitespace()
+        return self.buffer[self.position : self.position + 1]
+
+    def read_string(self):
+        """
+        Read a JSON string at the current position.
+
+        Returns:
+            str: The decoded string.
+
+        Raises:
+            KnowledgeFileError: If no valid string is found.
+        """
+        match = STRING.match(self.buffer, self.position)
+        if not match:
+            raise self.error("需要一个带双引号的字符串")
+        try:
+            value = json.loads(match.group().decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise self.error(f"字符串无效: {e}")
+        self.position = match.end()
+        return value
+
+    def read_chapter(self, chapter):
+        """
+        Read and validate the knowledge points of a chapter.
+
+        Only a window of the file starting at the chapter is decoded and
+        handed to the C JSON scanner. The window is sized from the previous
+        chapter, which is usually similar, and doubled until the chapter
+        fits in it.
+
+        Args:
+            chapter (str): The chapter title.
+
+        Returns:
+            dict: The knowledge points and their explanations.
+
+        Raises:
+            KnowledgeFileError: If the chapter is not an object of strings.
+        """
+        if self.peek() != b"{":
+            raise self.error(f"章节 '{chapter}' 的内容必须是对象", chapter=chapter)
+        start = self.position
+        window_size = CHAPTER_WINDOW + self.last_chapter_size * 5 // 4
+        while True:
+            window = self.buffer[start : start + window_size]
+            at_end = start + window_size >= len(self.buffer)
+            try:
+                # A window may end inside a multi-byte character
+                text = codecs.getincrementaldecoder("utf-8")().decode(
+                    window, final=at_end
+                )
+            except UnicodeDecodeError as e:
+                raise self.error("文件不是有效的UTF-8编码", start + e.start, chapter)
+            try:
+                points, end = self.decoder.raw_decode(text)
+                break
+            except json.JSONDecodeError as e:
+                if at_end:
+                    offset = start + len(text[: e.pos].encode("utf-8"))
+                    raise self.error(e.msg, offset, chapter)
+                window_size *= 2
+
+        for point, detail in points.items():
+            if not isinstance(detail, str):
+                raise self.error(
+                    f"知识点 '{point}' 的详情必须是字符串", start, chapter
+                )
+        self.last_chapter_size = len(text[:end].encode("utf-8"))
+        self.position = start + self.last_chapter_size
+        return points
+
+    def __iter__(self):
+        """
+        Parse the file chapter by chapter.
+
+        Yields:
+            tuple: (chapter title, knowledge points dict) in file order.
+
+        Raises:
+            KnowledgeFileError: If the file is not a valid knowledge file.
+        """
+        if self.buffer[:3] == UTF8_BOM:
+            self.position = 3
+        self.expect(b"{", "文件内容必须是一个JSON对象")
+        if self.peek() == b"}":
+            self.position += 1
+        else:
+            while True:
+                self.skip_whitespace()
+                chapter = self.read_string()
+                self.expect(b":", "章节名称后需要冒号")
+                yield chapter, self.read_chapter(chapter)
+                if self.peek() == b",":
+                    self.position += 1
+                    continue
+                self.expect(b"}", "章节之间需要逗号")
+                break
+        if self.peek():
+            raise self.error("JSON对象之后有多余的内容")
+
+
+def chapter_digest(data):
+    """
+    Get the digest identifying the contents of a chapter.
+
+    Args:
+        data (bytes): The chapter object as written in the file.
+
+    Returns:
+        str: The hexadecimal digest.
+    """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class IncrementalChapterStream(ChapterStream):
+    """
+    A ChapterStream that re-reads an edited knowledge file, decoding only the
+    chapters whose bytes changed since an earlier read.
+
+    Each chapter's extent is found with a single regular expression match
+    and its bytes are hashed; chapters whose digest is unchanged reuse what
+    was kept of the earlier read, usually their knowledge points.
+
+    Attributes:
+        known (dict): The (digest, knowledge points) of each chapter of the
+                      earlier read, or any other value kept in place of the
+                      knowledge points.
+        digests (dict): The digest of each chapter read so far.
+        decoded (list): The chapters that had to be decoded.
+    """
+
+    def __init__(self, buffer, known):
+        """
+        Initialize the parser.
+
+        Args:
+            buffer (mmap.mmap): The file contents.
+            known (dict): The (digest, knowledge points) of each chapter of
+                          the earlier read.
+        """
+        super().__init__(buffer)
+        self.known = known
+        self.digests = {}
+        self.decoded = []
+
+    def read_chapter(self, chapter):
+        """
+        Read a chapter, reusing its earlier value if its bytes are
+        unchanged.
+
+        Args:
+            chapter (str): The chapter title.
+
+        Returns:
+            dict: The knowledge points and their explanations.
+
+        Raises:
+            KnowledgeFileError: If the chapter is not an object of strings.
+        """
+        self.skip_whitespace()
+        start = self.position
+        match = CHAPTER_OBJECT.match(self.buffer, start)
+        if match:
+            digest = chapter_digest(match.group())
+            previous = self.known.get(chapter)
+            if previous is not None and previous[0] == digest:
+                self.position = match.end()
+                self.digests[chapter] = digest
+                return previous[1]
+        points = super().read_chapter(chapter)
+        self.digests[chapter] = chapter_digest(self.buffer[start : self.position])
+        self.decoded.append(chapter)
+        return points
+
+
+def iter_chapters(path, progress=None):
+    """
+    Stream the chapters of a knowledge JSON file through a memory map.
+
+    Args:
+        path (str): The path to the knowledge JSON file.
+        progress (callable): Optional function called after each chapter
+                             with the fraction of the file parsed and the
+                             chapter title.
+
+    Yields:
+        tuple: (chapter title, knowledge points dict) in file order.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        KnowledgeFileError: If the file is not a valid knowledge file.
+    """
+    with open(path, "rb") as file:
+        try:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be memory-mapped
+            raise KnowledgeFileError("文件为空", b"", 0) from None
+        with buffer:
+            stream = ChapterStream(buffer)
+            for chapter, knowledge_points in stream:
+                if progress:
+                    progress(stream.position / len(buffer), chapter)
+                yield chapter, knowledge_points
+
+
+def load_chapters(path):
+    """
+    Load and validate all chapters of a knowledge JSON file.
+
+    Args:
+        path (str): The path to the knowledge JSON file.
+
+    Returns:
+        dict: The chapters and their knowledge points.
+    """
+    return dict(iter_chapters(path))
+
+
+def reload_chapters(path, known):
+    """
+    Read a knowledge JSON file again after it changed, decoding only the
+    chapters whose contents changed.
+
+    Args:
+        path (str): The path to the knowledge JSON file.
+        known (dict): The (digest, knowledge points) of each chapter of the
+                      earlier read, empty to read every chapter. Unchanged
+                      chapters are returned with the value kept in known,
+                      which need not be their knowledge points.
+
+    Returns:
+        tuple: (chapters, decoded) where chapters maps each chapter title to
+        its (digest, knowledge points) in file order and decoded lists the
+        chapters that were decoded.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        KnowledgeFileError: If the file is not a valid knowledge file.
+    """
+    with open(path, "rb") as file:
+        try:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise KnowledgeFileError("文件为空", b"", 0) from None
+        with buffer:
+            stream = IncrementalChapterStream(buffer, known)
+            chapters = {
+                chapter: (stream.digests[chapter], knowledge_points)
+                for chapter, knowledge_points in stream
+            }
+    return chapters, stream.decoded
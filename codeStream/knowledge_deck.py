@@ -0,0 +1,264 @@
+import os
+import pathlib
+import sqlite3
+import tempfile
+import threading
+from collections.abc import Mapping
+
+# Bumped whenever the compiled deck schema changes
+DECK_FORMAT_VERSION = "1"
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE chapters (id INTEGER PRIMARY KEY, title TEXT NOT NULL);
+CREATE TABLE points (
+    id INTEGER PRIMARY KEY,
+    chapter_id INTEGER NOT NULL REFERENCES chapters (id),
+    title TEXT NOT NULL,
+    explanation TEXT NOT NULL
+);
+CREATE INDEX points_chapter ON points (chapter_id, id);
+"""
+
+
+def compiled_deck_path(json_path, suffix):
+    """
+    Get the path of the compiled deck for a JSON knowledge file.
+
+    Args:
+        json_path (str): The path to the JSON knowledge file.
+        suffix (str): The file suffix of compiled decks.
+
+    Returns:
+        str: The compiled deck path next to the JSON file.
+    """
+    return os.path.splitext(json_path)[0] + suffix
+
+
+def source_signature(json_path):
+    """
+    Get the size and modification time identifying a version of a file.
+
+    Args:
+        json_path (str): The path to the source file.
+
+    Returns:
+        dict: The source size and modification time as strings.
+    """
+    stat = os.stat(json_path)
+    return {"source_size": str(stat.st_size), "source_mtime": str(stat.st_mtime_ns)}
+
+
+def is_deck_current(deck_path, json_path):
+    """
+    Check whether a compiled deck exists and matches its JSON source.
+
+    Args:
+        deck_path (str): The path to the compiled deck.
+        json_path (str): The path to the JSON knowledge file.
+
+    Returns:
+        bool: True if the compiled deck can be used as is.
+    """
+    if not os.path.exists(deck_path):
+        return False
+    try:
+        deck_uri = pathlib.Path(deck_path).resolve().as_uri() + "?mode=ro"
+        connection = sqlite3.connect(deck_uri, uri=True)
+        try:
+            meta = dict(connection.execute("SELECT key, value FROM meta"))
+        finally:
+            connection.close()
+    except sqlite3.Error:
+        return False
+    expected = dict(source_signature(json_path), version=DECK_FORMAT_VERSION)
+    return all(meta.get(key) == value for key, value in expected.items())
+
+
+def compile_deck(chapters, deck_path, json_path=None):
+    """
+    Compile knowledge chapters into an indexed SQLite deck.
+
+    The deck is written to a temporary file and moved into place, so a
+    reader never sees a partially written deck. Each compile has its own
+    temporary file, so a cancelled compile of the same file still running
+    does not interfere.
+
+    Args:
+        chapters (iterable): (chapter title, knowledge points dict) pairs,
+                             e.g. streamed by json_stream.iter_chapters.
+        deck_path (str): The path of the compiled deck to write.
+        json_path (str): Optional path of the JSON source, recorded so
+                         stale decks can be detected.
+    """
+    fd, temp_path = tempfile.mkstemp(
+        prefix=os.path.basename(deck_path) + ".",
+        suffix=".tmp",
+        dir=os.path.dirname(deck_path) or ".",
+    )
+    os.close(fd)
+    connection = sqlite3.connect(temp_path)
+    try:
+        connection.executescript(SCHEMA)
+        for chapter_id, (chapter, knowledge_points) in enumerate(chapters):
+            connection.execute(
+                "INSERT INTO chapters (id, title) VALUES (?, ?)", (chapter_id, chapter)
+            )
+            connection.executemany(
+                "INSERT INTO points (chapter_id, title, explanation) VALUES (?, ?, ?)",
+                (
+                    (chapter_id, point, detail)
+                    for point, detail in knowledge_points.items()
+                ),
+            )
+        meta = {"version": DECK_FORMAT_VERSION}
+        if json_path:
+            meta.update(source_signature(json_path))
+        connection.executemany("INSERT INTO meta VALUES (?, ?)", meta.items())
+        connection.commit()
+    except BaseException:
+        connection.close()
+        os.remove(temp_path)
+        raise
+    connection.close()
+    os.replace(temp_path, deck_path)
+
+
+class KnowledgeDeck(Mapping):
+    """
+    A compiled knowledge deck, read lazily from SQLite.
+
+    The deck is a mapping of chapter titles to DeckChapter mappings. Only
+    chapter titles and knowledge point titles are loaded when the deck is
+    opened; explanations are fetched by row id when they are accessed.
+    """
+
+    def __init__(self, deck_path):
+        """
+        Open a compiled deck and load its chapter titles.
+
+        Args:
+            deck_path (str): The path to the compiled deck.
+        """
+        self.deck_path = deck_path
+        # Explanations may be read from background threads (e.g. when
+        # pre-wrapping), so the connection is shared behind a lock
+        self.connection = sqlite3.connect(deck_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.chapter_ids = {
+                title: chapter_id
+                for chapter_id, title in self.connection.execute(
+                    "SELECT id, title FROM chapters ORDER BY id"
+                )
+            }
+        self.loaded_chapters = {}
+
+    def __getitem__(self, chapter):
+        chapter_id = self.chapter_ids[chapter]
+        if chapter not in self.loaded_chapters:
+            self.loaded_chapters[chapter] = DeckChapter(
+                self,
+                self.query(
+                    "SELECT title, id FROM points WHERE chapter_id = ? ORDER BY id",
+                    (chapter_id,),
+                ),
+            )
+        return self.loaded_chapters[chapter]
+
+    def __iter__(self):
+        return iter(self.chapter_ids)
+
+    def __len__(self):
+        return len(self.chapter_ids)
+
+    def query(self, sql, parameters=()):
+        """
+        Run a query on the deck.
+
+        Args:
+            sql (str): The SQL query.
+            parameters (tuple): The query parameters.
+
+        Returns:
+            list: The result rows.
+        """
+        with self.lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+    def all_points(self):
+        """
+        Get the knowledge points of every chapter as a single mapping.
+
+        Returns:
+            DeckChapter: The knowledge points of the whole deck. When a title
+            appears in several chapters, the last one wins.
+        """
+        rows = self.query("SELECT title, id FROM points ORDER BY id")
+        return DeckChapter(self, rows)
+
+    def point_chapters(self):
+        """
+        Get the chapter of every knowledge point.
+
+        Returns:
+            dict: The chapter title of each knowledge point title. When a
+            title appears in several chapters, the last one wins, as in
+            all_points.
+        """
+        return dict(
+            self.query(
+                "SELECT points.title, chapters.title FROM points "
+                "JOIN chapters ON chapters.id = points.chapter_id ORDER BY points.id"
+            )
+        )
+
+    def explanation(self, point_id):
+        """
+        Fetch the explanation of a knowledge point.
+
+        Args:
+            point_id (int): The row id of the knowledge point.
+
+        Returns:
+            str: The explanation.
+        """
+        rows = self.query("SELECT explanation FROM points WHERE id = ?", (point_id,))
+        return rows[0][0]
+
+    def close(self):
+        """
+        Close the deck's database connection.
+        """
+        with self.lock:
+            self.connection.close()
+
+
+class DeckChapter(Mapping):
+    """
+    A mapping of knowledge point titles to explanations whose explanations
+    are fetched from the deck on access.
+    """
+
+    def __init__(self, deck, rows):
+        """
+        Initialize the DeckChapter.
+
+        Args:
+            deck (KnowledgeDeck): The deck the chapter belongs to.
+            rows (iterable): (knowledge point title, row id) pairs in order.
+        """
+        self.deck = deck
+        self.point_ids = dict(rows)
+
+    def __getitem__(self, knowledge):
+        return self.deck.explanation(self.point_ids[knowledge])
+
+    def __iter__(self):
+        return iter(self.point_ids)
+
+    def __len__(self):
+        return len(self.point_ids)
+
+    def __contains__(self, knowledge):
+        return knowledge in self.point_ids
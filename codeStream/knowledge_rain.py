@@ -1,8 +1,60 @@
+import functools
+import numpy as np
 import pygame
 import random
-import sys
+import threading
+import time
 import pygame.freetype
 from codeStream import config
+from codeStream.deck_cache import DeckCache, measure_titles
+from codeStream.font_cache import get_font_cache
+from codeStream.frame_profiler import FrameProfiler
+from codeStream.input_recording import InputRecording, deck_digest
+from pygame._sdl2.video import Window
+from codeStream.knowledge_scheduler import create_scheduler
+from codeStream.occupancy_grid import OccupancyGrid
+from codeStream.raindrop_store import RaindropStore
+from codeStream.search_index import SearchIndex
+from codeStream.spatial_index import SpatialGrid
+from codeStream.text_atlas import TextAtlas
+from codeStream.text_cache import TextSurfaceCache
+from codeStream.text_layout import TextWrapper
+from codeStream.texture_renderer import TextureRenderer
+
+# Posted with an edited deck to swap it into the running rain, see
+# KnowledgeRain.post_deck_update
+DECK_UPDATED = pygame.event.custom_type()
+
+# Posted with the search index of the deck once it is built on a background
+# thread, see KnowledgeRain.index_deck
+SEARCH_INDEXED = pygame.event.custom_type()
+
+
+def init_pygame():
+    """
+    Initialize pygame, reusing the modules already initialized by an
+    earlier run. Only the display is closed between runs.
+    """
+    if not pygame.get_init():
+        pygame.init()
+    if not pygame.display.get_init():
+        pygame.display.init()
+
+
+@functools.lru_cache(maxsize=None)
+def load_font(size):
+    """
+    Load the knowledge rain font at a size, once per process.
+
+    Args:
+        size (int): The font size in points.
+
+    Returns:
+        pygame.freetype.Font: The configured system font, or the default
+        font if it is not installed.
+    """
+    font_path = get_font_cache(config.FONT_CACHE_FILE_PATH).resolve(config.FONT_NAME)
+    return pygame.freetype.Font(font_path, size)
 
 
 class KnowledgeRain:
@@ -11,30 +63,80 @@ class KnowledgeRain:
 
     This class handles the creation, movement, and display of knowledge points
     falling from the top of the screen, as well as user interactions.
+
+    A KnowledgeRain is a long-lived engine: the window, fonts and caches are
+    set up once, decks are swapped with load_deck, and start runs the rain
+    until stop is called. The window is hidden between runs and destroyed
+    by close.
+
+    Additional windows, e.g. one per monitor, are added with add_output.
+    Each output is a KnowledgeRain with its own window and raindrops that
+    shares the deck, text caches, knowledge scheduler, clock and random
+    generator of its primary engine, which runs all of them from one loop.
     """
 
-    def __init__(self, width, height, knowledge_points, fullscreen=False):
+    def __init__(
+        self,
+        width,
+        height,
+        knowledge_points=None,
+        fullscreen=False,
+        seed=None,
+        display=None,
+        primary=None,
+    ):
         """
         Initialize the KnowledgeRain game.
 
         Args:
             width (int): The width of the game window.
             height (int): The height of the game window.
-            knowledge_points (dict): A dictionary of knowledge points and
-                                     their explanations.
+            knowledge_points (dict): Optional dictionary of knowledge points
+                                     and their explanations to load.
             fullscreen (bool): Whether to run the game in fullscreen mode.
+            seed (int): Optional seed of the engine's random number
+                        generator, random if None.
+            display (int): Optional index of the display to open the window
+                           on.
+            primary (KnowledgeRain): The engine this one is an additional
+                                     output of, see add_output.
+
+        Raises:
+            pygame.error: If the window of an additional output cannot be
+                          opened.
         """
-        pygame.init()
+        init_pygame()
         self.width = width
         self.height = height
         self.fullscreen = fullscreen
-        if self.fullscreen:
-            self.screen = pygame.display.set_mode(
-                (self.width, self.height), pygame.FULLSCREEN
-            )
+        self.primary = primary
+        self.outputs = []
+        self.frame_rate_mode = config.FRAME_RATE_MODE
+        caption = "考研知识代码流，你的无聊陪伴助手"
+        self.texture_renderer = None
+        # pygame.display has a single window, so additional outputs are
+        # always drawn with the SDL renderer
+        if config.RENDERER == "hardware" or primary is not None:
+            try:
+                self.texture_renderer = TextureRenderer(
+                    caption,
+                    (self.width, self.height),
+                    fullscreen=self.fullscreen,
+                    vsync=self.frame_rate_mode == "vsync",
+                    display=display,
+                )
+            except pygame.error:
+                if primary is not None:
+                    raise
+                print("硬件渲染不可用，改用软件渲染")
+        if self.texture_renderer is not None:
+            self.window = self.texture_renderer.window
+            # Views drawn in software, such as the detail view, are drawn on
+            # a back buffer and uploaded whole
+            self.screen = pygame.Surface((self.width, self.height))
         else:
-            self.screen = pygame.display.set_mode((self.width, self.height))
-        pygame.display.set_caption("考研知识代码流，你的无聊陪伴助手")
+            self.open_display(caption, display)
+        self.running = False
 
         # Define colors
         self.BLACK = config.BLACK
@@ -42,38 +144,525 @@ class KnowledgeRain:
         self.WHITE = config.WHITE
 
         # Set up fonts
-        self.font = (
-            pygame.freetype.SysFont("simsun", config.FONT_SIZE)
-            if "simsun" in pygame.freetype.get_fonts()
-            else pygame.freetype.Font(None, config.FONT_SIZE)
-        )
-        self.large_font = (
-            pygame.freetype.SysFont("simsun", config.LARGE_FONT_SIZE)
-            if "simsun" in pygame.freetype.get_fonts()
-            else pygame.freetype.Font(None, config.LARGE_FONT_SIZE)
-        )
+        self.font = load_font(config.FONT_SIZE)
+        self.large_font = load_font(config.LARGE_FONT_SIZE)
+
+        # Cache rendered text surfaces to avoid re-rendering every frame
+        if primary is not None:
+            self.text_cache = primary.text_cache
+        else:
+            self.text_cache = TextSurfaceCache(
+                config.TEXT_CACHE_MAX_ENTRIES, config.TEXT_CACHE_MAX_BYTES
+            )
+
+        self.clock = primary.clock if primary is not None else pygame.time.Clock()
+        self.target_fps = config.CLOCK_TICK
+        self.missed_frames = 0
+        self.fast_frames = 0
+
+        # Per-phase frame timings, shown by the HUD. The phases of all
+        # outputs add up in the primary's profiler
+        if primary is not None:
+            self.profiler = primary.profiler
+        else:
+            self.profiler = FrameProfiler(config.FRAME_PROFILE_FRAMES)
+        self.show_hud = False
+        self.hud_surface = None
 
-        self.clock = pygame.time.Clock()
+        # All randomness of the simulation comes from this generator, so a
+        # session can be reproduced from its seed, see replay
+        self.rng = primary.rng if primary is not None else random.Random(seed)
+        self.recording = None
+
+        # Knowledge points opened in the detail view are logged to the
+        # primary's study log with their chapter, see log_detail_view
+        self.study_log = None
+        self.study_chapters = {}
 
         # Initialize game variables
-        self.raindrops = []
-        self.speed = 2
-        self.density = 10
-        self.paused = False
+        self.speed = primary.speed if primary is not None else config.SPEED_DEFAULT
+        self.density = primary.density if primary is not None else 10
 
         # Set up grid for managing raindrop positions
         self.grid_size = config.FONT_SIZE * 2
         self.grid_width = self.width // self.grid_size
         self.grid_height = self.height // self.grid_size
-        self.grid = [
-            [False for _ in range(self.grid_height)] for _ in range(self.grid_width)
-        ]
 
+        # Wrapped explanations are kept across decks
+        if primary is not None:
+            self.wrapper = primary.wrapper
+        else:
+            self.wrapper = TextWrapper(self.font, config.TEXT_LAYOUT_MAX_ENTRIES)
+
+        # Rendered sizes of titles, measured without rendering them and
+        # cached across launches, see load_title_sizes. Outputs use the
+        # primary's
+        self.title_sizes = {}
+        self.title_sizes_generation = 0
+
+        # Pre-rendered titles of the current deck, see config.TEXT_ATLAS,
+        # and the atlas being built for an edited deck
+        self.atlas = None
+        self.next_atlas = None
+
+        # Search over the deck, see search. Only the primary engine shows
+        # the prompt and filters the shared scheduler. The index is built
+        # on a background thread, and each deck gets a new generation so
+        # indexes of earlier decks are dropped
+        self.search_index = None
+        self.search_index_generation = 0
+        self.search_indexing = False
+        self.search_text = ""
+        self.search_matches = None
+        self.search_open = False
+        self.search_surface = None
+
+        if primary is not None:
+            self.share_deck()
+            self.reset()
+            return
+        self.load_deck(knowledge_points or {})
+        for output in config.EXTRA_OUTPUTS:
+            width, height = output.get("size", (self.width, self.height))
+            self.add_output(
+                width,
+                height,
+                display=output.get("display"),
+                fullscreen=output.get("fullscreen", False),
+            )
+
+    def add_output(self, width, height, display=None, fullscreen=False):
+        """
+        Open an additional rain window driven by this engine's loop.
+
+        The output shows the same deck from the same scheduler, so a
+        knowledge point falls on at most one screen at a time, and reuses
+        the rendered text, wrapped explanations and text atlas; each extra
+        screen only adds its window, textures and raindrops.
+
+        Args:
+            width (int): The width of the window.
+            height (int): The height of the window.
+            display (int): Optional index of the display to open the window
+                           on.
+            fullscreen (bool): Whether to open the window in fullscreen mode.
+
+        Returns:
+            KnowledgeRain: The new output, or None if its window could not
+            be opened.
+        """
+        try:
+            output = KnowledgeRain(
+                width, height, fullscreen=fullscreen, display=display, primary=self
+            )
+        except pygame.error as e:
+            print(f"无法打开额外的知识雨窗口: {e}")
+            return None
+        self.outputs.append(output)
+        return output
+
+    def get_screens(self):
+        """
+        Get the engines drawing to a window in this engine's loop.
+
+        Returns:
+            list: This engine followed by its additional outputs.
+        """
+        return [self] + self.outputs
+
+    def load_deck(self, knowledge_points, search_index=None):
+        """
+        Replace the knowledge points with a new deck, clearing the raindrops
+        on screen. The window, fonts and caches are kept.
+
+        Args:
+            knowledge_points (dict): A dictionary of knowledge points and
+                                     their explanations.
+            search_index (SearchIndex): Optional search index covering the
+                                        deck, e.g. of every chapter, built
+                                        in the background when first
+                                        searched otherwise.
+        """
         # Set up knowledge points
         self.knowledge_points = knowledge_points
         self.knowledge_list = list(self.knowledge_points.keys())
-        self.knowledge_index = 0
-        self.active_knowledge = set()
+        # Raindrops refer to their knowledge point by its index in the list
+        self.knowledge_ids = {
+            knowledge: index for index, knowledge in enumerate(self.knowledge_list)
+        }
+        self.set_search_index(search_index)
+        self.match_search(self.search_text)
+        self.reset()
+
+        # Wrap explanations ahead of time so the detail view opens instantly
+        self.wrapper.prewrap(
+            self.knowledge_points, self.width - config.TEXT_MAX_WIDTH_OFFSET
+        )
+
+        self.load_title_sizes()
+        self.cancel_atlas()
+        if config.TEXT_ATLAS:
+            self.atlas = TextAtlas(config.TEXT_ATLAS_PAGE_SIZE)
+            self.atlas.build_async(self.font, self.knowledge_list, self.GREEN)
+        for output in self.outputs:
+            output.share_deck()
+
+    def update_deck(self, knowledge_points, changed=()):
+        """
+        Swap an edited version of the deck in without restarting the
+        animation.
+
+        Raindrops of knowledge points still in the deck keep falling and the
+        others are removed. Only the wrapped explanations of changed points
+        and the rendered titles of removed points are dropped from the
+        caches. With the text atlas, titles are drawn from the text cache
+        until the atlas of the new deck is built.
+
+        Args:
+            knowledge_points (dict): The knowledge points of the edited deck
+                                     and their explanations.
+            changed (set): The knowledge points added, removed or edited.
+        """
+        old_list = self.knowledge_list
+        self.knowledge_points = knowledge_points
+        self.knowledge_list = list(self.knowledge_points.keys())
+        self.knowledge_ids = {
+            knowledge: index for index, knowledge in enumerate(self.knowledge_list)
+        }
+        changed = set(changed)
+        self.wrapper.invalidate(changed)
+        self.text_cache.invalidate(changed.difference(self.knowledge_ids))
+        self.load_title_sizes()
+        self.cancel_atlas()
+        for output in self.outputs:
+            output.share_deck()
+
+        for screen in self.get_screens():
+            screen.remap_raindrops(old_list)
+        # Until the edited deck is indexed, the matches of the old one stay
+        self.set_search_index(None)
+        self.match_search(self.search_text)
+        self.update_scheduler()
+
+        for screen in self.get_screens():
+            if screen.detail_knowledge is None:
+                continue
+            if screen.detail_knowledge not in self.knowledge_ids:
+                screen.close_detail()
+            elif screen.detail_knowledge in changed:
+                screen.detail_lines = self.wrapper.wrap(
+                    screen.detail_knowledge,
+                    self.knowledge_points[screen.detail_knowledge],
+                    screen.width - config.TEXT_MAX_WIDTH_OFFSET,
+                )
+                screen.scroll_detail(0)
+                screen.detail_dirty = True
+
+        self.wrapper.prewrap(
+            self.knowledge_points, self.width - config.TEXT_MAX_WIDTH_OFFSET
+        )
+        if config.TEXT_ATLAS:
+            self.next_atlas = TextAtlas(config.TEXT_ATLAS_PAGE_SIZE)
+            self.next_atlas.build_async(self.font, self.knowledge_list, self.GREEN)
+
+    def remap_raindrops(self, old_list):
+        """
+        Point the raindrops at the knowledge points of an edited deck,
+        removing those whose knowledge point is gone.
+
+        Args:
+            old_list (list): The knowledge points of the previous deck.
+        """
+        drops = self.raindrops
+        for slot in drops.active_slots():
+            knowledge = old_list[drops.text_id[slot]]
+            text_id = self.knowledge_ids.get(knowledge)
+            if text_id is None:
+                # The point left the deck, so it is not handed back to the
+                # scheduler
+                self.discard_raindrop(slot)
+            else:
+                drops.text_id[slot] = text_id
+
+    def update_scheduler(self):
+        """
+        Point the scheduler at the searched knowledge points of the deck
+        without clearing the screens, e.g. after the deck or the search
+        changed. The ordering state of the points that remain is kept, and
+        points on screen return to the scheduler when their raindrop leaves.
+        """
+        on_screen = set()
+        for screen in self.get_screens():
+            on_screen.update(
+                screen.get_drop_knowledge(slot)
+                for slot in screen.raindrops.active_slots()
+            )
+        self.scheduler.update_points(self.get_searched_knowledge(), on_screen)
+
+    def match_search(self, query):
+        """
+        Find the knowledge points matching a search query. The scheduler is
+        not changed, see search. If the deck is not indexed yet, indexing
+        starts and the earlier matches stay until it is done.
+
+        Args:
+            query (str): The search query, empty to match every point.
+        """
+        self.search_text = query
+        if not query.strip():
+            self.search_matches = None
+        elif self.search_index is None:
+            self.index_deck()
+        else:
+            # The index may cover more than the deck, e.g. every chapter
+            self.search_matches = self.search_index.search(query).intersection(
+                self.knowledge_ids
+            )
+
+    def set_search_index(self, search_index):
+        """
+        Use a search index for the current deck, dropping any index still
+        being built for it or an earlier deck.
+
+        Args:
+            search_index (SearchIndex): The index, or None to build one when
+                                        the deck is next searched.
+        """
+        self.search_index = search_index
+        self.search_index_generation += 1
+        self.search_indexing = False
+
+    def index_deck(self):
+        """
+        Build the search index of the deck on a background thread, unless
+        it is already being built. The main loop swaps it in and searches
+        again once it is posted.
+        """
+        if self.search_indexing:
+            return
+        self.search_indexing = True
+        generation = self.search_index_generation
+        knowledge_points = self.knowledge_points
+
+        def worker():
+            """Build the index and post it to the main loop."""
+            search_index = SearchIndex(knowledge_points)
+            try:
+                pygame.event.post(
+                    pygame.event.Event(
+                        SEARCH_INDEXED,
+                        search_index=search_index,
+                        generation=generation,
+                    )
+                )
+            except pygame.error:
+                # The rain was closed; the next search indexes the deck again
+                pass
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def ensure_search_index(self):
+        """
+        Index the deck now if it is not indexed yet. Recordings and replays
+        search with an index from their start, so their matches do not
+        depend on when a background build finishes.
+        """
+        if self.search_index is None:
+            self.set_search_index(SearchIndex(self.knowledge_points))
+
+    def on_search_indexed(self, search_index, generation):
+        """
+        Use a search index built by index_deck and search again, unless the
+        deck changed in the meantime.
+
+        Args:
+            search_index (SearchIndex): The index.
+            generation (int): The generation of the indexed deck.
+        """
+        if generation != self.search_index_generation:
+            return
+        self.set_search_index(search_index)
+        self.search(self.search_text)
+
+    def search(self, query):
+        """
+        Only let knowledge points matching a query fall from now on.
+        Raindrops already on screen keep falling.
+
+        Args:
+            query (str): The search query, empty to show every point.
+        """
+        self.match_search(query)
+        self.update_scheduler()
+        if self.search_open:
+            self.update_search_prompt()
+
+    def is_searched(self, knowledge):
+        """
+        Check whether a knowledge point matches the current search.
+
+        Args:
+            knowledge (str): The knowledge point.
+
+        Returns:
+            bool: True if it matches or no search is active.
+        """
+        matches = (self.primary or self).search_matches
+        return matches is None or knowledge in matches
+
+    def get_searched_knowledge(self):
+        """
+        Get the knowledge points matching the current search.
+
+        Returns:
+            list: The matching knowledge points in deck order.
+        """
+        if self.search_matches is None:
+            return self.knowledge_list
+        return [
+            knowledge
+            for knowledge in self.knowledge_list
+            if knowledge in self.search_matches
+        ]
+
+    def post_deck_update(self, knowledge_points, changed):
+        """
+        Hand an edited deck to the running rain. Safe to call from any
+        thread; the main loop swaps it in with update_deck.
+
+        Args:
+            knowledge_points (dict): The knowledge points of the edited deck
+                                     and their explanations.
+            changed (set): The knowledge points added, removed or edited.
+        """
+        pygame.event.post(
+            pygame.event.Event(
+                DECK_UPDATED, knowledge_points=knowledge_points, changed=changed
+            )
+        )
+
+    def load_title_sizes(self):
+        """
+        Load the sizes of the deck's titles from the deck cache on a
+        background thread. On a miss, the titles not measured yet are
+        measured and the sizes of the deck are cached for the next launch.
+        Until then, titles are measured by rendering them.
+        """
+        self.title_sizes_generation += 1
+        if not config.DECK_CACHE_DIR:
+            return
+        generation = self.title_sizes_generation
+        titles = self.knowledge_list
+        cache = DeckCache(config.DECK_CACHE_DIR, config.DECK_CACHE_MAX_BYTES)
+
+        def is_current():
+            """Whether the deck is still the one being measured."""
+            return self.title_sizes_generation == generation
+
+        def worker():
+            """Load or measure the sizes and publish them if still current."""
+            digest = deck_digest(titles)
+            sizes = cache.load_title_sizes(titles, digest, self.font)
+            if sizes is None:
+                known = self.title_sizes
+                missing = [title for title in titles if title not in known]
+                measured = measure_titles(self.font, missing, is_current)
+                if measured is None:
+                    return
+                sizes = {title: measured.get(title) or known[title] for title in titles}
+                cache.store_title_sizes(titles, digest, self.font, sizes)
+            if is_current():
+                self.title_sizes = sizes
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def cancel_atlas(self):
+        """
+        Stop building and drop the text atlas of the current deck.
+        """
+        for atlas in (self.atlas, self.next_atlas):
+            if atlas is not None:
+                atlas.cancel()
+        self.atlas = None
+        self.next_atlas = None
+
+    def share_deck(self):
+        """
+        Show the primary engine's deck and text atlas on this output.
+        """
+        self.knowledge_points = self.primary.knowledge_points
+        self.knowledge_list = self.primary.knowledge_list
+        self.knowledge_ids = self.primary.knowledge_ids
+        self.atlas = self.primary.atlas
+
+    def reset(self):
+        """
+        Clear the raindrops and restart the scheduling of the current deck,
+        on this engine and its additional outputs.
+        """
+        self.raindrops = RaindropStore()
+        self.paused = False
+
+        # Screen rects drawn for each raindrop in the previous frame, used by
+        # the dirty-rect renderer
+        self.drawn_rects = {}
+        self.full_redraw = True
+
+        # Detail view state, active while detail_knowledge is set
+        self.detail_knowledge = None
+        self.detail_lines = []
+        self.detail_scroll = 0
+        self.detail_dirty = False
+        self.detail_opened = None
+
+        self.grid = OccupancyGrid(self.grid_width, self.grid_height)
+        if self.primary is not None:
+            self.scheduler = self.primary.scheduler
+        else:
+            self.scheduler = create_scheduler(
+                config.KNOWLEDGE_ORDER,
+                self.get_searched_knowledge(),
+                self.rng,
+                config.KNOWLEDGE_WEIGHTS,
+            )
+
+        # Index raindrop rects by slot for hit-testing and overlap checks
+        self.drop_index = SpatialGrid(
+            config.SPATIAL_INDEX_CELL_SIZE, get_rect=self.get_drop_rect
+        )
+
+        for output in self.outputs:
+            output.reset()
+
+    def open_display(self, caption, display=None):
+        """
+        Open the window through pygame.display for software rendering.
+
+        Args:
+            caption (str): The window title.
+            display (int): Optional index of the display to open the window
+                           on.
+        """
+        flags = pygame.FULLSCREEN if self.fullscreen else 0
+        display = display or 0
+        if self.frame_rate_mode == "vsync":
+            try:
+                # Vsync is only supported together with SCALED or OPENGL
+                self.screen = pygame.display.set_mode(
+                    (self.width, self.height),
+                    flags | pygame.SCALED,
+                    display=display,
+                    vsync=1,
+                )
+            except pygame.error:
+                print("垂直同步不可用，改用固定帧率")
+                self.frame_rate_mode = "capped"
+        if self.frame_rate_mode != "vsync":
+            self.screen = pygame.display.set_mode(
+                (self.width, self.height), flags, display=display
+            )
+        pygame.display.set_caption(caption)
+        self.window = Window.from_display_module()
 
     def get_text_width(self, text):
         """
@@ -85,24 +674,35 @@ class KnowledgeRain:
         Returns:
             int: The width of the text in pixels.
         """
-        return self.font.get_rect(text)[2]
+        # Measured from the drawn surface, so placement does not depend on
+        # whether the text atlas is ready yet
+        return self.get_text_size(text)[0]
+
+    def get_text_size(self, text):
+        """
+        Get the size of the rendered surface of a knowledge point title.
+
+        Args:
+            text (str): The knowledge point title.
+
+        Returns:
+            tuple: (width, height) in pixels.
+        """
+        size = (self.primary or self).title_sizes.get(text)
+        if size is not None:
+            return size
+        if self.atlas is not None and self.atlas.ready:
+            return self.atlas.lookup(text)[1].size
+        return self.text_cache.render(self.font, text, self.GREEN)[0].get_size()
 
     def get_next_knowledge(self):
         """
-        Get the next unused knowledge point from the list.
+        Get the next unused knowledge point from the scheduler.
 
         Returns:
             str: The next unused knowledge point, or None if all are in use.
         """
-        start_index = self.knowledge_index
-        while True:
-            knowledge = self.knowledge_list[self.knowledge_index]
-            self.knowledge_index = (self.knowledge_index + 1) % len(self.knowledge_list)
-            if knowledge not in self.active_knowledge:
-                return knowledge
-            if self.knowledge_index == start_index:
-                # If all knowledge points are on screen, return None
-                return None
+        return self.scheduler.acquire()
 
     def find_empty_cell(self, text_width):
         """
@@ -116,45 +716,89 @@ class KnowledgeRain:
             or None if no space found.
         """
         cells_needed = (text_width + self.grid_size - 1) // self.grid_size
-        start_x = random.randint(0, self.grid_width - cells_needed)
+        if cells_needed > self.grid_width:
+            return None
+        start_x = self.rng.randint(0, self.grid_width - cells_needed)
 
-        # Check from random start point to the right
-        for x in range(start_x, self.grid_width - cells_needed + 1):
-            if all(not self.grid[x + i][0] for i in range(cells_needed)):
-                return x, 0, cells_needed
+        # Take the first free run right of the random start point, wrapping
+        # around to the left
+        x = self.grid.find_free_run(0, cells_needed, start_x)
+        if x is None:
+            return None
+        return x, 0, cells_needed
 
-        # If not found, check from the left to the start point
-        for x in range(0, start_x):
-            if all(not self.grid[x + i][0] for i in range(cells_needed)):
-                return x, 0, cells_needed
+    def is_overlapping(self, slot):
+        """
+        Check if a raindrop overlaps with other ones.
 
-        return None
+        Args:
+            slot (int): The slot of the raindrop to check.
+
+        Returns:
+            bool: True if overlapping, False otherwise.
+        """
+        rect = self.get_drop_rect(slot)
+        return any(other != slot for other in self.drop_index.query_rect(rect))
 
-    def is_overlapping(self, new_drop):
+    def get_drop_rect(self, slot):
         """
-        Check if a new raindrop overlaps with existing ones.
+        Get the screen rect of a raindrop's rendered text.
 
         Args:
-            new_drop (list): The new raindrop to check.
+            slot (int): The raindrop slot.
 
         Returns:
-            bool: True if overlapping, False otherwise.
+            pygame.Rect: The rect of the raindrop's text.
         """
-        new_rect = self.font.get_rect(new_drop[3])
-        new_rect.topleft = (new_drop[0], new_drop[1])
-        for drop in self.raindrops:
-            existing_rect = self.font.get_rect(drop[3])
-            existing_rect.topleft = (drop[0], drop[1])
-            if new_rect.colliderect(existing_rect):
-                return True
-        return False
+        return pygame.Rect(self.raindrops.rect(slot))
+
+    def get_drop_knowledge(self, slot):
+        """
+        Get the knowledge point shown by a raindrop.
+
+        Args:
+            slot (int): The raindrop slot.
+
+        Returns:
+            str: The knowledge point.
+        """
+        return self.knowledge_list[self.raindrops.text_id[slot]]
+
+    def remove_raindrop(self, slot):
+        """
+        Release the grid cells, index entry and knowledge point of a
+        raindrop leaving the screen.
+
+        Args:
+            slot (int): The slot of the raindrop being removed.
+        """
+        knowledge = self.get_drop_knowledge(slot)
+        # Points filtered out by a search since they were shown stay out
+        if self.is_searched(knowledge):
+            self.scheduler.release(knowledge)
+        self.discard_raindrop(slot)
+
+    def discard_raindrop(self, slot):
+        """
+        Release the grid cells and index entry of a raindrop and free its
+        slot, without returning its knowledge point to the scheduler.
+
+        Args:
+            slot (int): The slot of the raindrop being removed.
+        """
+        drops = self.raindrops
+        self.grid.release(
+            int(drops.grid_y[slot]), int(drops.grid_x[slot]), int(drops.cells[slot])
+        )
+        self.drop_index.remove(int(slot))
+        drops.remove(slot)
 
     def create_raindrop(self):
         """
         Create a new raindrop with a knowledge point.
 
-        Returns: list: A new raindrop [x, y, speed, knowledge, grid_x,
-        grid_y, cells], or None if unable to create.
+        Returns:
+            int: The slot of the new raindrop, or None if unable to create.
         """
         knowledge = self.get_next_knowledge()
         if knowledge is None:
@@ -163,63 +807,322 @@ class KnowledgeRain:
         text_width = self.get_text_width(knowledge)
         cell_info = self.find_empty_cell(text_width)
         if cell_info is None:
+            self.scheduler.cancel(knowledge)
             return None
 
         x, y, cells = cell_info
-        for i in range(cells):
-            self.grid[x + i][y] = True
+        self.grid.occupy(y, x, cells)
 
         real_x = x * self.grid_size
         real_y = 0  # Start from the top of the screen
-        speed = random.uniform(self.speed * 0.5, self.speed * 1.5)
-        self.active_knowledge.add(knowledge)
-        return [real_x, real_y, speed, knowledge, x, y, cells]
+        speed = self.rng.uniform(self.speed * 0.5, self.speed * 1.5)
+        slot = self.raindrops.add(
+            real_x,
+            real_y,
+            speed,
+            self.knowledge_ids[knowledge],
+            x,
+            y,
+            cells,
+            *self.get_text_size(knowledge),
+        )
+        self.drop_index.insert(slot, self.get_drop_rect(slot))
+        return slot
 
-    def update_raindrops(self):
+    def update_raindrops(self, dt):
         """
         Update the positions of all raindrops and remove those that are
         off-screen.
+
+        Positions, off-screen detection and grid transitions are computed
+        for all raindrops at once with array operations.
+
+        Args:
+            dt (float): The elapsed time since the last update in seconds.
         """
-        if not self.paused:
-            raindrops_to_remove = []
-            for drop in self.raindrops:
-                old_grid_y = drop[5]
-                drop[1] += drop[2]  # Update actual y coordinate
-                new_grid_y = int(drop[1] // self.grid_size)
-
-                if new_grid_y != old_grid_y:
-                    if new_grid_y >= self.grid_height:
-                        # If raindrop goes off the screen, mark it for removal
-                        for i in range(
-                            drop[6]
-                        ):  # drop[6] stores the number of cells occupied by
-                            # this raindrop
-                            self.grid[drop[4] + i][
-                                old_grid_y
-                            ] = False  # Clear old position
-                        self.active_knowledge.discard(drop[3])
-                        raindrops_to_remove.append(drop)
-                    else:
-                        # Update grid state
-                        for i in range(drop[6]):
-                            self.grid[drop[4] + i][old_grid_y] = False
-                            self.grid[drop[4] + i][new_grid_y] = True
-                        drop[5] = new_grid_y
-
-            # Remove raindrops that are off the screen
-            for drop in raindrops_to_remove:
-                self.raindrops.remove(drop)
-                new_drop = self.create_raindrop()
-                if new_drop:
-                    self.raindrops.append(new_drop)
+        if self.paused:
+            return
+        drops = self.raindrops
+        slots = drops.active_slots()
+        if len(slots) == 0:
+            return
+
+        old_y = drops.y[slots]
+        new_y = old_y + drops.speed[slots] * dt  # Speed is in pixels per second
+        drops.y[slots] = new_y
+        old_grid_y = drops.grid_y[slots]
+        new_grid_y = (new_y // self.grid_size).astype(np.int32)
+
+        # Move the grid cells of raindrops that entered a new row
+        off_screen = new_grid_y >= self.grid_height
+        moved = (new_grid_y != old_grid_y) & ~off_screen
+        if moved.any():
+            for column, span, old_row, new_row in zip(
+                drops.grid_x[slots[moved]].tolist(),
+                drops.cells[slots[moved]].tolist(),
+                old_grid_y[moved].tolist(),
+                new_grid_y[moved].tolist(),
+            ):
+                self.grid.move(column, span, old_row, new_row)
+            drops.grid_y[slots[moved]] = new_grid_y[moved]
+
+        # Re-bucket raindrops whose rect crossed a spatial index row
+        cell_size = self.drop_index.cell_size
+        heights = drops.height[slots]
+        old_top = old_y.astype(np.int64)
+        new_top = new_y.astype(np.int64)
+        old_bottom = old_top + heights - 1
+        new_bottom = new_top + heights - 1
+        crossed = (
+            (old_top // cell_size != new_top // cell_size)
+            | (old_bottom // cell_size != new_bottom // cell_size)
+        ) & ~off_screen
+        for slot in slots[crossed]:
+            self.drop_index.move(int(slot), self.get_drop_rect(slot))
+
+        # Remove raindrops that are off the screen and replace them
+        for slot in slots[off_screen]:
+            self.remove_raindrop(slot)
+            self.create_raindrop()
 
     def draw_raindrops(self):
         """
         Draw all raindrops on the screen.
+
+        Returns:
+            dict: The screen rect covered by each drawn raindrop, keyed by
+            its slot.
+        """
+        slots = self.raindrops.active_slots()
+        blits = self.raindrop_blits(slots)
+        return dict(zip(slots.tolist(), self.screen.blits(blits)))
+
+    def raindrop_blits(self, slots):
+        """
+        Get the text surface and position of raindrops.
+
+        Args:
+            slots (numpy.ndarray): The slots of the raindrops.
+
+        Returns:
+            list: (surface, position) or, with the text atlas,
+            (page, position, area) tuples as accepted by ``Surface.blits``.
+        """
+        drops = self.raindrops
+        drawn = zip(
+            drops.text_id[slots].tolist(),
+            drops.x[slots].tolist(),
+            drops.y[slots].tolist(),
+        )
+        if self.atlas is not None and self.atlas.ready:
+            # Area blits from the atlas pages, without any text rendering
+            blits = []
+            for text_id, x, y in drawn:
+                page, area = self.atlas.lookup(self.knowledge_list[text_id])
+                blits.append((page, (x, y), area))
+        else:
+            blits = [
+                (
+                    self.text_cache.render(
+                        self.font, self.knowledge_list[text_id], self.GREEN
+                    )[0],
+                    (x, y),
+                )
+                for text_id, x, y in drawn
+            ]
+        return blits
+
+    def tick(self):
         """
-        for drop in self.raindrops:
-            text_surface, _ = self.font.render(drop[3], self.GREEN)
-            self.screen.blit(text_surface, (drop[0], drop[1]))
+        Wait for the next frame according to the frame-rate mode.
+
+        Returns:
+            float: The elapsed time since the previous frame in seconds,
+            clamped to config.MAX_FRAME_TIME.
+        """
+        if self.frame_rate_mode == "capped":
+            elapsed = self.clock.tick(self.target_fps)
+            if config.ADAPTIVE_FRAME_RATE:
+                self.adapt_frame_rate()
+        else:
+            # Uncapped, or paced by the display refresh in vsync mode
+            elapsed = self.clock.tick()
+        return min(elapsed / 1000, config.MAX_FRAME_TIME)
+
+    def adapt_frame_rate(self):
+        """
+        Lower the frame-rate target when the frame budget is repeatedly
+        missed, and raise it back towards config.CLOCK_TICK once frames
+        comfortably fit the budget again.
+        """
+        budget = 1000 / self.target_fps
+        work_time = self.clock.get_rawtime()
+        if work_time > budget:
+            self.missed_frames += 1
+            self.fast_frames = 0
+        else:
+            self.missed_frames = 0
+            if work_time < budget / 2:
+                self.fast_frames += 1
+
+        if (
+            self.missed_frames >= config.ADAPTIVE_MISS_LIMIT
+            and self.target_fps > config.ADAPTIVE_FPS_MIN
+        ):
+            self.target_fps = max(
+                config.ADAPTIVE_FPS_MIN, self.target_fps - config.ADAPTIVE_FPS_STEP
+            )
+            self.missed_frames = 0
+            print(f"帧率目标降低至: {self.target_fps}")
+        elif (
+            self.fast_frames >= config.ADAPTIVE_RECOVER_LIMIT
+            and self.target_fps < config.CLOCK_TICK
+        ):
+            self.target_fps = min(
+                config.CLOCK_TICK, self.target_fps + config.ADAPTIVE_FPS_STEP
+            )
+            self.fast_frames = 0
+            print(f"帧率目标提高至: {self.target_fps}")
+
+    def present(self):
+        """
+        Show the whole screen surface.
+        """
+        if self.texture_renderer is not None:
+            self.texture_renderer.present_surface(self.screen)
+        else:
+            pygame.display.flip()
+
+    def render_frame(self):
+        """
+        Draw the current frame and push it to the display.
+
+        With the hardware renderer the whole frame is composed from textures
+        by the SDL renderer. In dirty-rect mode only the regions covered by
+        raindrops in the previous and the current frame are cleared and
+        updated. A full flip is used instead when the dirty area exceeds
+        config.DIRTY_RECT_MAX_AREA_RATIO of the screen, or when the whole
+        screen has been overwritten (e.g. by the detail view).
+        """
+        refresh = self.profiler.count % config.FRAME_PROFILE_HUD_REFRESH == 0
+        if self.show_hud and refresh:
+            self.update_hud()
+
+        overlays = self.get_overlays()
+        if self.texture_renderer is not None:
+            blits = self.raindrop_blits(self.raindrops.active_slots())
+            blits.extend((surface, position) for _, surface, position in overlays)
+            self.texture_renderer.draw_frame(blits, self.BLACK)
+            self.profiler.mark("draw")
+            self.texture_renderer.present()
+            self.profiler.mark("flip")
+            return
+
+        if not config.DIRTY_RECT_RENDERING or self.full_redraw:
+            self.screen.fill(self.BLACK)
+            self.drawn_rects = self.draw_raindrops()
+            for key, surface, position in overlays:
+                self.drawn_rects[key] = self.screen.blit(surface, position)
+            self.profiler.mark("draw")
+            pygame.display.flip()
+            self.profiler.mark("flip")
+            self.full_redraw = False
+            return
+
+        for rect in self.drawn_rects.values():
+            self.screen.fill(self.BLACK, rect)
+        current_rects = self.draw_raindrops()
+        for key, surface, position in overlays:
+            current_rects[key] = self.screen.blit(surface, position)
+        self.profiler.mark("draw")
+
+        # Merge each raindrop's previous and current rect, and keep the
+        # previous rects of raindrops that disappeared so they get cleared
+        dirty_rects = []
+        for slot, rect in current_rects.items():
+            previous = self.drawn_rects.pop(slot, None)
+            dirty_rects.append(rect.union(previous) if previous else rect)
+        dirty_rects.extend(self.drawn_rects.values())
+        self.drawn_rects = current_rects
+
+        dirty_area = sum(rect.width * rect.height for rect in dirty_rects)
+        if dirty_area > self.width * self.height * config.DIRTY_RECT_MAX_AREA_RATIO:
+            pygame.display.flip()
+        else:
+            pygame.display.update(dirty_rects)
+        self.profiler.mark("flip")
+
+    def hud_position(self):
+        """
+        Get the screen position of the performance HUD.
+
+        Returns:
+            tuple: The top-left corner of the HUD.
+        """
+        return config.TEXT_X_OFFSET, config.TEXT_X_OFFSET
+
+    def update_hud(self):
+        """
+        Render the performance HUD from the current frame statistics.
+        """
+        lines = [f"FPS {self.clock.get_fps():5.1f}   p50    p95 (ms)"]
+        for phase, values in self.profiler.percentiles((50, 95)).items():
+            lines.append(f"{phase:<8}{values[50]:7.2f}{values[95]:7.2f}")
+        rendered = [self.font.render(line, self.WHITE)[0] for line in lines]
+        line_height = self.font.get_sized_height()
+        self.hud_surface = pygame.Surface(
+            (
+                max(surface.get_width() for surface in rendered),
+                line_height * len(rendered),
+            )
+        )
+        for index, surface in enumerate(rendered):
+            self.hud_surface.blit(surface, (0, index * line_height))
+
+    def update_search_prompt(self):
+        """
+        Render the search prompt from the current query and its matches.
+        """
+        if self.search_text.strip() and self.search_index is None:
+            status = "正在建立索引"
+        elif self.search_matches is None:
+            status = f"{len(self.knowledge_list)} 个匹配"
+        else:
+            status = f"{len(self.search_matches)} 个匹配"
+        text = f"搜索: {self.search_text}_  ({status}，回车确认，ESC清除)"
+        rendered, _ = self.font.render(text, self.WHITE)
+        self.search_surface = pygame.Surface(rendered.get_size())
+        self.search_surface.blit(rendered, (0, 0))
+
+    def get_overlays(self):
+        """
+        Get the panels drawn over the raindrops.
+
+        Returns:
+            list: (key, surface, position) of the performance HUD and the
+            search prompt, if shown. Keys name their rects in drawn_rects.
+        """
+        overlays = []
+        if self.show_hud:
+            overlays.append(("hud", self.hud_surface, self.hud_position()))
+        if self.search_open:
+            position = (
+                config.TEXT_X_OFFSET,
+                self.height - config.TEXT_X_OFFSET - self.search_surface.get_height(),
+            )
+            overlays.append(("search", self.search_surface, position))
+        return overlays
+
+    def draw_loading(self):
+        """
+        Draw the loading indicator shown while the text atlas is built.
+        """
+        self.screen.fill(self.BLACK)
+        message = f"正在生成文字图集... {self.atlas.built}/{self.atlas.total}"
+        rect = self.large_font.get_rect(message)
+        rect.center = self.screen.get_rect().center
+        self.large_font.render_to(self.screen, rect, message, self.WHITE)
+        self.present()
 
     def adjust_density(self, change):
         """
@@ -235,138 +1138,535 @@ class KnowledgeRain:
 
     def show_detail(self, knowledge):
         """
-        Display detailed information about a selected knowledge point.
+        Open the detail view for a selected knowledge point.
+
+        The detail view is a state of the main loop: while it is open the
+        animation is paused and the loop blocks on input events instead of
+        rendering frames.
 
         Args:
             knowledge (str): The knowledge point to display details for.
         """
         self.paused = True
-        detail_surface = pygame.Surface((self.width, self.height))
-        detail_surface.fill(self.BLACK)
-
-        title, _ = self.large_font.render(knowledge, self.GREEN)
-        detail_surface.blit(title, (config.TEXT_X_OFFSET, config.TEXT_X_OFFSET))
-
+        self.scheduler.record_view(knowledge)
         explanation = self.knowledge_points[knowledge]
         max_width = self.width - config.TEXT_MAX_WIDTH_OFFSET
+        self.detail_knowledge = knowledge
+        self.detail_lines = self.wrapper.wrap(knowledge, explanation, max_width)
+        self.detail_scroll = 0
+        self.detail_dirty = True
+        self.detail_opened = time.time()
 
-        lines = []
-        if "\n" in explanation:
-            # If newlines exist, split by newline
-            paragraphs = explanation.split("\n")
-            for paragraph in paragraphs:
-                words = paragraph.split()
-                current_line = ""
-                for word in words:
-                    test_line = current_line + " " + word if current_line else word
-                    if self.font.get_rect(test_line)[2] < max_width:
-                        current_line = test_line
-                    else:
-                        lines.append(current_line)
-                        current_line = word
-                if current_line:
-                    lines.append(current_line)
-                lines.append("")  # Add empty line between paragraphs
-        else:
-            # If no newlines, split by character
-            current_line = ""
-            for char in explanation:
-                test_line = current_line + char
-                if self.font.get_rect(test_line)[2] < max_width:
-                    current_line += char
-                else:
-                    lines.append(current_line)
-                    current_line = char
-            lines.append(current_line)
-
-        y_offset = config.TEXT_Y_OFFSET
-
-        def render_text():
-            """Render the explanation text on the detail surface."""
-            line_height = self.font.get_sized_height(config.FONT_SIZE)
-            detail_surface.fill(self.BLACK)
-            detail_surface.blit(title, (config.TEXT_X_OFFSET, config.TEXT_X_OFFSET))
-            y = y_offset
-            for line in lines:
-                if y + line_height > self.height - config.TEXT_Y_OFFSET:
-                    break
-                text, _ = self.font.render(line, self.WHITE)
-                detail_surface.blit(text, (config.TEXT_X_OFFSET, y))
-                y += line_height
-            exit_text, _ = self.font.render("点击任意位置返回", self.GREEN)
-            detail_surface.blit(
-                exit_text,
-                (
-                    self.width - config.TEXT_EXIT_X_OFFSET,
-                    self.height - config.TEXT_EXIT_Y_OFFSET,
-                ),
+    def close_detail(self):
+        """
+        Close the detail view and resume the animation.
+        """
+        self.log_detail_view()
+        self.detail_knowledge = None
+        self.detail_lines = []
+        self.paused = False
+        self.full_redraw = True
+        # Do not let the time spent reading count as animation time
+        self.clock.tick()
+
+    def log_detail_view(self):
+        """
+        Log the knowledge point of the open detail view and the time it has
+        been open to the study log, if there is one.
+        """
+        engine = self.primary or self
+        if self.detail_opened is None or engine.study_log is None:
+            return
+        knowledge = self.detail_knowledge
+        engine.study_log.log_view(
+            knowledge,
+            engine.study_chapters.get(knowledge),
+            self.detail_opened,
+            max(0.0, time.time() - self.detail_opened),
+        )
+        self.detail_opened = None
+
+    def detail_page_size(self):
+        """
+        Get the number of explanation lines that fit in the detail view.
+
+        Returns:
+            int: The number of visible lines.
+        """
+        line_height = self.font.get_sized_height(config.FONT_SIZE)
+        return max(1, (self.height - 2 * config.TEXT_Y_OFFSET) // line_height)
+
+    def scroll_detail(self, lines):
+        """
+        Scroll the detail view by a number of lines.
+
+        Args:
+            lines (int): The number of lines to scroll, negative to scroll up.
+        """
+        max_scroll = max(0, len(self.detail_lines) - self.detail_page_size())
+        scroll = max(0, min(max_scroll, self.detail_scroll + lines))
+        if scroll != self.detail_scroll:
+            self.detail_scroll = scroll
+            self.detail_dirty = True
+
+    def draw_detail(self):
+        """
+        Draw the visible part of the detail view and flip the display.
+        """
+        line_height = self.font.get_sized_height(config.FONT_SIZE)
+        page_size = self.detail_page_size()
+
+        self.screen.fill(self.BLACK)
+        title, _ = self.text_cache.render(
+            self.large_font, self.detail_knowledge, self.GREEN
+        )
+        self.screen.blit(title, (config.TEXT_X_OFFSET, config.TEXT_X_OFFSET))
+
+        y = config.TEXT_Y_OFFSET
+        visible = self.detail_lines[self.detail_scroll : self.detail_scroll + page_size]
+        for line in visible:
+            if line:
+                text, _ = self.text_cache.render(self.font, line, self.WHITE)
+                self.screen.blit(text, (config.TEXT_X_OFFSET, y))
+            y += line_height
+
+        if len(self.detail_lines) > page_size:
+            # The position indicator changes on every scroll, so it is not
+            # worth caching
+            position, _ = self.font.render(
+                f"{self.detail_scroll + 1}-{self.detail_scroll + len(visible)}"
+                f"/{len(self.detail_lines)} 滚轮或方向键滚动",
+                self.GREEN,
             )
-            self.screen.blit(detail_surface, (0, 0))
-            pygame.display.flip()
+            self.screen.blit(
+                position,
+                (config.TEXT_X_OFFSET, self.height - config.TEXT_EXIT_Y_OFFSET),
+            )
+        exit_text, _ = self.text_cache.render(
+            self.font, "点击任意位置返回", self.GREEN
+        )
+        self.screen.blit(
+            exit_text,
+            (
+                self.width - config.TEXT_EXIT_X_OFFSET,
+                self.height - config.TEXT_EXIT_Y_OFFSET,
+            ),
+        )
+        self.present()
+        self.detail_dirty = False
 
-        render_text()
+    def handle_detail_event(self, event):
+        """
+        Handle an input event while the detail view is open.
 
-        waiting = True
-        while waiting:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    if event.button == 1:
-                        waiting = False
+        Args:
+            event (pygame.event.Event): The event to handle.
+        """
+        if event.type == DECK_UPDATED:
+            (self.primary or self).update_deck(event.knowledge_points, event.changed)
+            return
+        if event.type == SEARCH_INDEXED:
+            (self.primary or self).on_search_indexed(
+                event.search_index, event.generation
+            )
+            return
+        self.record_event(event)
+        if event.type == pygame.QUIT:
+            self.stop()
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            self.close_detail()
+        elif event.type == pygame.MOUSEWHEEL:
+            self.scroll_detail(-event.y * config.DETAIL_SCROLL_LINES)
+        elif event.type == pygame.KEYDOWN:
+            page_size = self.detail_page_size()
+            if event.key == pygame.K_ESCAPE:
+                self.close_detail()
+            elif event.key == pygame.K_UP:
+                self.scroll_detail(-1)
+            elif event.key == pygame.K_DOWN:
+                self.scroll_detail(1)
+            elif event.key == pygame.K_PAGEUP:
+                self.scroll_detail(-page_size)
+            elif event.key in (pygame.K_PAGEDOWN, pygame.K_SPACE):
+                self.scroll_detail(page_size)
+        elif event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+            self.detail_dirty = True
 
-        self.paused = False
+    def run_detail_step(self):
+        """
+        Process one batch of input events for the detail view.
 
-    def run(self):
+        Blocks until an event arrives or config.DETAIL_WAIT_TIMEOUT
+        milliseconds pass, so an idle detail view costs almost no CPU.
+        """
+        events = [pygame.event.wait(config.DETAIL_WAIT_TIMEOUT)]
+        events.extend(pygame.event.get())
+        (self.primary or self).dispatch_events(events)
+        if self.detail_knowledge is not None and self.detail_dirty:
+            self.draw_detail()
+
+    def handle_event(self, event):
+        """
+        Handle an input event while the rain animation is running.
+
+        Args:
+            event (pygame.event.Event): The event to handle.
+        """
+        if event.type == pygame.QUIT:
+            self.stop()
+        elif event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_UP:
+                self.speed = min(config.SPEED_MAX, self.speed + config.SPEED_STEP)
+            elif event.key == pygame.K_DOWN:
+                self.speed = max(config.SPEED_MIN, self.speed - config.SPEED_STEP)
+            elif event.key == pygame.K_RIGHT:
+                self.adjust_density(1)
+            elif event.key == pygame.K_LEFT:
+                self.adjust_density(-1)
+            elif event.key == pygame.K_ESCAPE:
+                self.stop()
+            elif event.key == pygame.K_F3:
+                self.show_hud = not self.show_hud
+                self.update_hud()
+            print(f"速度: {self.speed:.1f}, 密度: {self.density}")
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            hits = self.drop_index.query_point(event.pos)
+            if hits:
+                self.show_detail(self.get_drop_knowledge(hits[0]))
+
+    def dispatch_events(self, events):
+        """
+        Handle a batch of events, each by the detail view if one is open
+        at that point and by the rain animation otherwise, so events after
+        one that opens or closes the detail view are not lost.
+
+        Args:
+            events (list): The events, in the order they arrived.
         """
-        Run the main game loop.
+        for event in events:
+            if event.type == pygame.WINDOWCLOSE:
+                self.close_window(event)
+                continue
+            detail_output = self.get_detail_output()
+            if detail_output is not None:
+                detail_output.handle_detail_event(event)
+            else:
+                self.dispatch_event(event)
+
+    def dispatch_event(self, event):
+        """
+        Record an input event of the rain animation and pass it on: mouse
+        events to the output whose window they happened in, other events
+        to every output.
+
+        Args:
+            event (pygame.event.Event): The event to handle.
+        """
+        if event.type == DECK_UPDATED:
+            self.update_deck(event.knowledge_points, event.changed)
+            return
+        if event.type == SEARCH_INDEXED:
+            self.on_search_indexed(event.search_index, event.generation)
+            return
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            output = self.get_event_output(event)
+            # Windows cannot be recorded, so replay finds the output by its
+            # index
+            event.output = self.get_screens().index(output)
+            self.record_event(event)
+            output.handle_event(event)
+            return
+        self.record_event(event)
+        if self.handle_search_event(event):
+            return
+        for output in self.get_screens():
+            output.handle_event(event)
+
+    def handle_search_event(self, event):
+        """
+        Handle the keys of the search prompt, opened by typing "/". The
+        rain is filtered as the query is typed.
+
+        Args:
+            event (pygame.event.Event): The event to handle.
+
+        Returns:
+            bool: True if the event was used by the prompt.
+        """
+        if not self.search_open:
+            if event.type == pygame.TEXTINPUT and event.text == "/":
+                self.search_open = True
+                self.update_search_prompt()
+                return True
+            return False
+        if event.type == pygame.TEXTINPUT:
+            self.search(self.search_text + event.text)
+        elif event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_BACKSPACE:
+                self.search(self.search_text[:-1])
+            elif event.key == pygame.K_ESCAPE:
+                self.search("")
+                self.search_open = False
+            elif event.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
+                self.search_open = False
+        else:
+            return False
+        return True
+
+    def close_window(self, event):
+        """
+        Close the output whose window the close button was clicked in, or
+        stop the rain if it is the primary window. The raindrops of a closed
+        output return their knowledge points to the shared scheduler.
+
+        Args:
+            event (pygame.event.Event): The pygame.WINDOWCLOSE event.
+        """
+        window = getattr(event, "window", None)
+        if window is None or window.id == self.window.id:
+            self.stop()
+            return
+        for output in self.outputs:
+            if output.window.id == window.id:
+                break
+        else:
+            return
+        output.log_detail_view()
+        for slot in output.raindrops.active_slots():
+            output.remove_raindrop(slot)
+        output.close()
+        self.outputs.remove(output)
+
+    def get_event_output(self, event):
+        """
+        Get the output whose window a window event happened in.
+
+        Args:
+            event (pygame.event.Event): The event.
+
+        Returns:
+            KnowledgeRain: The output, this engine if the window is unknown.
+        """
+        screens = self.get_screens()
+        index = getattr(event, "output", None)
+        if index is not None and index < len(screens):
+            # A replayed event
+            return screens[index]
+        window = getattr(event, "window", None)
+        if window is not None:
+            for output in self.outputs:
+                if output.window.id == window.id:
+                    return output
+        return self
+
+    def get_detail_output(self):
+        """
+        Get the output showing the detail view, if any.
+
+        Returns:
+            KnowledgeRain: The output, or None if no detail view is open.
+        """
+        for output in self.get_screens():
+            if output.detail_knowledge is not None:
+                return output
+        return None
+
+    def manage_density(self):
+        """
+        Add or remove a raindrop to move towards the current density.
+        """
+        if len(self.raindrops) < self.density:
+            self.create_raindrop()
+        elif len(self.raindrops) > self.density:
+            self.remove_raindrop(self.raindrops.active_slots()[-1])
+
+    def animate(self, dt):
+        """
+        Advance and draw one frame on every output.
+
+        Args:
+            dt (float): The elapsed time since the last frame in seconds.
+        """
+        if self.next_atlas is not None and self.next_atlas.ready:
+            self.atlas, self.next_atlas = self.next_atlas, None
+            for output in self.outputs:
+                output.atlas = self.atlas
+        screens = self.get_screens()
+        for screen in screens:
+            screen.manage_density()
+        self.profiler.mark("density")
+        for screen in screens:
+            screen.update_raindrops(dt)
+        self.profiler.mark("update")
+        for screen in screens:
+            screen.render_frame()
+
+    def start(self):
+        """
+        Show the windows and run the main game loop until stop is called.
         """
         print("开始运行知识雨...")
-        running = True
-        while running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                elif event.type == pygame.KEYDOWN:
-                    if event.type == pygame.QUIT:
-                        running = False
-                    elif event.key == pygame.K_UP:
-                        self.speed = min(config.SPEED_MAX, self.speed + 0.5)
-                    elif event.key == pygame.K_DOWN:
-                        self.speed = max(config.SPEED_MIN, self.speed - 0.5)
-                    elif event.key == pygame.K_RIGHT:
-                        self.adjust_density(1)
-                    elif event.key == pygame.K_LEFT:
-                        self.adjust_density(-1)
-                    elif event.key == pygame.K_ESCAPE:
-                        running = False
-                    print(f"速度: {self.speed:.1f}, 密度: {self.density}")
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    for drop in self.raindrops:
-                        text_surface, _ = self.font.render(drop[3], self.GREEN)
-                        text_rect = text_surface.get_rect(topleft=(drop[0], drop[1]))
-                        if text_rect.collidepoint(event.pos):
-                            self.show_detail(drop[3])
-                            break
+        for screen in self.get_screens():
+            screen.window.show()
+            screen.full_redraw = True
+        self.running = True
+        self.search_open = False
+        # Typed text opens and fills the search prompt
+        pygame.key.start_text_input()
+        self.profiler.reset()
+        if config.RECORDING_PATH:
+            self.begin_recording()
+        self.clock.tick()
+        while self.running:
+            detail_output = self.get_detail_output()
+            if detail_output is not None:
+                detail_output.run_detail_step()
+                continue
 
-            self.screen.fill(self.BLACK)
+            dt = self.tick()
+            self.profiler.start_frame()
+            self.dispatch_events(pygame.event.get())
+            if self.atlas is not None and self.atlas.building:
+                for screen in self.get_screens():
+                    screen.draw_loading()
+                    screen.full_redraw = True
+                continue
+            if self.get_detail_output() is not None:
+                continue
+            self.profiler.mark("events")
+            if self.recording is not None:
+                self.recording.record_frame(dt)
 
-            # Manage raindrop density
-            if len(self.raindrops) < self.density:
-                new_drop = self.create_raindrop()
-                if new_drop:
-                    self.raindrops.append(new_drop)
-            elif len(self.raindrops) > self.density:
-                drop = self.raindrops.pop()
-                for i in range(drop[6]):
-                    self.grid[drop[4] + i][drop[5]] = False
-                self.active_knowledge.discard(drop[3])
+            self.animate(dt)
+            self.profiler.end_frame()
 
-            self.update_raindrops()
-            self.draw_raindrops()
+        # A detail view left open when the rain stops counts as closed now
+        for screen in self.get_screens():
+            screen.log_detail_view()
+        print(f"文本缓存统计: {self.text_cache.stats()}")
+        print(f"帧耗时统计 (ms): {self.profiler.percentiles()}")
+        if config.FRAME_TRACE_PATH:
+            self.profiler.dump(config.FRAME_TRACE_PATH)
+        if self.recording is not None:
+            path = time.strftime(config.RECORDING_PATH)
+            self.recording.save(path)
+            self.recording = None
+            print(f"输入录制已保存: {path}")
+        for screen in self.get_screens():
+            screen.window.hide()
+        # Drop input left over from this run
+        pygame.event.clear()
 
-            pygame.display.flip()
-            self.clock.tick(config.CLOCK_TICK)
+    def stop(self):
+        """
+        Stop the main game loop at the end of the current frame.
+        """
+        self.running = False
+        if self.primary is not None:
+            self.primary.stop()
+
+    def begin_recording(self):
+        """
+        Restart the deck from a fresh seed and record the session's input
+        events and frame times, so it can be reproduced with replay.
+        """
+        seed = self.rng.randrange(2**32)
+        self.rng.seed(seed)
+        # The recording keeps a single speed and density for every output
+        for output in self.outputs:
+            output.speed = self.speed
+            output.density = self.density
+        self.ensure_search_index()
+        self.match_search(self.search_text)
+        self.reset()
+        self.recording = InputRecording(
+            seed,
+            self.speed,
+            self.density,
+            (self.width, self.height),
+            deck_digest(self.knowledge_list),
+            self.search_text,
+        )
+
+    def record_event(self, event):
+        """
+        Add a handled input event to the recording, if one is running.
+
+        Args:
+            event (pygame.event.Event): The handled event.
+        """
+        if self.primary is not None:
+            self.primary.record_event(event)
+        elif self.recording is not None and event.type != pygame.NOEVENT:
+            self.recording.record_event(event)
+
+    def replay(self, recording):
+        """
+        Reproduce a recorded session as fast as possible, without waiting
+        for the clock, timing each frame with the profiler.
 
-        pygame.quit()
+        The recorded events are handled before the frames they preceded and
+        every frame advances by its recorded time step, so the simulation
+        goes through exactly the same states as the recorded session.
+
+        Args:
+            recording (InputRecording): The recorded session.
+
+        Raises:
+            ValueError: If the recording was made with another deck.
+        """
+        if recording.deck != deck_digest(self.knowledge_list):
+            raise ValueError("The recording was made with another deck")
+        self.rng.seed(recording.seed)
+        # Replayed views are not study events
+        study_log, self.study_log = self.study_log, None
+        for screen in self.get_screens():
+            screen.speed = recording.speed
+            screen.density = recording.density
+        self.search_open = False
+        self.ensure_search_index()
+        self.match_search(recording.search)
+        self.reset()
+        self.profiler.reset()
+        events = recording.events_by_frame()
+        for frame, dt in enumerate(recording.frame_times):
+            self.profiler.start_frame()
+            for event in events.get(frame, ()):
+                detail_output = self.get_detail_output()
+                if detail_output is not None:
+                    detail_output.handle_detail_event(event)
+                else:
+                    self.dispatch_event(event)
+                detail_output = self.get_detail_output()
+                if detail_output is not None and detail_output.detail_dirty:
+                    detail_output.draw_detail()
+            self.profiler.mark("events")
+            self.animate(dt)
+            self.profiler.end_frame()
+        for screen in self.get_screens():
+            screen.detail_opened = None
+        self.study_log = study_log
+        self.stop()
+
+    def close(self):
+        """
+        Destroy the windows. pygame and the loaded fonts stay initialized for
+        the next engine.
+        """
+        # Closing an output alone leaves the primary's loop running
+        if self.primary is None:
+            self.stop()
+        for output in self.outputs:
+            output.close()
+        self.outputs = []
+        if self.texture_renderer is not None:
+            self.texture_renderer.close()
+        if self.primary is None:
+            pygame.display.quit()
+
+    def run(self):
+        """
+        Run the main game loop once and close the window.
+        """
+        self.start()
+        self.close()
@@ -0,0 +1,509 @@
+import heapq
+import random
+from abc import ABC, abstractmethod
+from collections import deque
+
+
+class KnowledgeScheduler(ABC):
+    """
+    Base class for strategies that decide which knowledge point falls next.
+
+    A scheduler only hands out knowledge points that are not currently on
+    screen: ``acquire`` takes the next inactive point and ``release`` makes
+    it available again once its raindrop leaves the screen, so neither has
+    to scan the deck.
+
+    Attributes:
+        rng (random.Random): The random number generator used for ordering.
+    """
+
+    def __init__(self, knowledge_list, rng=None, weights=None):
+        """
+        Initialize the scheduler with every knowledge point inactive.
+
+        Args:
+            knowledge_list (list): The knowledge points of the deck.
+            rng (random.Random): Optional random number generator, defaults
+                                 to the global random module.
+            weights (dict): Optional weight of each knowledge point, for
+                            strategies that use them.
+        """
+        self.rng = rng or random
+        self.weights = weights or {}
+
+    @abstractmethod
+    def acquire(self):
+        """
+        Take the next inactive knowledge point.
+
+        Returns:
+            str: The knowledge point, or None if all of them are on screen.
+        """
+
+    @abstractmethod
+    def release(self, knowledge):
+        """
+        Make a knowledge point available again.
+
+        Args:
+            knowledge (str): The knowledge point leaving the screen.
+        """
+
+    def cancel(self, knowledge):
+        """
+        Return a knowledge point that was acquired but could not be shown.
+
+        Args:
+            knowledge (str): The knowledge point to return.
+        """
+        self.release(knowledge)
+
+    def record_view(self, knowledge):
+        """
+        Record that the user opened the details of a knowledge point.
+
+        Args:
+            knowledge (str): The knowledge point that was viewed.
+        """
+
+    @abstractmethod
+    def update_points(self, knowledge_list, on_screen):
+        """
+        Change the knowledge points handed out, e.g. after the deck or the
+        search changed, keeping the ordering state of the points that
+        remain. Points that are new to the scheduler become inactive, and
+        points on screen are expected back through release.
+
+        Args:
+            knowledge_list (list): The knowledge points that may fall.
+            on_screen (set): The knowledge points currently on screen.
+        """
+
+
+class SequentialScheduler(KnowledgeScheduler):
+    """
+    Hands out knowledge points in deck order, then in the order they leave
+    the screen.
+
+    Attributes:
+        queue (collections.deque): The inactive knowledge points, next first.
+    """
+
+    def __init__(self, knowledge_list, rng=None, weights=None):
+        """
+        Queue the knowledge points in deck order.
+
+        Args:
+            knowledge_list (list): The knowledge points of the deck.
+            rng (random.Random): Unused, for a common signature.
+            weights (dict): Unused, for a common signature.
+        """
+        super().__init__(knowledge_list, rng, weights)
+        self.queue = deque(knowledge_list)
+
+    def acquire(self):
+        """
+        Take the knowledge point at the front of the queue.
+
+        Returns:
+            str: The knowledge point, or None if all of them are on screen.
+        """
+        return self.queue.popleft() if self.queue else None
+
+    def release(self, knowledge):
+        """
+        Queue a knowledge point behind the others.
+
+        Args:
+            knowledge (str): The knowledge point leaving the screen.
+        """
+        self.queue.append(knowledge)
+
+    def update_points(self, knowledge_list, on_screen):
+        """
+        Drop the queued points that were removed and queue the new ones in
+        deck order, keeping the order of the points that remain.
+
+        Args:
+            knowledge_list (list): The knowledge points that may fall.
+            on_screen (set): The knowledge points currently on screen.
+        """
+        points = set(knowledge_list)
+        queued = set(self.queue)
+        self.queue = deque(knowledge for knowledge in self.queue if knowledge in points)
+        self.queue.extend(
+            knowledge
+            for knowledge in knowledge_list
+            if knowledge not in queued and knowledge not in on_screen
+        )
+
+
+class ShuffledScheduler(KnowledgeScheduler):
+    """
+    Hands out knowledge points in random order, showing every point once
+    before any point repeats.
+
+    Attributes:
+        bag (list): The shuffled points still due this round, next last.
+        next_round (list): The points released during this round.
+        set_aside (dict): Whether each point filtered out was still due
+                          this round, see update_points.
+    """
+
+    def __init__(self, knowledge_list, rng=None, weights=None):
+        """
+        Start the first round with every knowledge point, shuffled.
+
+        Args:
+            knowledge_list (list): The knowledge points of the deck.
+            rng (random.Random): Optional random number generator, defaults
+                                 to the global random module.
+            weights (dict): Unused, for a common signature.
+        """
+        super().__init__(knowledge_list, rng, weights)
+        self.bag = list(knowledge_list)
+        self.rng.shuffle(self.bag)
+        self.next_round = []
+        self.set_aside = {}
+
+    def acquire(self):
+        """
+        Take the next point of this round, starting a new round once every
+        point has been handed out.
+
+        Returns:
+            str: The knowledge point, or None if all of them are on screen.
+        """
+        if not self.bag:
+            # Start a new round with the points released during this one
+            self.bag, self.next_round = self.next_round, self.bag
+            self.rng.shuffle(self.bag)
+        return self.bag.pop() if self.bag else None
+
+    def release(self, knowledge):
+        """
+        Keep a knowledge point for the next round.
+
+        Args:
+            knowledge (str): The knowledge point leaving the screen.
+        """
+        self.next_round.append(knowledge)
+
+    def cancel(self, knowledge):
+        """
+        Return a knowledge point to the current round, as it was not shown.
+
+        Args:
+            knowledge (str): The knowledge point to return.
+        """
+        self.bag.append(knowledge)
+
+    def update_points(self, knowledge_list, on_screen):
+        """
+        Refill the rounds with the points that may fall. Points that remain
+        or come back stay in the round they were in, new points join the
+        current round.
+
+        Args:
+            knowledge_list (list): The knowledge points that may fall.
+            on_screen (set): The knowledge points currently on screen.
+        """
+        # Points filtered out are set aside with whether they were still
+        # due this round, so they return to the same round
+        for knowledge in self.bag:
+            self.set_aside[knowledge] = True
+        for knowledge in self.next_round:
+            self.set_aside[knowledge] = False
+        self.bag = []
+        self.next_round = []
+        for knowledge in knowledge_list:
+            if knowledge in on_screen:
+                continue
+            # New points have not been shown, so they join this round
+            if self.set_aside.pop(knowledge, True):
+                self.bag.append(knowledge)
+            else:
+                self.next_round.append(knowledge)
+        self.rng.shuffle(self.bag)
+
+
+class WeightedScheduler(KnowledgeScheduler):
+    """
+    Hands out knowledge points at random with probability proportional to
+    their weight (default 1) among the points not on screen.
+
+    The weights of the inactive points are kept in a Fenwick tree, so
+    drawing a point and removing or restoring its weight take O(log n).
+    Weights are stored as integer thousandths so the sums stay exact;
+    points with weight 0 never fall.
+
+    Attributes:
+        points (list): The knowledge points, indexed by id.
+        ids (dict): The id of each knowledge point.
+        inactive (list): Whether each point is off screen.
+        tree (list): The Fenwick tree of the inactive weights.
+        total (int): The sum of the inactive weights.
+    """
+
+    def __init__(self, knowledge_list, rng=None, weights=None):
+        """
+        Build the tree with every knowledge point inactive.
+
+        Args:
+            knowledge_list (list): The knowledge points of the deck.
+            rng (random.Random): Optional random number generator, defaults
+                                 to the global random module.
+            weights (dict): Optional weight of each knowledge point.
+        """
+        super().__init__(knowledge_list, rng, weights)
+        self.build(knowledge_list, set())
+
+    def build(self, knowledge_list, on_screen):
+        """
+        Index the points and build the tree of the inactive weights.
+
+        Args:
+            knowledge_list (list): The knowledge points that may fall.
+            on_screen (set): The knowledge points currently on screen.
+        """
+        self.points = list(knowledge_list)
+        self.ids = {knowledge: index for index, knowledge in enumerate(self.points)}
+        self.point_weights = [
+            self.scale_weight(self.weights.get(knowledge, 1))
+            for knowledge in self.points
+        ]
+        self.inactive = [knowledge not in on_screen for knowledge in self.points]
+        # Fenwick tree of the inactive weights, built in O(n); index 0 is
+        # unused
+        size = len(self.points)
+        self.tree = [
+            0,
+            *(
+                weight if inactive else 0
+                for weight, inactive in zip(self.point_weights, self.inactive)
+            ),
+        ]
+        for position in range(1, size + 1):
+            parent = position + (position & -position)
+            if parent <= size:
+                self.tree[parent] += self.tree[position]
+        self.total = sum(
+            weight
+            for weight, inactive in zip(self.point_weights, self.inactive)
+            if inactive
+        )
+        self.top_bit = 1 << size.bit_length() >> 1 if size else 0
+
+    @staticmethod
+    def scale_weight(weight):
+        """
+        Convert a weight to integer thousandths.
+
+        Args:
+            weight (float): The weight.
+
+        Returns:
+            int: The weight in thousandths, at least 1 if it is positive.
+        """
+        return max(1, round(weight * 1000)) if weight > 0 else 0
+
+    def update(self, index, delta):
+        """
+        Change the weight of a point in the tree.
+
+        Args:
+            index (int): The id of the point.
+            delta (int): The change of its weight, in thousandths.
+        """
+        position = index + 1
+        while position < len(self.tree):
+            self.tree[position] += delta
+            position += position & -position
+        self.total += delta
+
+    def acquire(self):
+        """
+        Draw an inactive point by weight and remove its weight from the
+        tree.
+
+        Returns:
+            str: The knowledge point, or None if no inactive point has a
+            positive weight.
+        """
+        if self.total <= 0:
+            return None
+        # Find the point whose range of cumulative weights holds the target
+        target = self.rng.randrange(self.total)
+        position = 0
+        bit = self.top_bit
+        while bit:
+            child = position + bit
+            if child < len(self.tree) and self.tree[child] <= target:
+                position = child
+                target -= self.tree[child]
+            bit >>= 1
+        self.inactive[position] = False
+        self.update(position, -self.point_weights[position])
+        return self.points[position]
+
+    def release(self, knowledge):
+        """
+        Restore the weight of a knowledge point in the tree.
+
+        Args:
+            knowledge (str): The knowledge point leaving the screen.
+        """
+        index = self.ids.get(knowledge)
+        if index is None or self.inactive[index]:
+            return
+        self.inactive[index] = True
+        self.update(index, self.point_weights[index])
+
+    def update_points(self, knowledge_list, on_screen):
+        """
+        Rebuild the tree for the points that may fall.
+
+        Args:
+            knowledge_list (list): The knowledge points that may fall.
+            on_screen (set): The knowledge points currently on screen.
+        """
+        # Only the points on screen are state, the weights come from config
+        self.build(knowledge_list, on_screen)
+
+
+class SpacedRepetitionScheduler(KnowledgeScheduler):
+    """
+    Hands out the knowledge point that is due soonest, Leitner style.
+
+    Every time a point is shown without the user opening it, it moves up a
+    box and is shown again after a doubled interval; opening its details
+    sends it back to the first box so it returns quickly. Intervals are
+    counted in spawned raindrops.
+
+    Attributes:
+        boxes (dict): The box of each knowledge point.
+        viewed (set): The points on screen whose details were opened.
+        step (int): The number of points handed out.
+        heap (list): (due step, sequence, knowledge point) entries of the
+                     inactive points.
+    """
+
+    def __init__(self, knowledge_list, rng=None, weights=None):
+        """
+        Make every knowledge point due now, in deck order.
+
+        Args:
+            knowledge_list (list): The knowledge points of the deck.
+            rng (random.Random): Unused, for a common signature.
+            weights (dict): Unused, for a common signature.
+        """
+        super().__init__(knowledge_list, rng, weights)
+        self.boxes = dict.fromkeys(knowledge_list, 0)
+        self.viewed = set()
+        self.step = 0
+        self.heap = [
+            (0, index, knowledge) for index, knowledge in enumerate(knowledge_list)
+        ]
+        self.sequence = len(self.heap)
+
+    def acquire(self):
+        """
+        Take the point that is due soonest.
+
+        Returns:
+            str: The knowledge point, or None if all of them are on screen.
+        """
+        if not self.heap:
+            return None
+        self.step += 1
+        return heapq.heappop(self.heap)[2]
+
+    def release(self, knowledge):
+        """
+        Move a knowledge point to its next box, or back to the first if its
+        details were opened, and schedule it after the box's interval.
+
+        Args:
+            knowledge (str): The knowledge point leaving the screen.
+        """
+        if knowledge in self.viewed:
+            self.viewed.discard(knowledge)
+            self.boxes[knowledge] = 0
+        else:
+            self.boxes[knowledge] = self.boxes.get(knowledge, 0) + 1
+        due = self.step + 2 ** self.boxes[knowledge]
+        self.sequence += 1
+        heapq.heappush(self.heap, (due, self.sequence, knowledge))
+
+    def cancel(self, knowledge):
+        """
+        Make a knowledge point due again without changing its box, as it
+        was not shown.
+
+        Args:
+            knowledge (str): The knowledge point to return.
+        """
+        self.sequence += 1
+        heapq.heappush(self.heap, (self.step, self.sequence, knowledge))
+
+    def record_view(self, knowledge):
+        """
+        Remember that the details of a knowledge point were opened, so it
+        returns to the first box when released.
+
+        Args:
+            knowledge (str): The knowledge point that was viewed.
+        """
+        self.viewed.add(knowledge)
+
+    def update_points(self, knowledge_list, on_screen):
+        """
+        Unschedule the points that were removed and make new points due
+        now, keeping the boxes and due steps of the points that remain.
+
+        Args:
+            knowledge_list (list): The knowledge points that may fall.
+            on_screen (set): The knowledge points currently on screen.
+        """
+        points = set(knowledge_list)
+        scheduled = {entry[2] for entry in self.heap}
+        self.heap = [entry for entry in self.heap if entry[2] in points]
+        # Boxes of points filtered out are kept in case they come back
+        for knowledge in knowledge_list:
+            if knowledge not in scheduled and knowledge not in on_screen:
+                self.boxes.setdefault(knowledge, 0)
+                self.sequence += 1
+                self.heap.append((self.step, self.sequence, knowledge))
+        heapq.heapify(self.heap)
+
+
+# Ordering strategies selectable with config.KNOWLEDGE_ORDER
+SCHEDULERS = {
+    "sequential": SequentialScheduler,
+    "shuffled": ShuffledScheduler,
+    "weighted": WeightedScheduler,
+    "spaced": SpacedRepetitionScheduler,
+}
+
+
+def create_scheduler(order, knowledge_list, rng=None, weights=None):
+    """
+    Create the scheduler for an ordering strategy.
+
+    Args:
+        order (str): The strategy name, one of SCHEDULERS.
+        knowledge_list (list): The knowledge points of the deck.
+        rng (random.Random): Optional random number generator.
+        weights (dict): Optional weight of each knowledge point.
+
+    Returns:
+        KnowledgeScheduler: The scheduler.
+
+    Raises:
+        ValueError: If the strategy name is unknown.
+    """
+    try:
+        scheduler_class = SCHEDULERS[order]
+    except KeyError:
+        raise ValueError(f"Unknown knowledge order: {order}") from None
+    return scheduler_class(knowledge_list, rng, weights)
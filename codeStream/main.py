@@ -1,16 +1,55 @@
 import time
 import tkinter as tk
 from tkinter import ttk, messagebox
-import json
 from codeStream.Instructions_manager import InstructionsManager
+from codeStream.background_loader import BackgroundLoader
+from codeStream.deck_cache import DeckCache
 from codeStream.config import QUOTES_FILE_PATH, KNOWLEDGE_FILE_PATH
+from codeStream.font_cache import get_font_cache
+from codeStream.hot_reload import DeckWatcher
 from codeStream.json_file_manager import JsonFileManager
-from codeStream.knowledge_rain import KnowledgeRain
+from codeStream.json_stream import KnowledgeFileError, iter_chapters, load_chapters
+from codeStream.knowledge_deck import (
+    KnowledgeDeck,
+    compile_deck,
+    compiled_deck_path,
+    is_deck_current,
+)
 from codeStream import config
 from codeStream.quotes_manager import QuotesManager
+from codeStream.search_index import SearchIndex
+from codeStream.study_log import open_study_log
 from codeStream.style_manager import StyleManager
 
 
+def open_deck(task, json_file):
+    """
+    Open the compiled deck of a JSON knowledge file, compiling it from a
+    validating stream of its chapters first if needed. Runs on a loading
+    thread.
+
+    Args:
+        task (LoadTask): The load task, for progress and cancellation.
+        json_file (str): The path to the JSON knowledge file.
+
+    Returns:
+        KnowledgeDeck: The opened deck.
+    """
+    deck_path = compiled_deck_path(json_file, config.COMPILED_DECK_SUFFIX)
+    if not is_deck_current(deck_path, json_file):
+
+        def chapters():
+            """Stream chapters, stopping early if the load is cancelled."""
+            for chapter, knowledge_points in iter_chapters(
+                json_file, progress=task.report_progress
+            ):
+                task.check_cancelled()
+                yield chapter, knowledge_points
+
+        compile_deck(chapters(), deck_path, json_file)
+    return KnowledgeDeck(deck_path)
+
+
 class KnowledgeRainApp:
     """
     The main application class for the Knowledge Rain App.
@@ -24,8 +63,9 @@ class KnowledgeRainApp:
                     Path to the quotes JSON file.
         fullscreen (tk.BooleanVar):
                     Boolean variable to track fullscreen mode.
-        chapters (dict):
-                    Dictionary to store chapters and their knowledge points.
+        chapters (Mapping):
+                    Mapping of chapters to their knowledge points, backed
+                    by the compiled deck.
         start_time (float):
                     The start time of the application.
         style_manager (StyleManager):
@@ -37,6 +77,29 @@ class KnowledgeRainApp:
                     Instance of JsonFileManager to manage JSON files.
         instructions_manager (InstructionsManager):
                     Instance of InstructionsManager to manage instructions.
+        loader (BackgroundLoader):
+                    Runs file loading off the Tk main thread.
+        load_task (LoadTask):
+                    The chapter load in progress, if any.
+        rain (KnowledgeRain):
+                    The rain engine, kept between runs once created.
+        rain_chapter (str):
+                    The chapter shown by the rain, None for all chapters.
+        rain_points (Mapping):
+                    The knowledge points last given to the rain.
+        watcher (DeckWatcher):
+                    Watches the JSON file for edits, see config.HOT_RELOAD.
+        json_file_changed (bool):
+                    Whether the JSON file changed since the chapters were
+                    last loaded.
+        search_index (SearchIndex):
+                    The search index of the deck, built in the background
+                    when the deck is first searched.
+        search_task (LoadTask):
+                    The search index build in progress, if any.
+        study_log (StudyLog):
+                    Logs the knowledge points opened in the rain, opened
+                    in the background at startup, see config.STUDY_LOG_PATH.
     """
 
     def __init__(self, root):
@@ -57,19 +120,71 @@ class KnowledgeRainApp:
         self.chapters = {}
         self.start_time = time.time()
 
+        self.load_task = None
+        self.rain = None
+        self.rain_chapter = None
+        self.rain_points = {}
+        self.watcher = None
+        self.json_file_changed = False
+        self.search_index = None
+        self.search_task = None
+        self.study_log = None
+
         self.style_manager = StyleManager(self.root)
 
-        self.quotes_manager = QuotesManager(self.quotes_file)
+        # Files are read in the background so the window paints instantly
+        self.loader = BackgroundLoader(
+            self.root, config.LOADER_WORKERS, config.LOADER_POLL_INTERVAL
+        )
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        self.quotes_manager = QuotesManager(self.quotes_file, load=False)
 
-        self.daily_quote = self.quotes_manager.get_daily_quote()
+        self.daily_quote = ""
 
         self.json_file_manager = JsonFileManager(self.root)
 
         self.create_widgets()
+        self.load_quotes()
         self.load_chapters()
+        if config.HOT_RELOAD:
+            self.check_json_file_changed()
+
+        # Resolve the rain font ahead of time so the first start is quick
+        self.loader.submit(
+            lambda task: get_font_cache(config.FONT_CACHE_FILE_PATH).resolve(
+                config.FONT_NAME
+            ),
+            name="fonts",
+        )
 
-        self.instructions_manager = InstructionsManager(self.root)
-        self.instructions_manager.check_and_show_instructions()
+        # Opening the study log creates its database, so it is done off the
+        # Tk thread too
+        self.loader.submit(
+            lambda task: open_study_log(),
+            name="study log",
+            on_done=self.on_study_log_opened,
+        )
+
+        self.instructions_manager = InstructionsManager(self.root, load=False)
+        self.loader.submit(
+            lambda task: self.instructions_manager.load_or_create_config(),
+            name="instructions",
+            on_done=self.on_instructions_loaded,
+            on_error=lambda e: messagebox.showerror(
+                "错误", f"加载使用说明配置时发生错误: {str(e)}"
+            ),
+        )
+
+    def on_study_log_opened(self, study_log):
+        """
+        Use the study log opened in the background.
+
+        Args:
+            study_log (StudyLog): The log, or None if it is disabled or could
+                                  not be opened.
+        """
+        self.study_log = study_log
 
     def create_widgets(self):
         """
@@ -79,14 +194,14 @@ class KnowledgeRainApp:
         main_frame.pack(expand=True, fill="both")
 
         # Component: Daily Quote
-        quote_label = ttk.Label(
+        self.quote_label = ttk.Label(
             main_frame,
             text=self.daily_quote,
             font=self.style_manager.font_large,
             wraplength=700,
             justify="center",
         )
-        quote_label.pack(pady=(0, 30))
+        self.quote_label.pack(pady=(0, 30))
 
         # Component: Title
         title_label = ttk.Label(
@@ -105,6 +220,29 @@ class KnowledgeRainApp:
             chapter_frame, font=self.style_manager.font_normal, state="readonly"
         )
         self.chapter_combobox.pack(side="left", fill="x", expand=True)
+        self.chapter_combobox.bind(
+            "<<ComboboxSelected>>", lambda event: self.update_search_count()
+        )
+
+        # Component: Search Frame
+        search_frame = ttk.Frame(main_frame)
+        search_frame.pack(fill="x", pady=(0, 20))
+        search_label = ttk.Label(
+            search_frame, text="搜索知识点:", font=self.style_manager.font_normal
+        )
+        search_label.pack(side="left", padx=(0, 10))
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", lambda *args: self.update_search_count())
+        search_entry = ttk.Entry(
+            search_frame,
+            textvariable=self.search_var,
+            font=self.style_manager.font_normal,
+        )
+        search_entry.pack(side="left", fill="x", expand=True)
+        self.search_count_label = ttk.Label(
+            search_frame, font=self.style_manager.font_small
+        )
+        self.search_count_label.pack(side="left", padx=(10, 0))
 
         # Component: Fullscreen Mode Checkbox
         fullscreen_frame = ttk.Frame(main_frame)
@@ -136,7 +274,7 @@ class KnowledgeRainApp:
         self.select_file_button = ttk.Button(
             button_frame,
             text="选择JSON文件",
-            command=self.json_file_manager.select_json_file,
+            command=self.select_json_file,
         )
         self.select_file_button.pack(side=tk.LEFT, padx=5)
 
@@ -146,6 +284,21 @@ class KnowledgeRainApp:
         )
         self.start_button.pack(side=tk.LEFT, padx=5)
 
+        # Component: Loading Progress, shown while chapters are loading
+        self.progress_frame = ttk.Frame(main_frame)
+        self.progress_bar = ttk.Progressbar(
+            self.progress_frame, mode="determinate", maximum=1.0, length=300
+        )
+        self.progress_bar.pack(side=tk.LEFT, padx=5)
+        self.progress_label = ttk.Label(
+            self.progress_frame, font=self.style_manager.font_small
+        )
+        self.progress_label.pack(side=tk.LEFT, padx=5)
+        cancel_button = ttk.Button(
+            self.progress_frame, text="取消", command=self.cancel_loading
+        )
+        cancel_button.pack(side=tk.LEFT, padx=5)
+
         # Footer
         footer_frame = ttk.Frame(self.root)
         footer_frame.pack(side="bottom", fill="x")
@@ -154,23 +307,361 @@ class KnowledgeRainApp:
         )
         footer_label.pack(pady=10)
 
+    def load_quotes(self):
+        """
+        Load the quotes in the background and show the daily quote.
+        """
+
+        def on_done(quotes):
+            self.quotes_manager.set_quotes(quotes)
+            self.show_daily_quote()
+
+        def on_error(error):
+            self.quotes_manager.show_load_error(error)
+            self.show_daily_quote()
+
+        self.loader.submit(
+            lambda task: self.quotes_manager.read_quotes(),
+            name="quotes",
+            on_done=on_done,
+            on_error=on_error,
+        )
+
+    def show_daily_quote(self):
+        """
+        Show the daily quote once the quotes are loaded.
+        """
+        self.daily_quote = self.quotes_manager.get_daily_quote()
+        self.quote_label.configure(text=self.daily_quote)
+
+    def on_instructions_loaded(self, instructions_config):
+        """
+        Show the instructions once their configuration is loaded.
+
+        Args:
+            instructions_config (dict): The instructions configuration.
+        """
+        self.instructions_manager.config = instructions_config
+        self.instructions_manager.check_and_show_instructions()
+
+    def select_json_file(self):
+        """
+        Let the user select a JSON knowledge file and load its chapters.
+        """
+        file_path = self.json_file_manager.ask_json_file()
+        if file_path:
+            self.json_file = file_path
+            self.load_chapters()
+
     def load_chapters(self):
         """
-        Load chapters from the JSON file.
+        Load chapters from the compiled deck of the JSON file in the
+        background, compiling it first if it is missing or older than the
+        JSON file. Chapters are listed as soon as they are parsed.
         """
-        try:
-            with open(self.json_file, "r", encoding="utf-8") as file:
-                data = json.load(file)
-                self.chapters = data
-                self.chapter_combobox["values"] = list(data.keys())
-                if self.chapter_combobox["values"]:
-                    self.chapter_combobox.set(self.chapter_combobox["values"][0])
-        except FileNotFoundError:
+        self.cancel_loading()
+        selected = self.chapter_combobox.get()
+        # The load may compile the deck again over the old file, which fails
+        # on Windows while it is open, so the old deck is closed first
+        if self.search_task is not None:
+            self.search_task.cancel()
+            self.search_task = None
+        self.search_index = None
+        if isinstance(self.chapters, KnowledgeDeck):
+            self.chapters.close()
+        self.chapters = {}
+        self.chapter_combobox["values"] = ()
+        self.chapter_combobox.set("")
+        self.progress_bar["value"] = 0
+        self.progress_label.configure(text="正在加载章节...")
+        self.progress_frame.pack(pady=(0, 10))
+        self.start_button.state(["disabled"])
+        self.json_file_changed = False
+        self.load_task = self.loader.submit(
+            open_deck,
+            self.json_file,
+            name=self.json_file,
+            on_done=lambda deck: self.on_chapters_loaded(deck, selected),
+            on_error=self.on_chapters_error,
+            on_progress=self.on_chapters_progress,
+        )
+        if config.HOT_RELOAD:
+            self.watch_json_file()
+
+    def on_chapters_progress(self, fraction, chapter):
+        """
+        List a newly parsed chapter and update the loading progress.
+
+        Args:
+            fraction (float): The fraction of the file parsed.
+            chapter (str): The chapter just parsed.
+        """
+        self.chapter_combobox["values"] = (*self.chapter_combobox["values"], chapter)
+        self.progress_bar["value"] = fraction
+        self.progress_label.configure(text=f"正在加载: {chapter} ({fraction:.0%})")
+
+    def on_chapters_loaded(self, deck, selected=None):
+        """
+        Use a loaded deck and list its chapters.
+
+        Args:
+            deck (KnowledgeDeck): The loaded deck.
+            selected (str): Optional chapter to keep selected if the deck
+                            still has it, e.g. when the file is reloaded.
+        """
+        if isinstance(self.chapters, KnowledgeDeck):
+            self.chapters.close()
+        self.chapters = deck
+        self.chapter_combobox["values"] = list(self.chapters.keys())
+        if selected in self.chapters:
+            self.chapter_combobox.set(selected)
+        elif self.chapter_combobox["values"]:
+            self.chapter_combobox.set(self.chapter_combobox["values"][0])
+        self.finish_loading()
+
+        if self.search_task is not None:
+            self.search_task.cancel()
+            self.search_task = None
+        self.search_index = None
+        self.update_search_count()
+
+    def index_deck(self):
+        """
+        Build the search index of the deck in the background, unless it is
+        already built or being built. Every explanation is read, so this
+        waits until the deck is first searched.
+        """
+        if self.search_index is not None or self.search_task is not None:
+            return
+        if not isinstance(self.chapters, KnowledgeDeck):
+            return
+        deck = self.chapters
+        self.search_task = self.loader.submit(
+            lambda task: SearchIndex(deck.all_points()),
+            name="search",
+            on_done=self.on_search_index_built,
+            on_error=self.on_search_index_error,
+        )
+
+    def on_search_index_built(self, index):
+        """
+        Use the search index of the deck.
+
+        Args:
+            index (SearchIndex): The search index.
+        """
+        self.search_task = None
+        self.search_index = index
+        self.update_search_count()
+
+    def on_search_index_error(self, error):
+        """
+        Report an error raised while indexing the deck.
+
+        Args:
+            error (Exception): The error.
+        """
+        self.search_task = None
+        print(f"建立搜索索引失败: {error}")
+
+    def get_search_matches(self):
+        """
+        Get the knowledge points matching the search query.
+
+        Returns:
+            set: The matching knowledge points, or None if there is no query
+            or the deck is not indexed yet.
+        """
+        query = self.search_var.get()
+        if not query.strip():
+            return None
+        if self.search_index is None:
+            self.index_deck()
+            return None
+        return self.search_index.search(query)
+
+    def update_search_count(self):
+        """
+        Show how many knowledge points of the selected chapter match the
+        search query.
+        """
+        matches = self.get_search_matches()
+        if matches is None:
+            indexing = self.search_task is not None and self.search_var.get().strip()
+            self.search_count_label.configure(text="正在建立索引" if indexing else "")
+            return
+        chapter = self.chapters.get(self.chapter_combobox.get(), {})
+        count = sum(1 for knowledge in matches if knowledge in chapter)
+        self.search_count_label.configure(text=f"匹配 {count} 个知识点")
+
+    def on_chapters_error(self, error):
+        """
+        Report an error raised while loading the chapters.
+
+        Args:
+            error (Exception): The error.
+        """
+        self.finish_loading()
+        if isinstance(error, FileNotFoundError):
             messagebox.showerror("错误", f"文件未找到: {self.json_file}")
-        except json.JSONDecodeError:
-            messagebox.showerror("错误", "JSON文件格式错误")
-        except Exception as e:
-            messagebox.showerror("错误", f"加载章节时发生错误: {str(e)}")
+        elif isinstance(error, KnowledgeFileError):
+            messagebox.showerror("错误", f"JSON文件格式错误: {str(error)}")
+        else:
+            messagebox.showerror("错误", f"加载章节时发生错误: {str(error)}")
+
+    def cancel_loading(self):
+        """
+        Cancel the chapter load in progress, if any.
+        """
+        if self.load_task is not None:
+            self.load_task.cancel()
+            self.finish_loading()
+
+    def finish_loading(self):
+        """
+        Hide the loading progress and re-enable starting the rain.
+        """
+        self.load_task = None
+        self.progress_frame.pack_forget()
+        self.start_button.state(["!disabled"])
+
+    def watch_json_file(self):
+        """
+        Watch the JSON file for edits, replacing the watcher of a previous
+        file.
+        """
+        if self.watcher is not None:
+            if self.watcher.path == self.json_file:
+                return
+            self.watcher.stop()
+        self.watcher = DeckWatcher(
+            self.json_file,
+            self.on_json_file_changed,
+            config.HOT_RELOAD_POLL_INTERVAL,
+            config.HOT_RELOAD_SETTLE_TIME,
+            cache=(
+                DeckCache(config.DECK_CACHE_DIR, config.DECK_CACHE_MAX_BYTES)
+                if config.DECK_CACHE_DIR
+                else None
+            ),
+        )
+        self.watcher.start()
+
+    def on_json_file_changed(self, chapters, decoded, changed):
+        """
+        Swap the edited chapters into the running rain. Called on the
+        watcher thread; the chapter list is reloaded by
+        check_json_file_changed once the Tk window is back.
+
+        Args:
+            chapters (dict): The knowledge point titles of each chapter.
+            decoded (dict): The knowledge points of the chapters that were
+                            decoded again. The points of the other chapters
+                            are taken from the deck last given to the rain,
+                            or the whole file is decoded if that deck lacks
+                            some of them.
+            changed (set): The knowledge points added, removed or edited.
+        """
+        self.json_file_changed = True
+        rain = self.rain
+        if rain is None or not rain.running:
+            return
+        if self.rain_chapter is None:
+            shown = chapters.keys()
+        else:
+            shown = [self.rain_chapter] if self.rain_chapter in chapters else []
+        if not all(
+            knowledge in self.rain_points
+            for chapter in shown
+            if chapter not in decoded
+            for knowledge in chapters[chapter]
+        ):
+            # The rain was started from an older deck than the watcher last
+            # read, e.g. before the app reloaded an edited file
+            decoded = load_chapters(self.json_file)
+        knowledge_points = {}
+        for chapter in shown:
+            if chapter in decoded:
+                knowledge_points.update(decoded[chapter])
+            else:
+                knowledge_points.update(
+                    (knowledge, self.rain_points[knowledge])
+                    for knowledge in chapters[chapter]
+                )
+        self.rain_points = knowledge_points
+        rain.study_chapters = {
+            knowledge: chapter
+            for chapter, titles in chapters.items()
+            for knowledge in titles
+        }
+        rain.post_deck_update(knowledge_points, changed)
+
+    def check_json_file_changed(self):
+        """
+        Reload the chapters after the JSON file changed, then check again
+        after config.HOT_RELOAD_POLL_INTERVAL.
+        """
+        if self.json_file_changed and self.load_task is None:
+            self.load_chapters()
+        self.root.after(
+            int(config.HOT_RELOAD_POLL_INTERVAL * 1000), self.check_json_file_changed
+        )
+
+    def on_close(self):
+        """
+        Cancel background loads and close the application.
+        """
+        if self.watcher is not None:
+            self.watcher.stop()
+        self.loader.shutdown()
+        if self.rain is not None:
+            self.rain.close()
+        if self.study_log is not None:
+            self.study_log.close()
+        self.root.destroy()
+
+    def run_rain(
+        self,
+        width,
+        height,
+        knowledge_points,
+        fullscreen=False,
+        query="",
+        chapters=None,
+    ):
+        """
+        Run the rain on a deck, reusing the rain engine of earlier runs
+        unless the window size or mode changed.
+
+        Args:
+            width (int): The width of the rain window.
+            height (int): The height of the rain window.
+            knowledge_points (Mapping): The knowledge points to show.
+            fullscreen (bool): Whether to run in fullscreen mode.
+            query (str): The search query restricting the points shown.
+            chapters (Mapping): The chapter of each knowledge point, logged
+                                with the points opened.
+        """
+        # pygame is only imported once the rain is first started
+        from codeStream.knowledge_rain import KnowledgeRain
+
+        rain = self.rain
+        if rain is not None and (rain.width, rain.height, rain.fullscreen) != (
+            width,
+            height,
+            fullscreen,
+        ):
+            rain.close()
+            rain = None
+        if rain is None:
+            rain = KnowledgeRain(width, height, fullscreen=fullscreen)
+        self.rain = rain
+        rain.study_log = self.study_log
+        rain.study_chapters = chapters or {}
+        rain.load_deck(knowledge_points, self.search_index)
+        self.rain_points = knowledge_points
+        rain.search(query)
+        rain.start()
 
     def start_knowledge_rain(self):
         """
@@ -182,11 +673,22 @@ class KnowledgeRainApp:
             return
 
         selected_knowledge = self.chapters.get(selected_chapter, {})
+        self.rain_chapter = selected_chapter
 
         if not selected_knowledge:
             messagebox.showwarning("警告", f"章节 '{selected_chapter}' 的内容为空")
             return
 
+        matches = self.get_search_matches()
+        if matches is not None and not any(
+            knowledge in selected_knowledge for knowledge in matches
+        ):
+            messagebox.showwarning(
+                "警告",
+                f"章节 '{selected_chapter}' 中没有匹配 '{self.search_var.get()}' 的知识点",
+            )
+            return
+
         screen_width = self.root.winfo_screenwidth()
         screen_height = self.root.winfo_screenheight()
 
@@ -200,10 +702,14 @@ class KnowledgeRainApp:
                 width = config.WIDTH
                 height = config.HEIGHT
 
-            rain = KnowledgeRain(
-                width, height, selected_knowledge, fullscreen=self.fullscreen.get()
+            self.run_rain(
+                width,
+                height,
+                selected_knowledge,
+                fullscreen=self.fullscreen.get(),
+                query=self.search_var.get(),
+                chapters=dict.fromkeys(selected_knowledge, selected_chapter),
             )
-            rain.run()
         except AttributeError:
             messagebox.showerror("错误", "配置文件中缺少必要的宽度或高度设置")
         except Exception as e:
@@ -215,9 +721,8 @@ class KnowledgeRainApp:
         """
         Display all knowledge points from the JSON file.
         """
-        all_knowledge = {}
-        for chapter, knowledge_points in self.chapters.items():
-            all_knowledge.update(knowledge_points)
+        all_knowledge = self.chapters.all_points()
+        self.rain_chapter = None
 
         screen_width = self.root.winfo_screenwidth()
         screen_height = self.root.winfo_screenheight()
@@ -225,8 +730,13 @@ class KnowledgeRainApp:
         self.root.withdraw()
 
         try:
-            rain = KnowledgeRain(screen_width, screen_height, all_knowledge)
-            rain.run()
+            self.run_rain(
+                screen_width,
+                screen_height,
+                all_knowledge,
+                query=self.search_var.get(),
+                chapters=self.chapters.point_chapters(),
+            )
         except Exception as e:
             messagebox.showerror("错误", f"启动知识雨时发生错误: {str(e)}")
         finally:
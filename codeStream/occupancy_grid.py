@@ -0,0 +1,134 @@
+class OccupancyGrid:
+    """
+    A bit-packed occupancy grid for raindrop placement.
+
+    Each row is stored as a single integer bitmask where bit ``i`` marks
+    column ``i`` as occupied, so spans of columns are occupied, released
+    and moved between rows with a few bit operations, and free runs are
+    found without scanning columns one by one.
+
+    Attributes:
+        columns (int): The number of grid columns.
+        rows (list): The occupancy bitmask of each grid row.
+    """
+
+    def __init__(self, columns, rows):
+        """
+        Initialize the OccupancyGrid with all cells free.
+
+        Args:
+            columns (int): The number of grid columns.
+            rows (int): The number of grid rows.
+        """
+        self.columns = columns
+        self.rows = [0] * rows
+        self.full = (1 << columns) - 1
+
+    @staticmethod
+    def span_mask(column, span):
+        """
+        Get the bitmask of a span of columns.
+
+        Args:
+            column (int): The first column of the span.
+            span (int): The number of columns.
+
+        Returns:
+            int: The bitmask with the span's bits set.
+        """
+        return ((1 << span) - 1) << column
+
+    def is_free(self, row, column, span):
+        """
+        Check whether a span of cells in a row is free.
+
+        Args:
+            row (int): The grid row.
+            column (int): The first column of the span.
+            span (int): The number of columns.
+
+        Returns:
+            bool: True if every cell of the span is free.
+        """
+        return not self.rows[row] & self.span_mask(column, span)
+
+    def occupy(self, row, column, span):
+        """
+        Mark a span of cells in a row as occupied.
+
+        Args:
+            row (int): The grid row.
+            column (int): The first column of the span.
+            span (int): The number of columns.
+        """
+        self.rows[row] |= self.span_mask(column, span)
+
+    def release(self, row, column, span):
+        """
+        Mark a span of cells in a row as free.
+
+        Args:
+            row (int): The grid row.
+            column (int): The first column of the span.
+            span (int): The number of columns.
+        """
+        self.rows[row] &= ~self.span_mask(column, span)
+
+    def move(self, column, span, old_row, new_row):
+        """
+        Move an occupied span from one row to another.
+
+        Args:
+            column (int): The first column of the span.
+            span (int): The number of columns.
+            old_row (int): The row the span leaves.
+            new_row (int): The row the span enters.
+        """
+        mask = self.span_mask(column, span)
+        self.rows[old_row] &= ~mask
+        self.rows[new_row] |= mask
+
+    def free_runs(self, row, span):
+        """
+        Get the start columns of every free run of a given length in a row.
+
+        Args:
+            row (int): The grid row.
+            span (int): The length of the run.
+
+        Returns:
+            int: A bitmask where bit ``i`` is set if columns ``i`` to
+            ``i + span - 1`` are all free.
+        """
+        runs = ~self.rows[row] & self.full
+        # Shift-and the free mask with itself, doubling the covered length
+        # each step, so only O(log span) operations are needed
+        length = 1
+        while length < span and runs:
+            step = min(length, span - length)
+            runs &= runs >> step
+            length += step
+        return runs
+
+    def find_free_run(self, row, span, start):
+        """
+        Find a free run of columns in a row, preferring the first one at or
+        right of a start column and wrapping around to the left.
+
+        Args:
+            row (int): The grid row.
+            span (int): The length of the run.
+            start (int): The preferred start column.
+
+        Returns:
+            int: The first column of the run, or None if no run is free.
+        """
+        if span > self.columns:
+            return None
+        runs = self.free_runs(row, span)
+        if not runs:
+            return None
+        right = runs >> start
+        if right:
+            return start + (right & -right).bit_length() - 1
+        return (runs & -runs).bit_length() - 1
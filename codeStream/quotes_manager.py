@@ -14,39 +14,73 @@ class QuotesManager:
         quotes (list): The list of quotes.
     """
 
-    def __init__(self, quotes_file):
+    def __init__(self, quotes_file, load=True):
         """
         Initialize the QuotesManager instance.
 
         Args:
             quotes_file (str): The path to the quotes file.
+            load (bool): Whether to load the quotes right away. When False,
+                         the quotes are empty until read_quotes is run (e.g.
+                         in the background) and passed to set_quotes.
         """
         self.quotes_file = quotes_file
-        self.quotes = self.load_quotes()
+        self.quotes = self.load_quotes() if load else []
 
-    def load_quotes(self):
+    def read_quotes(self):
         """
-        Load the JSON quotes file.
+        Read the JSON quotes file without any UI interaction, so it can run
+        on a background thread.
 
         Returns:
-            list: The list of quotes, or an empty list if loading fails.
+            list: The list of quotes.
+
+        Raises:
+            FileNotFoundError: If the quotes file does not exist.
+            json.JSONDecodeError: If the quotes file is not valid JSON.
         """
-        try:
-            with open(self.quotes_file, "r", encoding="utf-8") as file:
-                data = json.load(file)
-                return data.get("quotes", [])
-        except FileNotFoundError:
+        with open(self.quotes_file, "r", encoding="utf-8") as file:
+            data = json.load(file)
+            return data.get("quotes", [])
+
+    def set_quotes(self, quotes):
+        """
+        Set the quotes after reading them.
+
+        Args:
+            quotes (list): The list of quotes.
+        """
+        self.quotes = quotes
+
+    def show_load_error(self, error):
+        """
+        Show a message for an error raised while reading the quotes.
+
+        Args:
+            error (Exception): The error raised by read_quotes.
+        """
+        if isinstance(error, FileNotFoundError):
             messagebox.showwarning(
                 "Warning", f"Quotes file not found: {self.quotes_file}"
             )
-            return []
-        except json.JSONDecodeError:
+        elif isinstance(error, json.JSONDecodeError):
             messagebox.showerror("Error", "Quotes file format error")
-            return []
-        except Exception as e:
+        else:
             messagebox.showerror(
-                "Error", f"An error occurred while loading quotes: {str(e)}"
+                "Error", f"An error occurred while loading quotes: {str(error)}"
             )
+
+    def load_quotes(self):
+        """
+        Load the JSON quotes file.
+
+        Returns:
+            list: The list of quotes, or an empty list if loading fails.
+        """
+        try:
+            return self.read_quotes()
+        except Exception as e:
+            self.show_load_error(e)
             return []
 
     def get_daily_quote(self):
@@ -60,7 +94,7 @@ class QuotesManager:
             return "Keep going today!"
 
         # Use the date as a random seed to ensure the same quote is shown
-        # each day
-        random.seed(date.today().toordinal())
-        quote = random.choice(self.quotes)
+        # each day, without reseeding the global random module
+        rng = random.Random(date.today().toordinal())
+        quote = rng.choice(self.quotes)
         return f"{quote['text']} \n\n—— {quote['author']}"
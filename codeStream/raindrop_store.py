@@ -0,0 +1,150 @@
+import numpy as np
+
+
+class RaindropStore:
+    """
+    A struct-of-arrays store for raindrops backed by parallel NumPy arrays.
+
+    Each raindrop occupies a slot across the arrays. Removed slots are kept
+    on a free list and reused, so adding and removing raindrops is O(1) and
+    per-frame updates can run as batched array operations over the alive
+    slots.
+
+    Attributes:
+        x (numpy.ndarray): The x coordinate of each raindrop.
+        y (numpy.ndarray): The y coordinate of each raindrop.
+        speed (numpy.ndarray): The fall speed in pixels per second.
+        text_id (numpy.ndarray): The index of the knowledge point shown.
+        grid_x (numpy.ndarray): The first grid column occupied.
+        grid_y (numpy.ndarray): The grid row occupied.
+        cells (numpy.ndarray): The number of grid columns occupied.
+        width (numpy.ndarray): The width of the rendered text.
+        height (numpy.ndarray): The height of the rendered text.
+        alive (numpy.ndarray): Whether each slot holds a raindrop.
+    """
+
+    def __init__(self, capacity=64):
+        """
+        Initialize the RaindropStore.
+
+        Args:
+            capacity (int): The initial number of slots.
+        """
+        self.x = np.zeros(capacity, dtype=np.float64)
+        self.y = np.zeros(capacity, dtype=np.float64)
+        self.speed = np.zeros(capacity, dtype=np.float64)
+        self.text_id = np.zeros(capacity, dtype=np.int32)
+        self.grid_x = np.zeros(capacity, dtype=np.int32)
+        self.grid_y = np.zeros(capacity, dtype=np.int32)
+        self.cells = np.zeros(capacity, dtype=np.int32)
+        self.width = np.zeros(capacity, dtype=np.int32)
+        self.height = np.zeros(capacity, dtype=np.int32)
+        self.alive = np.zeros(capacity, dtype=bool)
+        # Pop from the end so the lowest slots are used first
+        self.free = list(range(capacity - 1, -1, -1))
+        self.count = 0
+
+    def __len__(self):
+        """Return the number of raindrops in the store."""
+        return self.count
+
+    @property
+    def capacity(self):
+        """The number of allocated slots."""
+        return len(self.alive)
+
+    def grow(self):
+        """
+        Double the number of slots, keeping existing raindrops.
+        """
+        old_capacity = self.capacity
+        new_capacity = old_capacity * 2
+        for name in (
+            "x",
+            "y",
+            "speed",
+            "text_id",
+            "grid_x",
+            "grid_y",
+            "cells",
+            "width",
+            "height",
+            "alive",
+        ):
+            old = getattr(self, name)
+            new = np.zeros(new_capacity, dtype=old.dtype)
+            new[:old_capacity] = old
+            setattr(self, name, new)
+        self.free.extend(range(new_capacity - 1, old_capacity - 1, -1))
+
+    def add(self, x, y, speed, text_id, grid_x, grid_y, cells, width, height):
+        """
+        Add a raindrop to a free slot.
+
+        Args:
+            x (float): The x coordinate.
+            y (float): The y coordinate.
+            speed (float): The fall speed in pixels per second.
+            text_id (int): The index of the knowledge point shown.
+            grid_x (int): The first grid column occupied.
+            grid_y (int): The grid row occupied.
+            cells (int): The number of grid columns occupied.
+            width (int): The width of the rendered text.
+            height (int): The height of the rendered text.
+
+        Returns:
+            int: The slot of the new raindrop.
+        """
+        if not self.free:
+            self.grow()
+        slot = self.free.pop()
+        self.x[slot] = x
+        self.y[slot] = y
+        self.speed[slot] = speed
+        self.text_id[slot] = text_id
+        self.grid_x[slot] = grid_x
+        self.grid_y[slot] = grid_y
+        self.cells[slot] = cells
+        self.width[slot] = width
+        self.height[slot] = height
+        self.alive[slot] = True
+        self.count += 1
+        return slot
+
+    def remove(self, slot):
+        """
+        Remove the raindrop in a slot and return the slot to the free list.
+
+        Args:
+            slot (int): The slot to free.
+        """
+        if self.alive[slot]:
+            self.alive[slot] = False
+            self.free.append(int(slot))
+            self.count -= 1
+
+    def active_slots(self):
+        """
+        Get the slots currently holding raindrops.
+
+        Returns:
+            numpy.ndarray: The alive slots in ascending order.
+        """
+        return np.flatnonzero(self.alive)
+
+    def rect(self, slot):
+        """
+        Get the screen rect of a raindrop as a tuple.
+
+        Args:
+            slot (int): The raindrop slot.
+
+        Returns:
+            tuple: (x, y, width, height) in whole pixels.
+        """
+        return (
+            int(self.x[slot]),
+            int(self.y[slot]),
+            int(self.width[slot]),
+            int(self.height[slot]),
+        )
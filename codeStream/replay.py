@@ -0,0 +1,63 @@
+"""
+Replay a recorded knowledge rain session headless, as fast as possible.
+
+Sessions are recorded by setting config.RECORDING_PATH. The replay runs
+with the SDL dummy video driver on the same deck and reports the frame
+timings of the reproduced session:
+
+    python -m codeStream.replay recording.json --deck knowledge.json
+"""
+
+import argparse
+import os
+import time
+
+# Must be set before pygame opens a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from codeStream import config  # noqa: E402
+from codeStream.input_recording import InputRecording  # noqa: E402
+from codeStream.json_stream import load_chapters  # noqa: E402
+from codeStream.knowledge_rain import KnowledgeRain  # noqa: E402
+
+
+def main():
+    """
+    Replay a recording from the command line.
+    """
+    parser = argparse.ArgumentParser(description="无窗口重放知识雨输入录制")
+    parser.add_argument("recording", help="输入录制 JSON 文件")
+    parser.add_argument("--deck", required=True, help="录制时使用的知识点 JSON 文件")
+    parser.add_argument("--chapter", help="录制时选择的章节，省略则为所有知识点")
+    parser.add_argument("--trace", help="帧耗时记录保存路径 (.csv 或 .json)")
+    args = parser.parse_args()
+    # Replays must not write cache entries into the working directory
+    config.DECK_CACHE_DIR = None
+
+    recording = InputRecording.load(args.recording)
+    chapters = load_chapters(args.deck)
+    if args.chapter:
+        knowledge_points = chapters[args.chapter]
+    else:
+        knowledge_points = {}
+        for chapter_points in chapters.values():
+            knowledge_points.update(chapter_points)
+
+    width, height = recording.size
+    rain = KnowledgeRain(width, height, knowledge_points)
+    start = time.perf_counter()
+    rain.replay(recording)
+    elapsed = time.perf_counter() - start
+    print(
+        f"重放 {recording.frame_count} 帧，用时 {elapsed:.2f} 秒 "
+        f"({recording.frame_count / elapsed:.1f} 帧/秒)"
+    )
+    print(f"帧耗时统计 (ms): {rain.profiler.percentiles()}")
+    if args.trace:
+        rain.profiler.dump(args.trace)
+    rain.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import numpy as np
+
+# Number of Unicode code points; bigram keys are numbered after the
+# characters' code points
+CODE_POINTS = 0x110000
+
+# Bits needed by the largest bigram key
+KEY_BITS = ((CODE_POINTS + 1) * CODE_POINTS).bit_length()
+
+
+class SearchIndex:
+    """
+    A full-text search index over knowledge point titles and explanations.
+
+    Texts are indexed by their characters and character bigrams rather than
+    by words, so Chinese text without spaces can be searched. A query term
+    is looked up by intersecting the postings of its bigrams, smallest
+    first, and the few remaining candidates of terms longer than a bigram
+    are checked for the whole term against the deck. Matching is
+    case-insensitive and every whitespace-separated term of a query must
+    match.
+
+    Grams are numbered by their code points and the index is made of three
+    numpy arrays, with no Python object per gram and no copy of the texts,
+    so it costs about four bytes per distinct gram of each point.
+
+    Attributes:
+        knowledge_points (Mapping): The indexed deck.
+        titles (list): The indexed knowledge points in deck order.
+        keys (numpy.ndarray): The sorted keys of the grams of the deck, see
+                              gram_key.
+        offsets (numpy.ndarray): The start of the postings of each gram in
+                                 point_ids, followed by the end of the last.
+        point_ids (numpy.ndarray): The ids of the points containing each
+                                   gram, sorted per gram.
+    """
+
+    def __init__(self, knowledge_points):
+        """
+        Build the index of a deck. Every explanation is read, so large decks
+        are best indexed off the UI and render threads.
+
+        Args:
+            knowledge_points (Mapping): The knowledge points and their
+                                        explanations.
+        """
+        self.knowledge_points = knowledge_points
+        self.titles = []
+        point_keys = []
+        for knowledge, explanation in knowledge_points.items():
+            self.titles.append(knowledge)
+            point_keys.append(self.text_keys(self.normalize(knowledge, explanation)))
+
+        counts = np.fromiter(
+            map(len, point_keys), dtype=np.int64, count=len(point_keys)
+        )
+        keys = np.concatenate(point_keys) if point_keys else np.empty(0, np.int64)
+        del point_keys
+        point_ids = np.repeat(np.arange(len(self.titles), dtype=np.int64), counts)
+        id_bits = max(len(self.titles) - 1, 1).bit_length()
+        if KEY_BITS + id_bits < 64:
+            # Sorting keys with their ids packed in the low bits orders the
+            # ids of each gram and is much faster than a stable argsort
+            keys <<= id_bits
+            keys |= point_ids
+            del point_ids
+            keys.sort()
+            self.point_ids = (keys & ((1 << id_bits) - 1)).astype(np.int32)
+            keys >>= id_bits
+        else:
+            order = np.argsort(keys, kind="stable")
+            keys = keys[order]
+            self.point_ids = point_ids[order].astype(np.int32)
+            del order, point_ids
+        starts = np.flatnonzero(np.diff(keys, prepend=-1))
+        self.keys = keys[starts]
+        self.offsets = np.append(starts, len(keys))
+
+    @staticmethod
+    def normalize(knowledge, explanation):
+        """
+        Get the searchable text of a knowledge point.
+
+        Args:
+            knowledge (str): The knowledge point.
+            explanation (str): Its explanation.
+
+        Returns:
+            str: The case-folded title and explanation.
+        """
+        # Terms contain no whitespace, so they never match across the title
+        # and the explanation
+        return f"{knowledge}\n{explanation}".casefold()
+
+    @staticmethod
+    def text_keys(text):
+        """
+        Get the keys of the characters and character bigrams of a text.
+
+        Args:
+            text (str): The text.
+
+        Returns:
+            numpy.ndarray: The distinct keys, sorted.
+        """
+        # JSON may contain lone surrogates, which are kept as code points
+        data = text.encode("utf-32-le", "surrogatepass")
+        codes = np.frombuffer(data, dtype=np.uint32).astype(np.int64)
+        bigrams = (codes[:-1] + 1) * CODE_POINTS + codes[1:]
+        keys = np.concatenate((codes, bigrams))
+        keys.sort()
+        return keys[np.diff(keys, prepend=-1) != 0]
+
+    @staticmethod
+    def gram_key(gram):
+        """
+        Get the key of a character or bigram.
+
+        Args:
+            gram (str): The character or bigram.
+
+        Returns:
+            int: The key, the code point of a character.
+        """
+        if len(gram) == 1:
+            return ord(gram)
+        return (ord(gram[0]) + 1) * CODE_POINTS + ord(gram[1])
+
+    def posting(self, gram):
+        """
+        Get the ids of the points containing a gram.
+
+        Args:
+            gram (str): A character or bigram.
+
+        Returns:
+            numpy.ndarray: The sorted point ids.
+        """
+        key = self.gram_key(gram)
+        number = int(np.searchsorted(self.keys, key))
+        if number == len(self.keys) or self.keys[number] != key:
+            return self.point_ids[:0]
+        return self.point_ids[self.offsets[number] : self.offsets[number + 1]]
+
+    def search(self, query):
+        """
+        Find the knowledge points matching a query.
+
+        Args:
+            query (str): Whitespace-separated terms, all of which must
+                         appear in the title or the explanation.
+
+        Returns:
+            set: The matching knowledge points, every point for an empty
+            query.
+        """
+        terms = query.casefold().split()
+        if not terms:
+            return set(self.titles)
+
+        # Bigrams of every term, or the character of single-character terms
+        grams = set()
+        for term in terms:
+            grams.update(
+                [term]
+                if len(term) == 1
+                else (term[index : index + 2] for index in range(len(term) - 1))
+            )
+        postings = sorted((self.posting(gram) for gram in grams), key=len)
+        candidates = postings[0]
+        for posting in postings[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, posting, assume_unique=True)
+
+        # Postings are exact for terms of up to two characters, longer ones
+        # may have their bigrams in the wrong order or far apart
+        long_terms = [term for term in terms if len(term) > 2]
+        titles = [self.titles[point_id] for point_id in candidates.tolist()]
+        if not long_terms:
+            return set(titles)
+        return {
+            knowledge
+            for knowledge in titles
+            if all(
+                term in self.normalize(knowledge, self.knowledge_points[knowledge])
+                for term in long_terms
+            )
+        }
@@ -0,0 +1,160 @@
+class SpatialGrid:
+    """
+    A uniform grid spatial index over axis-aligned rectangles.
+
+    Each item is bucketed into every grid cell its rect overlaps, so point
+    and rect queries only test the items in the cells they touch. Items are
+    moved incrementally: re-bucketing only happens when an item crosses a
+    cell boundary.
+
+    Attributes:
+        cell_size (int): The side length of a grid cell in pixels.
+        rects (dict): The rect of each indexed item as last inserted or
+                      moved.
+    """
+
+    def __init__(self, cell_size, get_rect=None):
+        """
+        Initialize the SpatialGrid.
+
+        Args:
+            cell_size (int): The side length of a grid cell in pixels.
+            get_rect (callable): Optional function returning the current
+                                 rect of an item, for items that move within
+                                 their cells without being re-indexed.
+                                 Defaults to the last inserted or moved rect.
+        """
+        self.cell_size = cell_size
+        self.rects = {}
+        self.get_rect = get_rect or self.rects.__getitem__
+        self.spans = {}
+        self.buckets = {}
+
+    def __len__(self):
+        """Return the number of indexed items."""
+        return len(self.rects)
+
+    def cell_span(self, rect):
+        """
+        Get the range of grid cells covered by a rect.
+
+        Args:
+            rect (pygame.Rect): The rect to locate.
+
+        Returns:
+            tuple: (first column, first row, last column, last row).
+        """
+        size = self.cell_size
+        return (
+            rect.left // size,
+            rect.top // size,
+            (rect.right - 1) // size,
+            (rect.bottom - 1) // size,
+        )
+
+    def cells(self, span):
+        """
+        Iterate over the grid cells of a span.
+
+        Args:
+            span (tuple): (first column, first row, last column, last row).
+
+        Yields:
+            tuple: The (column, row) of each cell.
+        """
+        left, top, right, bottom = span
+        for column in range(left, right + 1):
+            for row in range(top, bottom + 1):
+                yield column, row
+
+    def insert(self, key, rect):
+        """
+        Add an item to the index.
+
+        Args:
+            key (hashable): The item identifier.
+            rect (pygame.Rect): The item's rect.
+        """
+        span = self.cell_span(rect)
+        self.rects[key] = rect
+        self.spans[key] = span
+        for cell in self.cells(span):
+            self.buckets.setdefault(cell, set()).add(key)
+
+    def remove(self, key):
+        """
+        Remove an item from the index, if present.
+
+        Args:
+            key (hashable): The item identifier.
+        """
+        span = self.spans.pop(key, None)
+        if span is None:
+            return
+        del self.rects[key]
+        for cell in self.cells(span):
+            bucket = self.buckets[cell]
+            bucket.discard(key)
+            if not bucket:
+                del self.buckets[cell]
+
+    def move(self, key, rect):
+        """
+        Update the rect of an indexed item.
+
+        Args:
+            key (hashable): The item identifier.
+            rect (pygame.Rect): The item's new rect.
+        """
+        if self.cell_span(rect) == self.spans.get(key):
+            self.rects[key] = rect
+        else:
+            self.remove(key)
+            self.insert(key, rect)
+
+    def candidates(self, span):
+        """
+        Collect the items bucketed in the cells of a span.
+
+        Args:
+            span (tuple): (first column, first row, last column, last row).
+
+        Returns:
+            set: The keys of items that may overlap the span.
+        """
+        found = set()
+        for cell in self.cells(span):
+            bucket = self.buckets.get(cell)
+            if bucket:
+                found.update(bucket)
+        return found
+
+    def query_point(self, pos):
+        """
+        Find the items whose rect contains a point.
+
+        Args:
+            pos (tuple): The (x, y) point.
+
+        Returns:
+            list: The keys of the items containing the point.
+        """
+        column, row = pos[0] // self.cell_size, pos[1] // self.cell_size
+        bucket = self.buckets.get((column, row), ())
+        return [key for key in bucket if self.get_rect(key).collidepoint(pos)]
+
+    def query_rect(self, rect):
+        """
+        Find the items whose rect overlaps a rect.
+
+        Args:
+            rect (pygame.Rect): The rect to test.
+
+        Returns:
+            list: The keys of the overlapping items.
+        """
+        return [
+            key
+            for key in self.candidates(self.cell_span(rect))
+            if self.get_rect(key).colliderect(rect)
+        ]
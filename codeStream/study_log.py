@@ -0,0 +1,368 @@
+"""
+Append-only log of the knowledge points opened in the detail view.
+
+Views are appended to an in-memory buffer and written in batches by a
+background thread, so logging costs the rain loop no more than a list
+append. Events are stored compactly in a SQLite database in WAL mode:
+titles, chapters and sessions are interned as integer ids, times are
+stored in milliseconds, and per-point totals are rolled up as batches are
+written so summaries over millions of events need not scan them all.
+Totals are kept per day, session, point and chapter, so summaries can be
+restricted to a session or to recent days.
+
+Print a summary of the log with:
+
+    python -m codeStream.study_log --limit 20
+"""
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from codeStream import config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    started INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS points (id INTEGER PRIMARY KEY, title TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS chapters (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS events (
+    session_id INTEGER NOT NULL,
+    point_id INTEGER NOT NULL,
+    chapter_id INTEGER,
+    opened INTEGER NOT NULL,
+    dwell INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS totals (
+    day INTEGER NOT NULL,
+    session_id INTEGER NOT NULL,
+    point_id INTEGER NOT NULL,
+    chapter_id INTEGER NOT NULL,
+    views INTEGER NOT NULL,
+    dwell INTEGER NOT NULL,
+    PRIMARY KEY (day, session_id, point_id, chapter_id)
+) WITHOUT ROWID;
+"""
+
+# Milliseconds per day of the totals, days are counted in UTC
+DAY_MS = 24 * 60 * 60 * 1000
+
+# Chapter id stored in the totals of views without a chapter, as NULL
+# cannot be part of a primary key
+NO_CHAPTER = -1
+
+
+class StudyLog:
+    """
+    A buffered, append-only log of study events.
+
+    Each StudyLog is one session: it adds a session row when it is opened
+    and stamps every event it logs with it.
+
+    Attributes:
+        path (str): The path of the SQLite database.
+        session (int): The id of this session.
+        buffer (list): The events logged but not yet written.
+    """
+
+    def __init__(self, path, flush_interval, batch_size):
+        """
+        Open the log, start a session and start the writer thread.
+
+        Args:
+            path (str): The path of the SQLite database, created if needed.
+            flush_interval (float): The longest time in seconds an event
+                                    stays in the buffer.
+            batch_size (int): The number of buffered events that triggers a
+                              write before the interval ends.
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Only the writer thread writes, but close and summary may run on
+        # other threads, so the connection is shared behind a lock
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.executescript(SCHEMA)
+            cursor = self.connection.execute(
+                "INSERT INTO sessions (started) VALUES (?)",
+                (int(time.time() * 1000),),
+            )
+            self.connection.commit()
+        self.session = cursor.lastrowid
+        self.point_ids = {}
+        self.chapter_ids = {}
+        self.buffer = []
+        self.buffer_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopped = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def log_view(self, knowledge, chapter, opened, dwell):
+        """
+        Log a knowledge point opened in the detail view. Only appends to the
+        buffer, so it is safe to call from the rain loop.
+
+        Args:
+            knowledge (str): The knowledge point.
+            chapter (str): The chapter of the knowledge point, or None.
+            opened (float): The time the point was opened, in seconds since
+                            the epoch.
+            dwell (float): The time in seconds the point stayed open.
+        """
+        with self.buffer_lock:
+            self.buffer.append((knowledge, chapter, opened, dwell))
+            full = len(self.buffer) >= self.batch_size
+        if full:
+            self.wake.set()
+
+    def run(self):
+        """
+        Write the buffer every flush interval, or sooner once it fills up,
+        until the log is closed.
+        """
+        while not self.stopped:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            # A failed batch is dropped, the log keeps running and the
+            # buffer is emptied on every write
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"写入学习记录失败: {e}")
+
+    def flush(self):
+        """
+        Write the buffered events in one transaction.
+
+        Raises:
+            sqlite3.Error: If the events cannot be written. They are dropped
+                           and the transaction is rolled back.
+        """
+        with self.buffer_lock:
+            batch, self.buffer = self.buffer, []
+        if not batch:
+            return
+        with self.lock:
+            try:
+                self.write(batch)
+            except sqlite3.Error:
+                self.connection.rollback()
+                # Titles interned in the rolled back transaction are gone
+                self.point_ids.clear()
+                self.chapter_ids.clear()
+                raise
+
+    def write(self, batch):
+        """
+        Add events and their totals to the database and commit them. Must be
+        called with the lock held.
+
+        Args:
+            batch (list): (knowledge point, chapter, opened, dwell) tuples,
+                          see log_view.
+        """
+        rows = []
+        totals = Counter()
+        views = Counter()
+        for knowledge, chapter, opened, dwell in batch:
+            point_id = self.intern(self.point_ids, "points", knowledge)
+            chapter_id = (
+                None
+                if chapter is None
+                else self.intern(self.chapter_ids, "chapters", chapter)
+            )
+            opened_ms = int(opened * 1000)
+            dwell_ms = int(dwell * 1000)
+            rows.append((self.session, point_id, chapter_id, opened_ms, dwell_ms))
+            key = (
+                opened_ms // DAY_MS,
+                self.session,
+                point_id,
+                NO_CHAPTER if chapter_id is None else chapter_id,
+            )
+            views[key] += 1
+            totals[key] += dwell_ms
+        self.connection.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?)", rows)
+        self.connection.executemany(
+            "INSERT INTO totals VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (day, session_id, point_id, chapter_id) DO UPDATE SET "
+            "views = views + excluded.views, dwell = dwell + excluded.dwell",
+            (key + (count, totals[key]) for key, count in views.items()),
+        )
+        self.connection.commit()
+
+    def intern(self, ids, table, title):
+        """
+        Get the id of a title in a lookup table, adding it if needed. Must
+        be called with the lock held.
+
+        Args:
+            ids (dict): The cached ids of the table.
+            table (str): The lookup table, "points" or "chapters".
+            title (str): The title.
+
+        Returns:
+            int: The id of the title.
+        """
+        if title not in ids:
+            self.connection.execute(
+                f"INSERT OR IGNORE INTO {table} (title) VALUES (?)", (title,)
+            )
+            ids[title] = self.connection.execute(
+                f"SELECT id FROM {table} WHERE title = ?", (title,)
+            ).fetchone()[0]
+        return ids[title]
+
+    def summary(self, chapter=None, session=None, since=None, limit=None):
+        """
+        Aggregate the logged views of each knowledge point, see
+        query_summary. Buffered events are written first.
+
+        Args:
+            chapter (str): Only count views in this chapter.
+            session (int): Only count views of this session.
+            since (float): Only count views opened at or after this time, in
+                           seconds since the epoch.
+            limit (int): The maximum number of points returned.
+
+        Returns:
+            list: (knowledge point, chapter, views, total dwell time in
+            seconds) tuples, most viewed first.
+        """
+        self.flush()
+        with self.lock:
+            return query_summary(self.connection, chapter, session, since, limit)
+
+    def close(self):
+        """
+        Stop the writer thread, write the remaining events and close the
+        database.
+        """
+        self.stopped = True
+        self.wake.set()
+        self.thread.join()
+        try:
+            self.flush()
+        except sqlite3.Error as e:
+            print(f"写入学习记录失败: {e}")
+        finally:
+            with self.lock:
+                self.connection.close()
+
+
+def query_summary(connection, chapter=None, session=None, since=None, limit=None):
+    """
+    Aggregate the logged views of each knowledge point, most viewed first.
+
+    Only the rolled-up totals are read, so the cost grows with the number of
+    points viewed each day rather than with the number of events.
+
+    Args:
+        connection (sqlite3.Connection): The study log database.
+        chapter (str): Only count views in this chapter.
+        session (int): Only count views of this session.
+        since (float): Only count views opened on the UTC day of this time
+                       or later, in seconds since the epoch.
+        limit (int): The maximum number of points returned.
+
+    Returns:
+        list: (knowledge point, chapter, views, total dwell time in seconds)
+        tuples. The chapter is None for views logged without one.
+    """
+    conditions = []
+    parameters = []
+    if chapter is not None:
+        conditions.append("chapters.title = ?")
+        parameters.append(chapter)
+    if session is not None:
+        conditions.append("totals.session_id = ?")
+        parameters.append(session)
+    if since is not None:
+        conditions.append("totals.day >= ?")
+        parameters.append(int(since * 1000) // DAY_MS)
+    sql = (
+        "SELECT points.title, chapters.title, SUM(totals.views) AS views, "
+        "SUM(totals.dwell) FROM totals "
+        "JOIN points ON points.id = totals.point_id "
+        "LEFT JOIN chapters ON chapters.id = totals.chapter_id"
+    )
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += (
+        " GROUP BY totals.point_id, totals.chapter_id"
+        " ORDER BY views DESC, points.title"
+    )
+    if limit is not None:
+        sql += " LIMIT ?"
+        parameters.append(limit)
+    return [
+        (knowledge, chapter, views, dwell / 1000)
+        for knowledge, chapter, views, dwell in connection.execute(sql, parameters)
+    ]
+
+
+def open_study_log():
+    """
+    Open the study log configured by config.STUDY_LOG_PATH.
+
+    Returns:
+        StudyLog: The log, or None if it is disabled or cannot be opened.
+    """
+    if not config.STUDY_LOG_PATH:
+        return None
+    try:
+        return StudyLog(
+            config.STUDY_LOG_PATH,
+            config.STUDY_LOG_FLUSH_INTERVAL,
+            config.STUDY_LOG_BATCH_SIZE,
+        )
+    except (OSError, sqlite3.Error) as e:
+        print(f"无法打开学习记录: {e}")
+        return None
+
+
+def main():
+    """
+    Print a summary of the study log from the command line.
+    """
+    parser = argparse.ArgumentParser(description="学习记录统计")
+    parser.add_argument(
+        "--path", default=config.STUDY_LOG_PATH, help="学习记录文件"
+    )
+    parser.add_argument("--chapter", help="只统计该章节")
+    parser.add_argument("--days", type=float, help="只统计最近几天")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if not args.path or not os.path.exists(args.path):
+        parser.error("学习记录文件不存在")
+    since = time.time() - args.days * 86400 if args.days is not None else None
+    connection = sqlite3.connect(args.path)
+    try:
+        rows = query_summary(
+            connection, chapter=args.chapter, since=since, limit=args.limit
+        )
+    finally:
+        connection.close()
+    for knowledge, chapter, views, dwell in rows:
+        print(f"{views:>6} 次  {dwell:>9.1f} 秒  {chapter or '-'}  {knowledge}")
+
+
+if __name__ == "__main__":
+    main()
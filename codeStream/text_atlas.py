@@ -0,0 +1,124 @@
+import threading
+
+import pygame
+
+
+class TextAtlas:
+    """
+    A set of texts pre-rendered into a few large surfaces.
+
+    Texts are packed row by row ("shelf" packing, tallest first) into pages
+    of a fixed size, and each text's page and rect are kept in a lookup
+    table, so drawing a text is a single area blit with no FreeType call.
+
+    The atlas is built on a background thread; ``ready`` tells when every
+    text has been packed.
+
+    Attributes:
+        page_size (int): The width and height of each page in pixels.
+        pages (list): The page surfaces.
+        rects (dict): The (page, rect) of each text.
+        ready (bool): Whether the atlas is complete.
+        built (int): The number of texts rendered so far.
+        total (int): The number of texts to pack.
+    """
+
+    def __init__(self, page_size):
+        """
+        Initialize an empty TextAtlas.
+
+        Args:
+            page_size (int): The width and height of each page in pixels.
+        """
+        self.page_size = page_size
+        self.pages = []
+        self.rects = {}
+        self.ready = False
+        self.built = 0
+        self.total = 0
+        self.cancelled = False
+        self.build_thread = None
+
+    def build(self, font, texts, color):
+        """
+        Render and pack texts into pages. Stops early if cancelled.
+
+        Args:
+            font (pygame.freetype.Font): The font used for rendering.
+            texts (list): The texts to pack.
+            color (tuple): The RGB color of the texts.
+        """
+        surfaces = []
+        for text in texts:
+            if self.cancelled:
+                return
+            surfaces.append((text, font.render(text, color)[0]))
+            self.built += 1
+        surfaces.sort(key=lambda item: item[1].get_height(), reverse=True)
+
+        x = y = shelf_height = 0
+        page = None
+        for text, surface in surfaces:
+            if self.cancelled:
+                return
+            width, height = surface.get_size()
+            if width > self.page_size or height > self.page_size:
+                # Too large for a page, kept as its own surface
+                self.rects[text] = (surface, surface.get_rect())
+                continue
+            if page is not None and x + width > self.page_size:
+                # Start a new shelf below the current one
+                x, y, shelf_height = 0, y + shelf_height, 0
+            if page is None or y + height > self.page_size:
+                page = pygame.Surface(
+                    (self.page_size, self.page_size), pygame.SRCALPHA
+                )
+                self.pages.append(page)
+                x = y = shelf_height = 0
+            page.blit(surface, (x, y))
+            self.rects[text] = (page, pygame.Rect(x, y, width, height))
+            x += width
+            shelf_height = max(shelf_height, height)
+        self.ready = True
+
+    def build_async(self, font, texts, color):
+        """
+        Build the atlas on a background thread.
+
+        Args:
+            font (pygame.freetype.Font): The font used for rendering.
+            texts (list): The texts to pack.
+            color (tuple): The RGB color of the texts.
+        """
+        self.total = len(texts)
+        self.build_thread = threading.Thread(
+            target=self.build, args=(font, list(texts), color), daemon=True
+        )
+        self.build_thread.start()
+
+    @property
+    def building(self):
+        """Whether the atlas is still being built in the background."""
+        return (
+            not self.ready
+            and self.build_thread is not None
+            and self.build_thread.is_alive()
+        )
+
+    def cancel(self):
+        """
+        Stop a build in progress.
+        """
+        self.cancelled = True
+
+    def lookup(self, text):
+        """
+        Get the surface and area of a packed text.
+
+        Args:
+            text (str): The text.
+
+        Returns:
+            tuple: (surface, rect) to blit with ``area=rect``.
+        """
+        return self.rects[text]
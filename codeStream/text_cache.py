@@ -0,0 +1,125 @@
+from collections import OrderedDict
+
+
+class TextSurfaceCache:
+    """
+    An LRU cache of rendered text surfaces.
+
+    Rendering text with FreeType is by far the most expensive operation of
+    the knowledge rain, while the set of distinct strings on screen is small.
+    Surfaces are cached by (text, font, size, color) and evicted in least
+    recently used order once either the entry or the byte budget is exceeded.
+
+    Attributes:
+        max_entries (int): The maximum number of cached surfaces.
+        max_bytes (int): The maximum total pixel memory of cached surfaces.
+        hits (int): The number of lookups served from the cache.
+        misses (int): The number of lookups that required rendering.
+        evictions (int): The number of surfaces evicted from the cache.
+    """
+
+    def __init__(self, max_entries, max_bytes):
+        """
+        Initialize the TextSurfaceCache.
+
+        Args:
+            max_entries (int): The maximum number of cached surfaces.
+            max_bytes (int): The maximum total pixel memory in bytes.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(font, text, color):
+        """
+        Build the cache key for a text rendered with a font and color.
+
+        Args:
+            font (pygame.freetype.Font): The font used for rendering.
+            text (str): The text to render.
+            color (tuple): The RGB color of the text.
+
+        Returns:
+            tuple: The cache key (text, font path, font size, color).
+        """
+        return text, font.path, font.size, tuple(color)
+
+    def render(self, font, text, color):
+        """
+        Return the rendered surface and rect for a text, rendering it on a
+        cache miss.
+
+        Args:
+            font (pygame.freetype.Font): The font used for rendering.
+            text (str): The text to render.
+            color (tuple): The RGB color of the text.
+
+        Returns:
+            tuple: (surface, rect) as returned by ``font.render``.
+        """
+        key = self.make_key(font, text, color)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+        self.misses += 1
+        surface, rect = font.render(text, color)
+        size = surface.get_pitch() * surface.get_height()
+        self.entries[key] = (surface, rect, size)
+        self.total_bytes += size
+        self.evict()
+        return surface, rect
+
+    def evict(self):
+        """
+        Evict least recently used surfaces until the cache fits its budget.
+        """
+        while self.entries and (
+            len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes
+        ):
+            _, (_, _, size) = self.entries.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+
+    def invalidate(self, texts):
+        """
+        Remove the cached surfaces of some texts, in any font and color.
+
+        Args:
+            texts (set): The texts to remove.
+        """
+        for key in [key for key in self.entries if key[0] in texts]:
+            _, _, size = self.entries.pop(key)
+            self.total_bytes -= size
+
+    def clear(self):
+        """
+        Remove all cached surfaces without resetting the counters.
+        """
+        self.entries.clear()
+        self.total_bytes = 0
+
+    def stats(self):
+        """
+        Get the cache counters, useful for sizing the cache budget.
+
+        Returns:
+            dict: Entry count, byte usage, hits, misses, evictions and hit
+            rate.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,227 @@
+import itertools
+import threading
+from collections import OrderedDict
+
+
+class TextWrapper:
+    """
+    A line-wrapping engine for knowledge explanations.
+
+    Line widths are computed from per-glyph advance widths, which are
+    measured once per font and cached, so wrapping is linear in the length
+    of the text. Wrapped layouts are memoized per (knowledge point,
+    explanation, width, font size), as the same title may have different
+    explanations in different decks, and the least recently used ones are
+    dropped beyond max_layouts.
+
+    Attributes:
+        font (pygame.freetype.Font): The font used to measure text.
+        advances (dict): Cached horizontal advance of each measured glyph.
+        layouts (OrderedDict): Memoized wrapped lines keyed by (knowledge,
+                               hash of the explanation, max_width, font
+                               size), least recently used first.
+        max_layouts (int): The maximum number of memoized layouts.
+    """
+
+    def __init__(self, font, max_layouts):
+        """
+        Initialize the TextWrapper.
+
+        Args:
+            font (pygame.freetype.Font): The font used to measure text.
+            max_layouts (int): The maximum number of memoized layouts.
+        """
+        self.font = font
+        self.advances = {}
+        self.layouts = OrderedDict()
+        self.max_layouts = max_layouts
+        # Layouts are memoized from the pre-wrap thread and the main loop
+        self.layouts_lock = threading.Lock()
+        self.prewrap_thread = None
+        self.prewrap_generation = 0
+
+    def measure_glyphs(self, text):
+        """
+        Measure and cache the advance widths of glyphs not yet cached.
+
+        Args:
+            text (str): The text whose glyphs should be measured.
+        """
+        missing = "".join(set(text).difference(self.advances))
+        if not missing:
+            return
+        metrics = self.font.get_metrics(missing)
+        for char, metric in zip(missing, metrics):
+            if metric:
+                self.advances[char] = metric[4]
+            else:
+                # Glyphs missing from the font have no metrics but are still
+                # rendered as a placeholder box, whose advance is the width
+                # it adds to a run
+                self.advances[char] = (
+                    self.font.get_rect(char * 2)[2] - self.font.get_rect(char)[2]
+                )
+
+    def text_width(self, text):
+        """
+        Get the width of a text from the cached glyph advances.
+
+        Args:
+            text (str): The text to measure.
+
+        Returns:
+            float: The width of the text in pixels.
+        """
+        self.measure_glyphs(text)
+        advances = self.advances
+        return sum(advances[char] for char in text)
+
+    def wrap_chars(self, text, max_width):
+        """
+        Split a text into lines by characters.
+
+        Args:
+            text (str): The text to wrap, with glyphs already measured.
+            max_width (int): The maximum line width in pixels.
+
+        Returns:
+            list: The wrapped lines, the last one possibly partial.
+        """
+        advances = self.advances
+        lines = []
+        start = 0
+        current_width = 0
+        for index, char in enumerate(text):
+            advance = advances[char]
+            if current_width + advance < max_width or index == start:
+                current_width += advance
+            else:
+                lines.append(text[start:index])
+                start = index
+                current_width = advance
+        lines.append(text[start:])
+        return lines
+
+    def wrap_text(self, text, max_width):
+        """
+        Split a text into lines that fit within a given width.
+
+        Texts containing newlines are wrapped by words within each paragraph
+        with an empty line between paragraphs; other texts (e.g. Chinese
+        without spaces) are wrapped by characters. Words wider than a line
+        are also wrapped by characters.
+
+        Args:
+            text (str): The text to wrap.
+            max_width (int): The maximum line width in pixels.
+
+        Returns:
+            list: The wrapped lines.
+        """
+        self.measure_glyphs(text)
+        if "\n" not in text:
+            return self.wrap_chars(text, max_width)
+
+        advances = self.advances
+        space_width = self.text_width(" ")
+        lines = []
+        for paragraph in text.split("\n"):
+            current_words = []
+            current_width = 0
+            for word in paragraph.split():
+                word_width = sum(advances[char] for char in word)
+                if current_words and (
+                    current_width + space_width + word_width < max_width
+                ):
+                    current_words.append(word)
+                    current_width += space_width + word_width
+                    continue
+                if current_words:
+                    lines.append(" ".join(current_words))
+                if word_width < max_width:
+                    current_words = [word]
+                    current_width = word_width
+                else:
+                    *full_lines, word = self.wrap_chars(word, max_width)
+                    lines.extend(full_lines)
+                    current_words = [word]
+                    current_width = sum(advances[char] for char in word)
+            if current_words:
+                lines.append(" ".join(current_words))
+            lines.append("")  # Add empty line between paragraphs
+        return lines
+
+    def wrap(self, knowledge, explanation, max_width):
+        """
+        Get the wrapped lines of a knowledge point's explanation, wrapping
+        it on first use.
+
+        Args:
+            knowledge (str): The knowledge point the explanation belongs to.
+            explanation (str): The explanation text.
+            max_width (int): The maximum line width in pixels.
+
+        Returns:
+            list: The wrapped lines.
+        """
+        key = (knowledge, hash(explanation), max_width, self.font.size)
+        with self.layouts_lock:
+            lines = self.layouts.get(key)
+            if lines is not None:
+                self.layouts.move_to_end(key)
+                return lines
+        lines = self.wrap_text(explanation, max_width)
+        with self.layouts_lock:
+            self.layouts[key] = lines
+            while len(self.layouts) > self.max_layouts:
+                self.layouts.popitem(last=False)
+        return lines
+
+    def invalidate(self, knowledge):
+        """
+        Forget the wrapped layouts of knowledge points whose explanation
+        changed. A pre-wrap in progress is stopped first, as it may be
+        wrapping the old explanations.
+
+        Args:
+            knowledge (set): The knowledge points to forget.
+        """
+        self.prewrap_generation += 1
+        if self.prewrap_thread is not None:
+            self.prewrap_thread.join()
+        with self.layouts_lock:
+            for key in [key for key in self.layouts if key[0] in knowledge]:
+                del self.layouts[key]
+
+    def prewrap(self, knowledge_points, max_width):
+        """
+        Wrap the explanations of a deck on a background thread, up to
+        max_layouts of them in deck order. Starting a new pre-wrap stops the
+        previous one.
+
+        Only decks held in a dict are pre-wrapped: other mappings, e.g. a
+        compiled deck, read explanations from disk on demand, and reading
+        them all would defeat that.
+
+        Args:
+            knowledge_points (Mapping): The knowledge points and their
+                                        explanations.
+            max_width (int): The maximum line width in pixels.
+        """
+
+        self.prewrap_generation += 1
+        if not isinstance(knowledge_points, dict):
+            return
+        generation = self.prewrap_generation
+
+        def worker():
+            """Wrap each explanation not already memoized."""
+            # The deck is replaced rather than changed, so its keys can be
+            # iterated while the main loop runs
+            for knowledge in itertools.islice(knowledge_points, self.max_layouts):
+                if self.prewrap_generation != generation:
+                    return
+                self.wrap(knowledge, knowledge_points[knowledge], max_width)
+
+        self.prewrap_thread = threading.Thread(target=worker, daemon=True)
+        self.prewrap_thread.start()
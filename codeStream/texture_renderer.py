@@ -0,0 +1,151 @@
+import weakref
+
+import pygame
+from pygame._sdl2.sdl2 import error as SDLError
+from pygame._sdl2.video import Renderer, Texture, Window
+
+# SDL_WINDOWPOS_CENTERED_DISPLAY: or-ed with a display index, centers a
+# window on that display
+WINDOWPOS_CENTERED_DISPLAY = 0x2FFF0000
+
+
+class TextureRenderer:
+    """
+    A hardware rendering backend built on the SDL2 renderer.
+
+    Text surfaces (from the text cache or the text atlas) are uploaded once
+    as textures and the frame is composed by the SDL renderer, usually on
+    the GPU, instead of by software blits onto the display surface. Views
+    that are redrawn rarely, such as the detail view, are drawn in software
+    onto a back-buffer surface and uploaded whole.
+
+    Attributes:
+        window (pygame._sdl2.video.Window): The rain window.
+        renderer (pygame._sdl2.video.Renderer): The SDL renderer.
+        accelerated (bool): Whether the renderer runs on the GPU rather than
+                            being SDL's software renderer.
+        textures (weakref.WeakKeyDictionary): The texture uploaded for each
+                                              surface, dropped together with
+                                              the surface.
+        area_textures (weakref.WeakKeyDictionary): The textures uploaded for
+                                                   areas of each surface.
+    """
+
+    def __init__(self, title, size, fullscreen=False, vsync=False, display=None):
+        """
+        Create the window and its renderer.
+
+        Args:
+            title (str): The window title.
+            size (tuple): The window size in pixels.
+            fullscreen (bool): Whether to open the window in fullscreen mode.
+            vsync (bool): Whether to synchronize presenting with the display
+                          refresh.
+            display (int): Optional index of the display to open the window
+                           on, the system's choice if None.
+
+        Raises:
+            pygame.error: If no SDL renderer is available.
+        """
+        if display is None:
+            self.window = Window(title, size, fullscreen=fullscreen)
+        else:
+            position = WINDOWPOS_CENTERED_DISPLAY | display
+            self.window = Window(
+                title, size, position=(position, position), fullscreen=fullscreen
+            )
+        try:
+            try:
+                self.renderer = Renderer(self.window, accelerated=1, vsync=vsync)
+                self.accelerated = True
+            except (pygame.error, SDLError):
+                # No GPU renderer, e.g. with the dummy video driver
+                self.renderer = Renderer(self.window, vsync=vsync)
+                self.accelerated = False
+        except (pygame.error, SDLError) as e:
+            self.window.destroy()
+            raise pygame.error(str(e)) from e
+        self.textures = weakref.WeakKeyDictionary()
+        self.area_textures = weakref.WeakKeyDictionary()
+
+    def get_texture(self, surface):
+        """
+        Get the texture of a surface, uploading it on first use.
+
+        Args:
+            surface (pygame.Surface): The surface.
+
+        Returns:
+            pygame._sdl2.video.Texture: The texture.
+        """
+        texture = self.textures.get(surface)
+        if texture is None:
+            texture = Texture.from_surface(self.renderer, surface)
+            self.textures[surface] = texture
+        return texture
+
+    def get_area_texture(self, surface, area):
+        """
+        Get the texture of an area of a surface, uploading it on first use.
+
+        Args:
+            surface (pygame.Surface): The surface.
+            area (pygame.Rect): The area.
+
+        Returns:
+            pygame._sdl2.video.Texture: The texture.
+        """
+        textures = self.area_textures.setdefault(surface, {})
+        key = tuple(area)
+        texture = textures.get(key)
+        if texture is None:
+            texture = Texture.from_surface(self.renderer, surface.subsurface(area))
+            textures[key] = texture
+        return texture
+
+    def draw_frame(self, blits, color):
+        """
+        Clear the window and draw surfaces as textures. The frame is shown
+        by present.
+
+        Args:
+            blits (list): (surface, position) or (surface, position, area)
+                          tuples, as accepted by ``Surface.blits``.
+            color (tuple): The RGB background color.
+        """
+        self.renderer.draw_color = pygame.Color(color)
+        self.renderer.clear()
+        for surface, position, *area in blits:
+            if not area:
+                self.get_texture(surface).draw(dstrect=position)
+            elif self.accelerated:
+                self.get_texture(surface).draw(srcrect=area[0], dstrect=position)
+            else:
+                # SDL's software renderer processes the whole texture for
+                # every copy, which is slow for large atlas pages, so each
+                # area gets its own small texture
+                self.get_area_texture(surface, area[0]).draw(dstrect=position)
+
+    def present(self):
+        """
+        Show the drawn frame.
+        """
+        self.renderer.present()
+
+    def present_surface(self, surface):
+        """
+        Upload a whole surface and present it.
+
+        Args:
+            surface (pygame.Surface): The surface to show.
+        """
+        Texture.from_surface(self.renderer, surface).draw()
+        self.renderer.present()
+
+    def close(self):
+        """
+        Destroy the window.
+        """
+        self.textures.clear()
+        self.area_textures.clear()
+        self.window.destroy()
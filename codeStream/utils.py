@@ -1,4 +1,4 @@
-import json
+from codeStream.json_stream import load_chapters
 
 
 def load_knowledge(filename):
@@ -12,8 +12,7 @@ def load_knowledge(filename):
     returns a default dictionary with sample knowledge points.
     """
     try:
-        with open(filename, "r", encoding="utf-8") as file:
-            points = json.load(file)
+        points = load_chapters(filename)
         print(f"Successfully loaded {len(points)} knowledge points")
         return points
     except Exception as e: